@@ -4,13 +4,52 @@ Deployer Module: Handles pushing the static HTML files to a GitHub Pages branch.
 """
 
 import os
+import asyncio
+import hashlib
+import shlex
+import stat
 import subprocess
+import time
 import logging
-from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception_type, before_log, after_log, before_sleep_log
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
 
 # Configure logging for this module
 logger = logging.getLogger(__name__)
 
+# Maximum number of paths passed to a single `git add` call, keeping the argument list under ARG_MAX
+GIT_ADD_BATCH_SIZE = 4000
+
+# `git update-index --index-info` entry that removes a path from the index
+GIT_INDEX_REMOVE_ENTRY = "0 " + "0" * 40
+
+# Total size of files above which blob hashes are computed in a process pool instead of inline
+PARALLEL_HASH_MIN_BYTES = 32 * 1024 * 1024
+
+# Attempts for git commands that talk to the remote, which usually fail for transient network reasons
+GIT_NETWORK_ATTEMPTS = 3
+
+# Push errors that fail the same way on every attempt, e.g. a stale `--force-with-lease`, a non-fast-forward
+# or a ref update refused by the remote ("! [rejected] ... (stale info)", "! [remote rejected] ...")
+GIT_PERMANENT_PUSH_ERRORS = ("[rejected]", "[remote rejected]", "stale info")
+
+def _git_blob_sha1(file_path: str) -> str:
+    """
+    Computes the git blob id of a file (SHA-1 over "blob <size>\\0" + contents) without invoking git.
+    Module-level so it can be sent to a process pool.
+
+    Args:
+        file_path (str): Path of the file to hash.
+
+    Returns:
+        str: The hex blob id.
+    """
+    digest = hashlib.sha1(b"blob %d\0" % os.path.getsize(file_path))
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 class Deployer:
     """
     Manages the deployment of static files to GitHub Pages via Git commands.
@@ -30,25 +69,28 @@ class Deployer:
         self.local_repo_path = local_repo_path
         self.github_repo_url = github_repo_url
         self.branch = branch
+        # Set once the repository, remote and branch are prepared, so later deploys skip those git calls
+        self._repo_ready = False
 
-        if not os.path.exists(self.local_repo_path):
-            raise FileNotFoundError(f"Local repository path does not exist: {self.local_repo_path}")
+        try:
+            os.stat(self.local_repo_path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Local repository path does not exist: {self.local_repo_path}") from None
 
-    @retry(wait=wait_exponential(multiplier=1, min=4, max=10),
-           stop=stop_after_attempt(3),
-           retry=retry_if_exception_type(subprocess.CalledProcessError),
-           before_sleep=before_sleep_log(logger, logging.INFO),
-           after=after_log(logger, logging.WARNING))
-    def _run_git_command(self, command: list) -> tuple[int, str, str]:
+    def _run_git_command(self, command: list, check: bool = True, input: Optional[bytes] = None) -> tuple[int, bytes, bytes]:
         """
-        Helper to run a git command in the specified local repository path.
-        Raises subprocess.CalledProcessError on non-zero exit codes.
+        Helper to run a local git command in the specified local repository path.
+        Raises subprocess.CalledProcessError on non-zero exit codes unless `check` is False.
+        Local commands fail deterministically, so they are not retried; see `_run_git_command_network`.
 
         Args:
             command (list): A list of strings representing the git command and its arguments.
+            check (bool): If False, a non-zero exit code is returned to the caller instead of raised.
+            input (bytes, optional): Data written to the command's stdin.
 
         Returns:
-            tuple[int, str, str]: A tuple containing the return code, stdout, and stderr.
+            tuple[int, bytes, bytes]: A tuple containing the return code, stdout, and stderr. Output is left
+                                      undecoded since most of it is discarded; see `_decode`.
         """
         full_command = ["git"] + command
         logger.info(f"Executing command: {' '.join(full_command)} in {self.local_repo_path}")
@@ -56,14 +98,82 @@ class Deployer:
             process = subprocess.run(
                 full_command,
                 cwd=self.local_repo_path,
+                input=input,
                 capture_output=True,
-                text=True,
-                check=True # Raise CalledProcessError for non-zero exit codes
+                check=check # Raise CalledProcessError for non-zero exit codes
             )
             return process.returncode, process.stdout, process.stderr
         except subprocess.CalledProcessError as e:
-            logger.error(f"Git command failed with error: {e.stderr}")
-            raise # Re-raise to trigger retry
+            logger.error(f"Git command failed with error: {self._decode(e.stderr)}")
+            raise
+        except FileNotFoundError:
+            logger.critical("Git command not found. Please ensure Git is installed and in your PATH.")
+            raise
+        except Exception as e:
+            logger.error(f"An unexpected error occurred during git command execution: {e}", exc_info=True)
+            raise
+
+    @staticmethod
+    def _decode(output: bytes) -> str:
+        """
+        Decodes git output for parsing or logging. Undecodable bytes (e.g. in file names) are kept
+        via surrogate escapes, so paths round-trip through `os.fsencode`.
+        """
+        return os.fsdecode(output or b"")
+
+    def _run_git_command_network(self, command: list, attempts: int = GIT_NETWORK_ATTEMPTS) -> tuple[int, bytes, bytes]:
+        """
+        Runs a git command that talks to the remote (e.g. `push`), retrying on failure
+        since network errors are usually transient. The retry is a plain loop, so a command
+        that succeeds first time costs nothing extra. A push the remote rejected (see
+        `GIT_PERMANENT_PUSH_ERRORS`) would be rejected again, so it is raised at once.
+
+        Args:
+            command (list): A list of strings representing the git command and its arguments.
+            attempts (int): How many times to run the command before giving up.
+
+        Returns:
+            tuple[int, bytes, bytes]: A tuple containing the return code, stdout, and stderr.
+        """
+        attempt = 1
+        while True:
+            try:
+                return self._run_git_command(command)
+            except subprocess.CalledProcessError as e:
+                if attempt >= attempts or any(error in self._decode(e.stderr) for error in GIT_PERMANENT_PUSH_ERRORS):
+                    raise
+                delay = min(10, 4 * 2 ** (attempt - 1))
+                logger.info(f"Retrying git {command[0]} in {delay} seconds (attempt {attempt + 1} of {attempts}).")
+                time.sleep(delay)
+                attempt += 1
+
+    async def _run_git_command_async(self, command: list, check: bool = True) -> tuple[int, bytes, bytes]:
+        """
+        Asynchronous version of `_run_git_command`, so independent git commands can run concurrently.
+
+        Args:
+            command (list): A list of strings representing the git command and its arguments.
+            check (bool): If False, a non-zero exit code is returned to the caller instead of raised.
+
+        Returns:
+            tuple[int, bytes, bytes]: A tuple containing the return code, stdout, and stderr.
+        """
+        full_command = ["git"] + command
+        logger.info(f"Executing command: {' '.join(full_command)} in {self.local_repo_path}")
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *full_command,
+                cwd=self.local_repo_path,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            stdout, stderr = await process.communicate()
+            if check and process.returncode != 0:
+                raise subprocess.CalledProcessError(process.returncode, full_command, output=stdout, stderr=stderr) # type: ignore
+            return process.returncode, stdout, stderr # type: ignore
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Git command failed with error: {self._decode(e.stderr)}")
+            raise
         except FileNotFoundError:
             logger.critical("Git command not found. Please ensure Git is installed and in your PATH.")
             raise
@@ -81,7 +191,7 @@ class Deployer:
         """
         try:
             # Check if .git directory exists
-            if not os.path.exists(os.path.join(self.local_repo_path, ".git")):
+            if not self._has_git_dir():
                 logger.info(f"Initializing new Git repository in {self.local_repo_path}")
                 self._run_git_command(["init"])
 
@@ -90,53 +200,269 @@ class Deployer:
             else:
                 logger.info(f"Git repository already exists in {self.local_repo_path}")
                 # Ensure remote is correct if it already exists
-                try:
-                    self._run_git_command(["remote", "set-url", "origin", self.github_repo_url])
-                except subprocess.CalledProcessError as e:
-                    logger.warning(f"Could not set remote URL. Error: {e.stderr}")
+                remote_code, _, remote_stderr = self._run_git_command(["remote", "set-url", "origin", self.github_repo_url], check=False)
+                if remote_code != 0:
+                    logger.warning(f"Could not set remote URL. Error: {self._decode(remote_stderr)}")
 
             # Ensure we are on the correct branch
             # -B creates the branch if it doesn't exist, or resets it if it does
             self._run_git_command(["checkout", "-B", self.branch])
             
+            self._repo_ready = True
             return True
         except Exception as e:
             logger.error(f"Failed to initialize/prepare Git repository: {e}", exc_info=True)
             return False
 
-    def deploy(self, commit_message: str = "Automated blog update") -> bool:
+    async def initialize_repo_async(self) -> bool:
         """
-        Adds all files, commits them, and pushes to the GitHub Pages branch.
+        Asynchronous version of `initialize_repo`. Setting the remote and checking out the branch
+        do not depend on each other, so they run concurrently.
+
+        Returns:
+            bool: True if successful, False otherwise.
+        """
+        try:
+            if not self._has_git_dir():
+                logger.info(f"Initializing new Git repository in {self.local_repo_path}")
+                await self._run_git_command_async(["init"])
+
+                logger.info(f"Adding remote origin: {self.github_repo_url}")
+                remote_task = self._run_git_command_async(["remote", "add", "origin", self.github_repo_url])
+            else:
+                logger.info(f"Git repository already exists in {self.local_repo_path}")
+                # Ensure remote is correct if it already exists
+                remote_task = self._run_git_command_async(["remote", "set-url", "origin", self.github_repo_url], check=False)
+
+            # -B creates the branch if it doesn't exist, or resets it if it does
+            checkout_task = self._run_git_command_async(["checkout", "-B", self.branch])
+            (remote_code, _, remote_stderr), _ = await asyncio.gather(remote_task, checkout_task)
+            if remote_code != 0:
+                logger.warning(f"Could not set remote URL. Error: {self._decode(remote_stderr)}")
+
+            self._repo_ready = True
+            return True
+        except Exception as e:
+            logger.error(f"Failed to initialize/prepare Git repository: {e}", exc_info=True)
+            return False
+
+    def _needs_initialization(self) -> bool:
+        """
+        Checks whether the repository still has to be prepared before committing.
+        Only the first deploy of a Deployer instance (or one after `.git` went missing) needs it.
+        """
+        return not (self._repo_ready and self._has_git_dir())
+
+    def _has_git_dir(self) -> bool:
+        """
+        Returns True if the static files directory already contains a `.git` entry,
+        using a single `stat` call.
+        """
+        try:
+            os.stat(os.path.join(self.local_repo_path, ".git"))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _compute_tree_fingerprint(self) -> bytes:
+        """
+        Computes a cheap fingerprint of the working tree from file paths, sizes and modification times
+        (file contents are not read), plus the deploy target. The `.git` directory is excluded.
+
+        Returns:
+            bytes: The fingerprint digest.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        # A tree deployed to a different remote or branch must not count as unchanged
+        digest.update(f"{self.github_repo_url}\0{self.branch}\n".encode("utf-8"))
+        pending_dirs = [self.local_repo_path]
+        while pending_dirs:
+            current_dir = pending_dirs.pop()
+            with os.scandir(current_dir) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+            for entry in entries:
+                if entry.name == ".git" and current_dir == self.local_repo_path:
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    pending_dirs.append(entry.path)
+                    continue
+                entry_stat = entry.stat(follow_symlinks=False)
+                relative_path = os.path.relpath(entry.path, self.local_repo_path)
+                digest.update(f"{relative_path}\0{entry_stat.st_size}\0{entry_stat.st_mtime_ns}\n".encode("utf-8", errors="surrogateescape"))
+        return digest.digest()
+
+    def _deploy_stamp_path(self) -> str:
+        """Returns the path of the file holding the fingerprint of the last deployed tree."""
+        return os.path.join(self.local_repo_path, ".git", "deploy-stamp")
+
+    def _is_unchanged_since_last_deploy(self, fingerprint: bytes) -> bool:
+        """
+        Compares a tree fingerprint with the one stored after the last successful deploy.
 
         Args:
-            commit_message (str): The commit message to use.
+            fingerprint (bytes): The fingerprint of the current working tree.
 
         Returns:
-            bool: True if deployment was successful, False otherwise.
+            bool: True if the tree is unchanged, so no git command needs to run.
         """
-        logger.info(f"Deploying static files from {self.local_repo_path} to {self.github_repo_url}/{self.branch}")
+        try:
+            with open(self._deploy_stamp_path(), "rb") as f:
+                return f.read() == fingerprint
+        except OSError:
+            return False # No previous deploy recorded
 
-        if not self.initialize_repo():
-            logger.error("Failed to initialize/prepare Git repository. Aborting deployment.")
-            return False
+    def _save_deploy_stamp(self, fingerprint: bytes):
+        """
+        Records the fingerprint of a successfully deployed tree.
+
+        Args:
+            fingerprint (bytes): The fingerprint of the deployed working tree.
+        """
+        try:
+            with open(self._deploy_stamp_path(), "wb") as f:
+                f.write(fingerprint)
+        except OSError as e:
+            logger.warning(f"Could not save deploy stamp: {e}")
+
+    def _drop_unchanged_blobs(self, blob_paths: list) -> list:
+        """
+        Filters out files whose content and mode already match their index entry.
+        Blob ids are computed locally, in parallel processes when the files are large in total.
+
+        Args:
+            blob_paths (list): (git path, git mode) tuples of regular files to stage.
+
+        Returns:
+            list: The subset of `blob_paths` that actually has to be written to the object store.
+        """
+        if not blob_paths:
+            return blob_paths
+
+        _, ls_stdout, _ = self._run_git_command(["ls-files", "-s", "-z"])
+        index_entries = {}
+        for record in self._decode(ls_stdout).split("\0"):
+            if "\t" not in record:
+                continue
+            info, git_path = record.split("\t", 1)
+            git_mode, blob_sha = info.split()[:2]
+            index_entries[git_path] = (git_mode, blob_sha)
+
+        candidates = [(git_path, git_mode) for git_path, git_mode in blob_paths if git_path in index_entries]
+        if not candidates:
+            return blob_paths
+
+        full_paths = [os.path.join(self.local_repo_path, git_path) for git_path, _ in candidates]
+        total_bytes = sum(os.path.getsize(full_path) for full_path in full_paths)
+        if total_bytes >= PARALLEL_HASH_MIN_BYTES and len(full_paths) > 1:
+            # Hashing is CPU-bound, so large exports are spread over all cores
+            with ProcessPoolExecutor(max_workers=os.cpu_count()) as pool:
+                local_shas = list(pool.map(_git_blob_sha1, full_paths, chunksize=16))
+        else:
+            # Not worth the process pool start-up cost
+            local_shas = [_git_blob_sha1(full_path) for full_path in full_paths]
+
+        unchanged = {
+            git_path for (git_path, git_mode), blob_sha in zip(candidates, local_shas)
+            if index_entries[git_path] == (git_mode, blob_sha)
+        }
+        if unchanged:
+            logger.info(f"Skipping {len(unchanged)} exported files whose content is unchanged.")
+        return [(git_path, git_mode) for git_path, git_mode in blob_paths if git_path not in unchanged]
+
+    def _stage_files(self, changed_files: Optional[list] = None):
+        """
+        Stages files for the next commit.
+
+        Args:
+            changed_files (list, optional): Paths relative to the repository root to stage. If None,
+                                            the whole working tree is staged with `git add -A`.
+        """
+        if changed_files is None:
+            # `git add` can skip unchanged files using the index stat cache, which matters for a full scan
+            self._run_git_command(["add", "-A"])
+            return
+
+        # Every listed file is known to have changed, so hash them all in one `git hash-object` process
+        # and write the index entries in one `git update-index` process (no ARG_MAX batching needed).
+        blob_paths, index_entries, fallback_paths = [], [], []
+        # Pages the export deleted are not in the list, so every tracked file missing from the tree is removed too
+        _, deleted_stdout, _ = self._run_git_command(["ls-files", "--deleted", "-z"])
+        listed_paths = {path.replace(os.sep, "/") for path in changed_files}
+        for git_path in dict.fromkeys(self._decode(deleted_stdout).split("\0")):
+            if git_path and git_path not in listed_paths:
+                index_entries.append(f"{GIT_INDEX_REMOVE_ENTRY}\t{git_path}")
+        for path in changed_files:
+            git_path = path.replace(os.sep, "/")
+            try:
+                file_mode = os.lstat(os.path.join(self.local_repo_path, path)).st_mode
+            except FileNotFoundError:
+                index_entries.append(f"{GIT_INDEX_REMOVE_ENTRY}\t{git_path}")
+                continue
+            if stat.S_ISREG(file_mode) and "\n" not in path:
+                blob_paths.append((git_path, "100755" if file_mode & stat.S_IXUSR else "100644"))
+            else:
+                # Symlinks (and names --stdin-paths cannot express) are left to `git add`
+                fallback_paths.append(path)
+
+        # Simply Static rewrites many files with identical content; only those whose blob differs from the index need writing
+        blob_paths = self._drop_unchanged_blobs(blob_paths)
+
+        if blob_paths:
+            _, hash_stdout, _ = self._run_git_command(
+                ["hash-object", "-w", "--stdin-paths"],
+                input=os.fsencode("".join(f"{git_path}\n" for git_path, _ in blob_paths))
+            )
+            for (git_path, git_mode), blob_sha in zip(blob_paths, self._decode(hash_stdout).split()):
+                index_entries.append(f"{git_mode} {blob_sha}\t{git_path}")
+
+        if index_entries:
+            self._run_git_command(["update-index", "-z", "--index-info"], input=os.fsencode("".join(f"{entry}\0" for entry in index_entries)))
 
+        for i in range(0, len(fallback_paths), GIT_ADD_BATCH_SIZE):
+            self._run_git_command(["add", "-A", "--"] + fallback_paths[i:i + GIT_ADD_BATCH_SIZE])
+
+    def _commit_and_push(self, commit_message: str, changed_files: Optional[list] = None) -> bool:
+        """
+        Stages, commits and pushes the static files. The repository must already be initialized.
+
+        Args:
+            commit_message (str): The commit message to use.
+            changed_files (list, optional): Paths to stage instead of the whole working tree.
+
+        Returns:
+            bool: True if deployment was successful, False otherwise.
+        """
         try:
-            # Add all files
-            self._run_git_command(["add", "."])
+            # Stage all additions, modifications and deletions
+            self._stage_files(changed_files)
 
-            # Commit changes
-            # Check if there are any changes to commit before attempting to commit
-            status_code, status_stdout, status_stderr = self._run_git_command(["status", "--porcelain"])
-            if not status_stdout.strip():
+            # Look up what the remote branch pointed to after our last push (commit and tree) in one git call.
+            # Comparing against it rather than the local branch means an earlier failed push is retried.
+            branch_ref = f"refs/heads/{self.branch}"
+            tracking_ref = f"refs/remotes/origin/{self.branch}"
+            _, refs_stdout, _ = self._run_git_command(
+                ["for-each-ref", "--format=%(objectname) %(tree)", tracking_ref]
+            )
+            tracking = self._decode(refs_stdout).split()
+
+            _, tree_stdout, _ = self._run_git_command(["write-tree"])
+            tree_sha = self._decode(tree_stdout).strip()
+            if len(tracking) == 2 and tracking[1] == tree_sha:
                 logger.info("No changes to commit. Skipping push.")
                 return True # Consider it successful if nothing to commit
 
-            self._run_git_command(["commit", "-m", commit_message])
+            # Commit the staged tree directly as a parentless commit. The gh-pages branch is overwritten
+            # on every deploy anyway, so it never accumulates history the remote has to walk on push.
+            _, commit_stdout, _ = self._run_git_command(["commit-tree", tree_sha, "-m", commit_message])
+            commit_sha = self._decode(commit_stdout).strip()
+            self._run_git_command(["update-ref", branch_ref, commit_sha])
 
-            # Force push to the gh-pages branch
-            # For gh-pages, force push is common to keep the branch clean and simple.
-            # If history preservation were critical, a different strategy (e.g., fetch, rebase, push) would be needed.
-            self._run_git_command(["push", "origin", self.branch, "--force"])
+            # Overwrite the remote branch, but only if it still points where we last saw it
+            if len(tracking) == 2:
+                lease = f"--force-with-lease={branch_ref}:{tracking[0]}"
+            else:
+                lease = "--force" # Nothing recorded for the remote branch yet, so there is no lease to check
+            self._run_git_command_network(["push", lease, "origin", self.branch])
 
             logger.info("Deployment to GitHub Pages successful.")
             return True
@@ -147,6 +473,126 @@ class Deployer:
             logger.error(f"An unexpected error occurred during deployment: {e}", exc_info=True)
             return False
 
+    def deploy(self, commit_message: str = "Automated blog update", changed_files: Optional[list] = None) -> bool:
+        """
+        Adds all files, commits them, and pushes to the GitHub Pages branch.
+
+        Args:
+            commit_message (str): The commit message to use.
+            changed_files (list, optional): Paths (relative to the repository root) written by the last export.
+                                            When given, only these paths, and the tracked files the export
+                                            deleted, are staged instead of the whole tree. An empty list
+                                            (an export that wrote nothing) skips the deployment.
+
+        Returns:
+            bool: True if deployment was successful, False otherwise.
+        """
+        if changed_files is not None and not changed_files:
+            logger.info("No exported files changed. Skipping deployment.")
+            return True
+
+        logger.info(f"Deploying static files from {self.local_repo_path} to {self.github_repo_url}/{self.branch}")
+
+        fingerprint = self._compute_tree_fingerprint()
+        if self._is_unchanged_since_last_deploy(fingerprint):
+            logger.info("Static files are unchanged since the last deployment. Skipping git.")
+            return True
+
+        if self._needs_initialization() and not self.initialize_repo():
+            logger.error("Failed to initialize/prepare Git repository. Aborting deployment.")
+            return False
+
+        if not self._commit_and_push(commit_message, changed_files):
+            return False
+        self._save_deploy_stamp(fingerprint)
+        return True
+
+    async def deploy_async(self, commit_message: str = "Automated blog update", changed_files: Optional[list] = None) -> bool:
+        """
+        Asynchronous version of `deploy` that prepares the repository with `initialize_repo_async`.
+
+        Args:
+            commit_message (str): The commit message to use.
+            changed_files (list, optional): See `deploy`.
+
+        Returns:
+            bool: True if deployment was successful, False otherwise.
+        """
+        if changed_files is not None and not changed_files:
+            logger.info("No exported files changed. Skipping deployment.")
+            return True
+
+        logger.info(f"Deploying static files from {self.local_repo_path} to {self.github_repo_url}/{self.branch}")
+
+        fingerprint = await asyncio.to_thread(self._compute_tree_fingerprint)
+        if self._is_unchanged_since_last_deploy(fingerprint):
+            logger.info("Static files are unchanged since the last deployment. Skipping git.")
+            return True
+
+        if self._needs_initialization() and not await self.initialize_repo_async():
+            logger.error("Failed to initialize/prepare Git repository. Aborting deployment.")
+            return False
+
+        # Staging, commit and push depend on each other, so they run in order off the event loop
+        if not await asyncio.to_thread(self._commit_and_push, commit_message, changed_files):
+            return False
+        self._save_deploy_stamp(fingerprint)
+        return True
+
+    def deploy_oneshot(self, commit_message: str = "Automated blog update") -> bool:
+        """
+        Prepares the repository, commits the whole export folder and pushes it with a single `/bin/sh`
+        invocation instead of one subprocess per git step. Meant for one-shot CI runs; `deploy` keeps
+        the stepwise path, which reports exactly which step failed.
+
+        Args:
+            commit_message (str): The commit message to use.
+
+        Returns:
+            bool: True if deployment was successful, False otherwise.
+        """
+        logger.info(f"Deploying static files from {self.local_repo_path} to {self.github_repo_url}/{self.branch} in one shell run")
+
+        fingerprint = self._compute_tree_fingerprint()
+        if self._is_unchanged_since_last_deploy(fingerprint):
+            logger.info("Static files are unchanged since the last deployment. Skipping git.")
+            return True
+
+        remote_url = shlex.quote(self.github_repo_url)
+        branch = shlex.quote(self.branch)
+        branch_ref = shlex.quote(f"refs/heads/{self.branch}")
+        tracking_ref = shlex.quote(f"refs/remotes/origin/{self.branch}")
+        # Same steps as initialize_repo + _commit_and_push: parentless commit, skipped when the remote
+        # branch already has this tree, and pushed with a lease on where the remote branch last was.
+        script = "\n".join([
+            "set -e",
+            "git init -q",
+            f"git remote add origin {remote_url} 2>/dev/null || git remote set-url origin {remote_url}",
+            f"git checkout -q -B {branch}",
+            "git add -A",
+            f"tracking=$(git for-each-ref --format='%(objectname) %(tree)' {tracking_ref})",
+            "tree=$(git write-tree)",
+            'if [ -n "$tracking" ] && [ "${tracking#* }" = "$tree" ]; then echo "No changes to commit."; exit 0; fi',
+            f"commit=$(git commit-tree \"$tree\" -m {shlex.quote(commit_message)})",
+            f'git update-ref {branch_ref} "$commit"',
+            f'if [ -n "$tracking" ]; then lease="--force-with-lease={branch_ref}:${{tracking%% *}}"; else lease=--force; fi',
+            f'git push "$lease" origin {branch}',
+        ])
+        try:
+            result = subprocess.run(["/bin/sh", "-c", script], cwd=self.local_repo_path, capture_output=True)
+        except FileNotFoundError:
+            logger.critical("/bin/sh not found. Use `deploy` on this platform.")
+            return False
+
+        if result.returncode != 0:
+            logger.error(f"One-shot deployment failed with exit code {result.returncode}: {self._decode(result.stderr)}")
+            return False
+
+        self._repo_ready = True
+        self._save_deploy_stamp(fingerprint)
+        logger.info("Deployment to GitHub Pages successful.")
+        return True
+
 if __name__ == '__main__':
     # These would typically come from environment variables
     STATIC_EXPORT_PATH = os.getenv("SIMPLY_STATIC_EXPORT_PATH", "/tmp/simply-static-export")
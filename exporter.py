@@ -5,10 +5,19 @@ Exporter Module: Triggers Simply Static to export the WordPress site to static H
 
 import os
 import requests
+from requests.adapters import HTTPAdapter
+import httpx
 import time
 import logging
+from typing import Optional
 from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception_type, before_log, after_log, before_sleep_log
 
+try:
+    # Optional, Linux-only: lets us wait for export file events instead of polling the directory
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:
+    INotify = None
+
 # Configure logging for this module
 logger = logging.getLogger(__name__)
 
@@ -18,7 +27,7 @@ class Exporter:
     Assumes Simply Static is configured to export to a local folder.
     """
 
-    def __init__(self, wordpress_url: str, simply_static_export_trigger_url: str, export_path: str):
+    def __init__(self, wordpress_url: str, simply_static_export_trigger_url: str, export_path: str, status_url: Optional[str] = None):
         """
         Initializes the Exporter.
 
@@ -29,13 +38,33 @@ class Exporter:
                                                               If not provided, manual trigger is assumed.
             export_path (str, optional): The local path where Simply Static exports the files.
                                          This is crucial for the deployer module.
+            status_url (str, optional): A URL reporting the export status. If provided, completion is
+                                        detected by polling it instead of watching the export path.
         """
         self.wordpress_url = wordpress_url
         self.simply_static_export_trigger_url = simply_static_export_trigger_url
         self.export_path = export_path
+        self._status_url = status_url
+        self.changed_files: Optional[list] = None
+        self._export_started_at: Optional[float] = None
+        # Keep-alive session for the trigger URL, created on first use (see `_get_session`)
+        self._session: Optional[requests.Session] = None
         if self.export_path and not os.path.exists(self.export_path):
             logger.warning(f"Export path {self.export_path} does not exist. Please ensure Simply Static is configured correctly.")
 
+    def _get_session(self) -> requests.Session:
+        """
+        Returns the keep-alive HTTP session, creating it on first use.
+        Reusing it lets retries and repeated triggers skip the TCP/TLS handshake.
+        """
+        if self._session is None:
+            self._session = requests.Session()
+            # Retries are handled by tenacity, not by urllib3
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2, max_retries=0)
+            self._session.mount("http://", adapter)
+            self._session.mount("https://", adapter)
+        return self._session
+
     @retry(wait=wait_exponential(multiplier=1, min=4, max=10),
            stop=stop_after_attempt(3),
            retry=retry_if_exception_type(requests.exceptions.RequestException),
@@ -53,54 +82,99 @@ class Exporter:
             return False
 
         logger.info(f"Attempting to trigger Simply Static export via: {self.simply_static_export_trigger_url}")
+        # Files may already be written while the trigger request is in flight
+        self._export_started_at = time.time()
         try:
-            response = requests.get(self.simply_static_export_trigger_url, timeout=60)
-            response.raise_for_status()  # Raise an HTTPError for bad responses (4xx or 5xx)
-            logger.info(f"Simply Static export triggered successfully. Response: {response.text[:200]}...")
+            # Stream the response: only a short preview of the (potentially large) body is logged
+            response = self._get_session().get(self.simply_static_export_trigger_url, timeout=60, stream=True)
+            try:
+                response.raise_for_status()  # Raise an HTTPError for bad responses (4xx or 5xx)
+                preview = response.raw.read(200, decode_content=True).decode("utf-8", errors="replace")
+            finally:
+                response.close()
+            logger.info(f"Simply Static export triggered successfully. Response: {preview}...")
             return True
         except requests.exceptions.RequestException as e:
             logger.error(f"Error triggering Simply Static export: {e}")
             raise # Re-raise to trigger retry
 
-    def wait_for_export_completion(self, timeout: int = 300, check_interval: int = 10) -> bool:
+    @retry(wait=wait_exponential(multiplier=1, min=4, max=10),
+           stop=stop_after_attempt(3),
+           retry=retry_if_exception_type(httpx.HTTPError),
+           before_sleep=before_sleep_log(logger, logging.INFO),
+           after=after_log(logger, logging.WARNING))
+    async def trigger_simply_static_export_async(self) -> bool:
+        """
+        Asynchronous version of `trigger_simply_static_export`. While Simply Static handles the
+        trigger request, the event loop is free to do other work (e.g. preparing the deploy repository).
+
+        Returns:
+            bool: True if the trigger was successful, False otherwise.
+        """
+        if not self.simply_static_export_trigger_url:
+            logger.warning("Simply Static export trigger URL not provided. Please trigger export manually.")
+            return False
+
+        logger.info(f"Attempting to trigger Simply Static export via: {self.simply_static_export_trigger_url}")
+        # Files may already be written while the trigger request is in flight
+        self._export_started_at = time.time()
+        try:
+            async with httpx.AsyncClient(timeout=60) as client:
+                # Stream the response: only a short preview of the (potentially large) body is logged
+                async with client.stream("GET", self.simply_static_export_trigger_url) as response:
+                    response.raise_for_status()  # Raise an HTTPStatusError for bad responses (4xx or 5xx)
+                    preview = ""
+                    async for chunk in response.aiter_bytes(chunk_size=200):
+                        preview = chunk[:200].decode("utf-8", errors="replace")
+                        break
+            logger.info(f"Simply Static export triggered successfully. Response: {preview}...")
+            return True
+        except httpx.HTTPError as e:
+            logger.error(f"Error triggering Simply Static export: {e}")
+            raise # Re-raise to trigger retry
+
+    def wait_for_export_completion(self, timeout: int = 300, check_interval: int = 10, completion_marker: Optional[str] = None) -> bool:
         """
-        Waits for the Simply Static export to complete by checking for the existence
-        and recent modification of files in the export path.
+        Waits for the Simply Static export to complete. If a status URL is configured it is polled;
+        otherwise, if a completion marker is given, the export path is watched for it. By default,
+        completion is inferred from the existence and recent modification of files in the export path.
 
         Args:
             timeout (int): Maximum time to wait in seconds.
             check_interval (int): How often to check for completion in seconds.
+            completion_marker (str, optional): Path, relative to the export path, of a file written only
+                                               once the export has finished (e.g. by a hook after it). By
+                                               default the directory is watched until it goes quiet instead.
+                                               Note that Simply Static writes `index.html` early on.
 
         Returns:
             bool: True if export completed within timeout, False otherwise.
         """
+        if self._status_url:
+            return self._wait_for_export_status(time.time(), timeout)
+
         if not self.export_path:
             logger.warning("Export path not specified. Cannot wait for export completion automatically.")
             return False
 
         logger.info(f"Waiting for Simply Static export to complete in {self.export_path}...")
         start_time = time.time()
-        last_mod_time = 0
-        initial_file_count = 0
 
-        # Get initial state of the directory
-        if os.path.exists(self.export_path):
-            initial_file_count = len(os.listdir(self.export_path))
+        if completion_marker:
+            return self._wait_for_completion_marker(start_time, timeout, completion_marker, max_delay=check_interval)
+
+        if INotify is not None and os.path.isdir(self.export_path):
             try:
-                last_mod_time = os.path.getmtime(self.export_path)
-            except OSError:
-                pass # Directory might be empty or inaccessible initially
+                return self._wait_for_export_events(start_time, timeout, check_interval)
+            except OSError as e:
+                # e.g. the inotify watch limit was reached; the polling loop below still works
+                logger.warning(f"Could not watch {self.export_path} for file events ({e}). Falling back to polling.")
 
-        while time.time() - start_time < timeout:
-            current_file_count = 0
-            current_mod_time = 0
+        # Get initial state of the directory
+        _, last_mod_time = self._scan_export_dir()
 
-            if os.path.exists(self.export_path):
-                current_file_count = len(os.listdir(self.export_path))
-                try:
-                    current_mod_time = os.path.getmtime(self.export_path)
-                except OSError:
-                    pass
+        while time.time() - start_time < timeout:
+            current_file_count, current_mod_time = self._scan_export_dir()
 
             # Check if files have appeared or directory has been modified recently
             if current_file_count > 0 and current_mod_time > last_mod_time:
@@ -112,6 +186,7 @@ class Exporter:
             # If directory is populated and no recent changes, assume complete
             if current_file_count > 0 and (time.time() - last_mod_time > check_interval):
                 logger.info("Simply Static export appears to be complete (no recent changes detected).")
+                self.changed_files = self._collect_changed_files(since=self._export_started_at or start_time)
                 return True
 
             time.sleep(check_interval)
@@ -119,6 +194,209 @@ class Exporter:
         logger.warning("Timeout waiting for Simply Static export completion.")
         return False
 
+    def _wait_for_export_status(self, start_time: float, timeout: int, initial_delay: float = 0.1, max_delay: float = 5.0) -> bool:
+        """
+        Polls the configured status URL with exponential backoff until it reports completion.
+        A 200 response counts as complete unless its JSON body carries a "status" other than "done".
+
+        Args:
+            start_time (float): When the wait started (Unix timestamp).
+            timeout (int): Maximum time to wait in seconds.
+            initial_delay (float): Delay before the second poll, in seconds.
+            max_delay (float): Upper bound for the delay between polls, in seconds.
+
+        Returns:
+            bool: True if export completed within timeout, False otherwise.
+        """
+        logger.info(f"Waiting for Simply Static export to complete via status URL: {self._status_url}")
+        delay = initial_delay
+        while time.time() - start_time < timeout:
+            try:
+                response = self._get_session().get(self._status_url, timeout=10) # type: ignore
+                if response.status_code == 200 and self._is_status_done(response):
+                    logger.info("Simply Static reports the export as complete.")
+                    if self.export_path:
+                        self.changed_files = self._collect_changed_files(since=self._export_started_at or start_time)
+                    return True
+            except requests.exceptions.RequestException as e:
+                logger.debug(f"Error polling Simply Static status URL: {e}")
+
+            time.sleep(min(delay, max(timeout - (time.time() - start_time), 0)))
+            delay = min(delay * 2, max_delay)
+
+        logger.warning("Timeout waiting for Simply Static export completion.")
+        return False
+
+    def _wait_for_completion_marker(self, start_time: float, timeout: int, completion_marker: str,
+                                    initial_delay: float = 0.1, max_delay: float = 10.0) -> bool:
+        """
+        Polls for the completion marker with exponential backoff, one `stat` per poll, and returns
+        as soon as it has been written by the current export. A marker left over from an earlier
+        export is ignored based on its modification time. No list of changed files is recorded, as
+        files may still be written after the marker; the whole export is staged instead.
+
+        Args:
+            start_time (float): When the wait started (Unix timestamp).
+            timeout (int): Maximum time to wait in seconds.
+            completion_marker (str): Path of the marker file, relative to the export path.
+            initial_delay (float): Delay before the second poll, in seconds.
+            max_delay (float): Upper bound for the delay between polls, in seconds.
+
+        Returns:
+            bool: True if export completed within timeout, False otherwise.
+        """
+        marker_path = os.path.join(self.export_path, completion_marker)
+        since = self._export_started_at or start_time
+        delay = initial_delay
+        while time.time() - start_time < timeout:
+            try:
+                if os.stat(marker_path).st_mtime >= since:
+                    logger.info(f"Simply Static export is complete ({completion_marker} was written).")
+                    self.changed_files = None
+                    return True
+            except OSError:
+                pass # Marker not written yet
+
+            time.sleep(min(delay, max(timeout - (time.time() - start_time), 0)))
+            delay = min(delay * 1.5, max_delay)
+
+        logger.warning("Timeout waiting for Simply Static export completion.")
+        return False
+
+    def _is_status_done(self, response: requests.Response) -> bool:
+        """
+        Checks a 200 status response for an explicit "still running" JSON status.
+
+        Args:
+            response (requests.Response): The status URL response.
+
+        Returns:
+            bool: True unless the body is JSON with a "status" other than "done".
+        """
+        try:
+            payload = response.json()
+        except ValueError:
+            return True # Plain 200 response
+        if isinstance(payload, dict) and "status" in payload:
+            return str(payload["status"]).lower() == "done"
+        return True
+
+    def _wait_for_export_events(self, start_time: float, timeout: int, check_interval: int) -> bool:
+        """
+        Event-driven version of the completion wait, using inotify instead of re-reading the directory.
+        The export is considered complete once the directory is populated and no file events
+        arrived for `check_interval` seconds.
+
+        Args:
+            start_time (float): When the wait started (Unix timestamp).
+            timeout (int): Maximum time to wait in seconds.
+            check_interval (int): Idle period, in seconds, after which the export is considered complete.
+
+        Returns:
+            bool: True if export completed within timeout, False otherwise.
+        """
+        watch_mask = (inotify_flags.CREATE | inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO |
+                      inotify_flags.DELETE | inotify_flags.MOVED_FROM)
+        with INotify() as inotify:
+            # inotify watches are not recursive, so watch every directory of the export tree
+            watched_dirs = {}
+            for dirpath, dirnames, _ in os.walk(self.export_path):
+                if ".git" in dirnames:
+                    dirnames.remove(".git")
+                watched_dirs[inotify.add_watch(dirpath, watch_mask)] = dirpath
+
+            deadline = start_time + timeout
+            while time.time() < deadline:
+                wait_seconds = min(check_interval, max(deadline - time.time(), 0))
+                events = inotify.read(timeout=int(wait_seconds * 1000))
+                if not events:
+                    if self._has_exported_files():
+                        logger.info("Simply Static export appears to be complete (no recent changes detected).")
+                        self.changed_files = self._collect_changed_files(since=self._export_started_at or start_time)
+                        return True
+                    continue
+
+                for event in events:
+                    if event.mask & inotify_flags.ISDIR and event.mask & (inotify_flags.CREATE | inotify_flags.MOVED_TO):
+                        new_dir = os.path.join(watched_dirs.get(event.wd, self.export_path), event.name)
+                        try:
+                            watched_dirs[inotify.add_watch(new_dir, watch_mask)] = new_dir
+                        except OSError:
+                            pass # Directory was removed again before we could watch it
+                logger.debug(f"Received {len(events)} file events from the Simply Static export.")
+
+        logger.warning("Timeout waiting for Simply Static export completion.")
+        return False
+
+    def _scan_export_dir(self) -> tuple[int, float]:
+        """
+        Reads the top level of the export path once with `os.scandir`.
+
+        Returns:
+            tuple[int, float]: The number of entries and the newest entry modification time
+                               (0 if the directory is missing or empty).
+        """
+        try:
+            with os.scandir(self.export_path) as it:
+                entries = list(it)
+        except OSError:
+            return 0, 0 # Directory might not exist yet or be inaccessible
+
+        newest_mod_time = 0.0
+        for entry in entries:
+            try:
+                newest_mod_time = max(newest_mod_time, entry.stat(follow_symlinks=False).st_mtime)
+            except OSError:
+                pass # Entry was removed while scanning
+        return len(entries), newest_mod_time
+
+    def _has_exported_files(self) -> bool:
+        """Returns True if the export path contains at least one entry, reading only the first one."""
+        with os.scandir(self.export_path) as it:
+            return next(it, None) is not None
+
+    def _collect_changed_files(self, since: float) -> list:
+        """
+        Walks the export path and collects the files written at or after `since`.
+
+        Args:
+            since (float): A Unix timestamp; files modified before it are ignored.
+
+        Returns:
+            list: Paths relative to the export path, suitable for passing to `git add`.
+        """
+        changed_files = []
+        for dirpath, dirnames, filenames in os.walk(self.export_path):
+            # The deployer keeps its git repository inside the export path
+            if ".git" in dirnames:
+                dirnames.remove(".git")
+            for filename in filenames:
+                full_path = os.path.join(dirpath, filename)
+                try:
+                    if os.path.getmtime(full_path) >= since:
+                        changed_files.append(os.path.relpath(full_path, self.export_path))
+                except OSError:
+                    continue # File was removed while walking
+        logger.info(f"Detected {len(changed_files)} files written by the export.")
+        return changed_files
+
+    def get_changed_files(self) -> Optional[list]:
+        """
+        Returns the files written by the last completed export, or None if no export was observed.
+        """
+        return self.changed_files
+
+    def close(self):
+        """
+        Releases the pooled HTTP connections held by the exporter.
+        """
+        if getattr(self, "_session", None) is not None:
+            self._session.close() # type: ignore
+            self._session = None
+
+    def __del__(self):
+        self.close()
+
     def get_export_path(self) -> str:
         """
         Returns the configured export path.
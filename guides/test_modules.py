@@ -6,13 +6,26 @@ Uses pytest for testing framework.
 import pytest
 import os
 import json
-from unittest.mock import Mock, patch, MagicMock
-from datetime import datetime, timedelta
+import sqlite3
+import hashlib
+import time
+import asyncio
+import subprocess
+import threading
+import functools
+import xmlrpc.client
+import httpx
+from unittest.mock import Mock, patch, MagicMock, AsyncMock
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
 
 # Import modules to test
-from ingest import Ingester
-from transform import Transformer
+from ingest import Ingester, FileChange, match_notes_to_commits
+from transform import Transformer, AsyncTokenRateLimiter, AdaptiveConcurrencyLimiter, condense_patch, strip_context_lines, server_retry_delay
+from transform_cache import TransformCache
 from publisher import Publisher
+from sanitizer import Sanitizer
+import exporter
 from exporter import Exporter
 from deployer import Deployer
 
@@ -37,7 +50,7 @@ class TestIngester:
 
     @pytest.fixture(autouse=True)
     def setup_ingester(self, tmp_path):
-        self.state_file = tmp_path / "processed_state.json"
+        self.state_file = tmp_path / "processed_state.db"
         self.ingester = Ingester("fake_github_token", "fake_notion_token", str(self.state_file))
 
     def test_load_processed_shas_empty_file(self):
@@ -45,82 +58,302 @@ class TestIngester:
         assert self.ingester.processed_shas == set()
 
     def test_load_processed_shas_existing_file(self):
-        """Test loading processed SHAs from an existing state file."""
+        """Test loading processed SHAs from an existing state database."""
         test_shas = ["sha1", "sha2", "sha3"]
-        with open(self.state_file, 'w') as f:
-            json.dump(test_shas, f)
-        
+        with sqlite3.connect(self.state_file) as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS shas(sha TEXT PRIMARY KEY) WITHOUT ROWID")
+            conn.executemany("INSERT INTO shas VALUES (?)", [(sha,) for sha in test_shas])
+
         ingester_reloaded = Ingester("fake_github_token", "fake_notion_token", str(self.state_file))
         assert ingester_reloaded.processed_shas == set(test_shas)
 
-    def test_save_processed_shas(self):
-        """
-        Test saving processed SHAs to state file.
-        """
-        self.ingester.processed_shas.add("new_sha")
-        self.ingester._save_processed_shas()
-        
-        with open(self.state_file, 'r') as f:
-            saved_shas = json.load(f)
-        assert "new_sha" in saved_shas
+    def test_mark_as_processed_persists(self):
+        """Test marking SHAs stores each of them once in the state database."""
+        self.ingester.mark_as_processed("sha1")
+        self.ingester.mark_as_processed("sha2")
+        self.ingester.mark_as_processed("sha1")
+
+        with sqlite3.connect(self.state_file) as conn:
+            assert conn.execute("SELECT sha FROM shas ORDER BY sha").fetchall() == [("sha1",), ("sha2",)]
+        ingester_reloaded = Ingester("fake_github_token", "fake_notion_token", str(self.state_file))
+        assert ingester_reloaded.processed_shas == {"sha1", "sha2"}
+
+    def test_load_processed_shas_migrates_json_state(self, tmp_path):
+        """Test a legacy processed_state.json is imported into a new state database."""
+        with open(tmp_path / "state.json", 'w') as f:
+            json.dump(["sha2", "sha1"], f, indent=4)
+
+        ingester = Ingester("fake_github_token", "fake_notion_token", str(tmp_path / "state.db"))
+        assert ingester.processed_shas == {"sha1", "sha2"}
+        assert Ingester("fake_github_token", "fake_notion_token", str(tmp_path / "state.db")).processed_shas == {"sha1", "sha2"}
+
+    def test_load_processed_shas_migrates_ndjson_state(self, tmp_path):
+        """Test a one-SHA-per-line state log is imported with its duplicates dropped."""
+        (tmp_path / "state.ndjson").write_text("sha1\n" * 5 + "sha2\n")
+        ingester = Ingester("fake_github_token", "fake_notion_token", str(tmp_path / "state.db"))
+        assert ingester.processed_shas == {"sha1", "sha2"}
+        with sqlite3.connect(tmp_path / "state.db") as conn:
+            assert conn.execute("SELECT COUNT(*) FROM shas").fetchone() == (2,)
+
+    def test_sha_set(self):
+        """Test full SHAs are stored as digests and everything round-trips as strings."""
+        from ingest import ShaSet
+        full_sha = "0123456789abcdef0123456789abcdef01234567"
+        shas = ShaSet([full_sha, "abc1234"])
+        assert full_sha in shas and "abc1234" in shas
+        assert full_sha.upper() not in shas and "sha_missing" not in shas
+        assert shas == {full_sha, "abc1234"}
+        assert shas._digests == {bytes.fromhex(full_sha)}
+        shas.discard(full_sha)
+        assert list(shas) == ["abc1234"]
+
+    def _mock_github_api(self, commits):
+        """Returns a patch serving `commits` (dicts with sha, message, days_ago) from a mocked GitHub REST API."""
+        details = {
+            commit["sha"]: {
+                "sha": commit["sha"],
+                "html_url": f"https://github.com/test/repo/commit/{commit['sha']}",
+                "commit": {"message": commit["message"], "author": {
+                    "name": "Test Author",
+                    "date": (datetime.now() - timedelta(days=commit["days_ago"])).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                }},
+                "files": [],
+            }
+            for commit in commits
+        }
+
+        def handler(request):
+            if request.url.path == "/repos/test/repo/commits":
+                return httpx.Response(200, json=[{"sha": sha} for sha in details])
+            return httpx.Response(200, json=details[request.url.path.rsplit("/", 1)[-1]])
 
-    @patch('ingest.Github')
-    def test_fetch_github_commits_incremental(self, mock_github):
+        return patch('ingest.httpx.AsyncClient', functools.partial(httpx.AsyncClient, transport=httpx.MockTransport(handler)))
+
+    def test_fetch_github_commits_incremental(self):
         """Test fetching GitHub commits in incremental mode."""
-        mock_repo = Mock()
-        mock_commit = Mock()
-        mock_commit.sha = "test_sha_inc"
-        mock_commit.commit.message = "Test commit message incremental"
-        mock_commit.commit.author.name = "Test Author"
-        mock_commit.commit.author.date = datetime.now() - timedelta(days=1)
-        mock_commit.html_url = "https://github.com/test/repo/commit/test_sha_inc"
-        
-        mock_full_commit = Mock()
-        mock_full_commit.files = []
-        mock_repo.get_commit.return_value = mock_full_commit
-        mock_repo.get_commits.return_value = [mock_commit]
-        
-        mock_github_instance = Mock()
-        mock_github_instance.get_user.return_value.get_repo.return_value = mock_repo
-        mock_github.return_value = mock_github_instance
-        
-        commits = self.ingester.fetch_github_commits("test/repo", since_days=7)
+        with self._mock_github_api([{"sha": "test_sha_inc", "message": "Test commit message incremental", "days_ago": 1}]):
+            commits = self.ingester.fetch_github_commits("test/repo", since_days=7)
         assert len(commits) == 1
         assert commits[0]["sha"] == "test_sha_inc"
         assert "test_sha_inc" in self.ingester.processed_shas
 
-    @patch('ingest.Github')
-    def test_fetch_github_commits_batch(self, mock_github):
+    def test_fetch_github_commits_batch(self):
         """Test fetching GitHub commits in batch mode."""
-        mock_repo = Mock()
-        mock_commit1 = Mock()
-        mock_commit1.sha = "test_sha_batch1"
-        mock_commit1.commit.message = "Batch commit 1"
-        mock_commit1.commit.author.name = "Test Author"
-        mock_commit1.commit.author.date = datetime.now() - timedelta(days=10)
-        mock_commit1.html_url = "https://github.com/test/repo/commit/test_sha_batch1"
-
-        mock_commit2 = Mock()
-        mock_commit2.sha = "test_sha_batch2"
-        mock_commit2.commit.message = "Batch commit 2"
-        mock_commit2.commit.author.name = "Test Author"
-        mock_commit2.commit.author.date = datetime.now() - timedelta(days=20)
-        mock_commit2.html_url = "https://github.com/test/repo/commit/test_sha_batch2"
-        
-        mock_full_commit = Mock()
-        mock_full_commit.files = []
-        mock_repo.get_commit.return_value = mock_full_commit
-        mock_repo.get_commits.return_value = [mock_commit1, mock_commit2]
-        
-        mock_github_instance = Mock()
-        mock_github_instance.get_user.return_value.get_repo.return_value = mock_repo
-        mock_github.return_value = mock_github_instance
-        
-        commits = self.ingester.fetch_github_commits("test/repo", batch_mode=True)
+        with self._mock_github_api([
+            {"sha": "test_sha_batch1", "message": "Batch commit 1", "days_ago": 10},
+            {"sha": "test_sha_batch2", "message": "Batch commit 2", "days_ago": 20},
+        ]):
+            commits = self.ingester.fetch_github_commits("test/repo", batch_mode=True)
         assert len(commits) == 2
         assert "test_sha_batch1" in self.ingester.processed_shas
         assert "test_sha_batch2" in self.ingester.processed_shas
 
+    def test_fetch_github_commits_stops_at_processed_page(self):
+        """Test incremental listing stops requesting pages once a whole page is already processed."""
+        self.ingester.processed_shas.update({"sha_old1", "sha_old2"})
+        requested_pages = []
+
+        def handler(request):
+            requested_pages.append(request.url.params.get("page", "1"))
+            if request.url.params.get("page") == "2":
+                return httpx.Response(200, json=[{"sha": "sha_older"}])
+            next_link = '<https://api.github.com/repos/test/repo/commits?per_page=100&page=2>; rel="next"'
+            return httpx.Response(200, json=[{"sha": "sha_old1"}, {"sha": "sha_old2"}], headers={"Link": next_link})
+
+        with patch('ingest.httpx.AsyncClient', functools.partial(httpx.AsyncClient, transport=httpx.MockTransport(handler))):
+            assert self.ingester.fetch_github_commits("test/repo", since_days=7) == []
+        assert requested_pages == ["1"]
+
+    def test_fetch_github_commits_not_modified(self):
+        """Test the commit list is requested with the stored ETag and a 304 reuses the cached page."""
+        sent_etags = []
+
+        def handler(request):
+            if request.url.path == "/repos/test/repo/commits":
+                sent_etags.append(request.headers.get("If-None-Match"))
+                if request.headers.get("If-None-Match") == '"v1"':
+                    return httpx.Response(304)
+                return httpx.Response(200, json=[{"sha": "sha1"}], headers={"ETag": '"v1"'})
+            return httpx.Response(200, json={
+                "sha": "sha1",
+                "html_url": "https://github.com/test/repo/commit/sha1",
+                "commit": {"message": "One", "author": {"name": "Test Author", "date": "2024-01-02T03:04:05Z"}},
+                "files": [],
+            })
+
+        with patch('ingest.httpx.AsyncClient', functools.partial(httpx.AsyncClient, transport=httpx.MockTransport(handler))):
+            assert [c["sha"] for c in self.ingester.fetch_github_commits("test/repo", batch_mode=True)] == ["sha1"]
+            self.ingester.processed_shas.clear() # e.g. the post failed and the commit is retried
+            reloaded = Ingester("fake_github_token", "fake_notion_token", str(self.state_file))
+            reloaded.processed_shas.clear()
+            assert [c["sha"] for c in reloaded.fetch_github_commits("test/repo", batch_mode=True)] == ["sha1"]
+        assert sent_etags == [None, '"v1"']
+
+    def test_commit_list_etag_survives_incremental_runs(self):
+        """Test runs later on the same day send the same `since` and so the stored ETag."""
+        sent = []
+
+        def handler(request):
+            sent.append((request.url.params.get("since"), request.headers.get("If-None-Match")))
+            if request.headers.get("If-None-Match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, json=[], headers={"ETag": '"v1"'})
+
+        run_times = [datetime(2024, 1, 9, 8, 0, 1, tzinfo=timezone.utc), datetime(2024, 1, 9, 17, 30, 42, tzinfo=timezone.utc)]
+
+        class FakeDatetime(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return run_times.pop(0)
+
+        with patch('ingest.httpx.AsyncClient', functools.partial(httpx.AsyncClient, transport=httpx.MockTransport(handler))), \
+                patch('ingest.datetime', FakeDatetime):
+            assert self.ingester.fetch_github_commits("test/repo", since_days=7) == []
+            assert self.ingester.fetch_github_commits("test/repo", since_days=7) == []
+        assert sent == [("2024-01-02T00:00:00Z", None), ("2024-01-02T00:00:00Z", '"v1"')]
+
+    def test_commit_list_is_cut_off_at_the_exact_window(self):
+        """Test commits listed from the start of the day but before the requested window are left out, also from the cache."""
+        def handler(request):
+            if request.headers.get("If-None-Match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, headers={"ETag": '"v1"'}, json=[
+                {"sha": "new", "commit": {"committer": {"date": "2024-01-02T20:00:00Z"}}},
+                {"sha": "old", "commit": {"committer": {"date": "2024-01-02T09:00:00Z"}}},
+            ])
+
+        run_times = [datetime(2024, 1, 9, 17, 30, tzinfo=timezone.utc)] * 2
+
+        class FakeDatetime(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return run_times.pop(0)
+
+        with patch('ingest.httpx.AsyncClient', functools.partial(httpx.AsyncClient, transport=httpx.MockTransport(handler))), \
+                patch('ingest.datetime', FakeDatetime):
+            assert asyncio.run(self.ingester.list_github_commit_shas_async("test/repo", since_days=7)) == ["new"]
+            assert asyncio.run(self.ingester.list_github_commit_shas_async("test/repo", since_days=7)) == ["new"]
+
+    def test_iter_github_commits_streams_in_order(self):
+        """Test commit details are yielded in the given order while only a window of them is fetched ahead."""
+        from ingest import GITHUB_DETAIL_PREFETCH
+        shas = [f"sha{i:03d}" for i in range(3 * GITHUB_DETAIL_PREFETCH)]
+        requested = []
+
+        def handler(request):
+            sha = request.url.path.rsplit("/", 1)[-1]
+            requested.append(sha)
+            return httpx.Response(200, json={
+                "sha": sha,
+                "html_url": f"https://github.com/test/repo/commit/{sha}",
+                "commit": {"message": sha, "author": {"name": "Test Author", "date": "2024-01-02T03:04:05Z"}},
+                "files": [],
+            })
+
+        async def consume():
+            stream = self.ingester.iter_github_commits_async("test/repo", shas)
+            first = await anext(stream)
+            await asyncio.sleep(0.05) # Let the fetches ahead of the consumer run
+            fetched_ahead = len(requested)
+            rest = [commit["sha"] async for commit in stream]
+            await self.ingester.aclose()
+            return [first["sha"]] + rest, fetched_ahead
+
+        with patch('ingest.httpx.AsyncClient', functools.partial(httpx.AsyncClient, transport=httpx.MockTransport(handler))):
+            yielded, fetched_ahead = asyncio.run(consume())
+        assert yielded == shas
+        assert fetched_ahead <= GITHUB_DETAIL_PREFETCH + 1
+
+    def test_parse_commit_detail_spills_large_patch(self, tmp_path):
+        """Test large diffs are written to the patch cache and read back on demand."""
+        self.ingester.patch_cache_dir = str(tmp_path / "patches")
+        large_patch = "+" + "x" * 20000
+        commit = self.ingester._parse_commit_detail({
+            "sha": "sha_big",
+            "html_url": "https://github.com/test/repo/commit/sha_big",
+            "commit": {"message": "Big change", "author": {"name": "Test Author", "date": "2024-01-02T03:04:05Z"}},
+            "files": [
+                {"filename": "small.py", "status": "modified", "additions": 1, "deletions": 0, "changes": 1, "patch": "+x"},
+                {"filename": "big.py", "status": "added", "additions": 1, "deletions": 0, "changes": 1, "patch": large_patch},
+            ],
+        })
+        small, big = commit["files"]
+        assert small.patch == "+x" and small.patch_path is None
+        assert big.patch is None
+        assert big.patch_path == str(tmp_path / "patches" / "sha_big" / "1.diff")
+        assert big.read_patch() == large_patch
+
+    def test_retryable_github_errors(self):
+        """Test only transient GitHub API failures are retried."""
+        from ingest import _is_retryable_github_error
+
+        def status_error(status_code, **kwargs):
+            request = httpx.Request("GET", "https://api.github.com/repos/test/repo/commits")
+            return httpx.HTTPStatusError("error", request=request, response=httpx.Response(status_code, request=request, **kwargs))
+
+        assert _is_retryable_github_error(status_error(502))
+        assert _is_retryable_github_error(status_error(429))
+        assert _is_retryable_github_error(status_error(403, headers={"X-RateLimit-Remaining": "0"}))
+        assert _is_retryable_github_error(status_error(403, json={"message": "You have exceeded a secondary rate limit."}))
+        assert _is_retryable_github_error(httpx.ConnectError("refused"))
+        assert not _is_retryable_github_error(status_error(403, json={"message": "Resource not accessible by integration"}))
+        assert not _is_retryable_github_error(status_error(401))
+        assert not _is_retryable_github_error(status_error(404))
+
+    def test_github_api_client_reused(self):
+        """Test repeated fetches on one event loop share the GitHub API client until it is closed."""
+        async def fetch_twice():
+            with self._mock_github_api([{"sha": "sha1", "message": "One", "days_ago": 1}]):
+                await self.ingester.fetch_github_commits_async("test/repo", since_days=7)
+                first_client = self.ingester._api_client
+                await self.ingester.fetch_github_commits_async("test/repo", since_days=7)
+                assert self.ingester._api_client is first_client
+                await self.ingester.aclose()
+                assert first_client.is_closed
+
+        asyncio.run(fetch_twice())
+
+    def test_fetch_github_commits_concurrent_details(self):
+        """Test the commit list is paged through Link headers and details are parsed into commit dicts."""
+        self.ingester.processed_shas.add("sha_done")
+        requested = []
+
+        def handler(request):
+            requested.append(request.url.path)
+            if request.url.path == "/repos/test/repo/commits":
+                if request.url.params.get("page") == "2":
+                    return httpx.Response(200, json=[{"sha": "sha_gone"}])
+                assert request.url.params["per_page"] == "100"
+                assert "since" in request.url.params
+                next_link = '<https://api.github.com/repos/test/repo/commits?per_page=100&page=2>; rel="next"'
+                return httpx.Response(200, json=[{"sha": "sha_new"}, {"sha": "sha_done"}], headers={"Link": next_link})
+            if request.url.path.endswith("sha_gone"):
+                return httpx.Response(404)
+            return httpx.Response(200, json={
+                "sha": "sha_new",
+                "html_url": "https://github.com/test/repo/commit/sha_new",
+                "commit": {"message": "Add feature", "author": {"name": "Test Author", "date": "2024-01-02T03:04:05Z"}},
+                "files": [{"filename": "app.py", "status": "modified", "additions": 1, "deletions": 0,
+                           "changes": 1, "raw_url": "https://raw/app.py", "patch": "+x"}],
+            })
+
+        mock_client = functools.partial(httpx.AsyncClient, transport=httpx.MockTransport(handler))
+        with patch('ingest.httpx.AsyncClient', mock_client):
+            commits = self.ingester.fetch_github_commits("test/repo", since_days=7)
+
+        assert requested[:2] == ["/repos/test/repo/commits", "/repos/test/repo/commits"]
+        assert sorted(requested[2:]) == ["/repos/test/repo/commits/sha_gone", "/repos/test/repo/commits/sha_new"]
+        assert commits == [{
+            "sha": "sha_new",
+            "message": "Add feature",
+            "author": "Test Author",
+            "date": "2024-01-02T03:04:05+00:00",
+            "url": "https://github.com/test/repo/commit/sha_new",
+            "files": [FileChange("app.py", "modified", 1, 0, 1, "https://raw/app.py", "+x")],
+        }]
+        assert "sha_new" in self.ingester.processed_shas
+        assert "sha_gone" not in self.ingester.processed_shas
+
     @patch('ingest.Client')
     def test_fetch_notion_notes(self, mock_notion_client):
         """Test fetching Notion notes."""
@@ -150,6 +383,67 @@ class TestIngester:
         assert notes[0]["title"] == "Test Note 1"
         assert notes[0]["content"] == "Content of note 1.\n"
 
+    def test_fetch_notion_notes_blocks_concurrently(self):
+        """Test block content is fetched for every linked page and keyed by the commit SHA."""
+        notion = Mock()
+        notion.databases.query.return_value = {
+            "results": [
+                {"id": f"page_{sha}", "last_edited_time": "2023-01-01T10:00:00Z", "url": f"http://notion.so/{sha}",
+                 "properties": {"Name": {"type": "title", "title": [{"plain_text": f"Notes for {sha}"}]}}}
+                for sha in ("abc1234", "def5678")
+            ] + [{"id": "page_none", "properties": {"Name": {"type": "title", "title": [{"plain_text": "No SHA"}]}}}],
+            "has_more": False,
+            "next_cursor": None
+        }
+        def list_blocks(block_id, start_cursor=None):
+            text = f"More of {block_id}" if start_cursor else f"Content of {block_id}"
+            return {
+                "results": [{"type": "paragraph", "paragraph": {"rich_text": [{"plain_text": text}]}}],
+                "has_more": start_cursor is None,
+                "next_cursor": "cursor_2" if start_cursor is None else None
+            }
+
+        notion.blocks.children.list.side_effect = list_blocks
+        self.ingester.notion_client = notion
+
+        notes = self.ingester.fetch_notion_notes("test_db_id", since_date=None)
+        assert sorted(notes) == ["abc1234", "def5678"]
+        assert notes["def5678"]["content"] == "Content of page_def5678\nMore of page_def5678\n"
+        assert sorted(call.kwargs["block_id"] for call in notion.blocks.children.list.call_args_list) == [
+            "page_abc1234", "page_abc1234", "page_def5678", "page_def5678"
+        ]
+
+        notion.blocks.children.list.reset_mock()
+        notes = self.ingester.fetch_notion_notes("test_db_id", since_date=None, only_shas={"def5678"})
+        assert list(notes) == ["def5678"]
+        assert {call.kwargs["block_id"] for call in notion.blocks.children.list.call_args_list} == {"page_def5678"}
+
+    def test_match_notes_to_commits(self):
+        """Test note SHAs are resolved to full commit SHAs, skipping ambiguous ones and preferring longer ones."""
+        commits = ["abc1234" + "0" * 33, "abc1234" + "1" * 33, "def5678" + "2" * 33]
+        notes = {
+            "abc1234": {"title": "abc1234 is ambiguous"},
+            "abc12341": {"title": "abc12341 names the second commit"},
+            "def5678": {"title": "def5678 short"},
+            "def56782": {"title": "def56782 longer"},
+            "9999999": {"title": "9999999 not in this run"},
+        }
+        assert match_notes_to_commits(notes, commits) == {
+            commits[1]: {"title": "abc12341 names the second commit"},
+            commits[2]: {"title": "def56782 longer"},
+        }
+
+    def test_get_notion_page_title(self):
+        """Test the title is read from a commonly named property or, failing that, any title-typed one."""
+        def title_prop(*parts):
+            return {"type": "title", "title": [{"plain_text": part} for part in parts]}
+
+        assert self.ingester._get_notion_page_title({"properties": {"Name": title_prop("abc1234 ", "notes")}}) == "abc1234 notes"
+        assert self.ingester._get_notion_page_title({"properties": {
+            "Status": {"type": "select", "select": None}, "Commit note": title_prop("Custom"),
+        }}) == "Custom"
+        assert self.ingester._get_notion_page_title({"properties": {}}) == "Untitled"
+
 class TestTransformer:
     """Test cases for the Transformer module."""
 
@@ -224,6 +518,215 @@ class TestTransformer:
         result = self.transformer.generate_click_worthy_title("Test commit", "Blog content")
         assert result == "Title 1"
 
+class TestTransformCache:
+    """Test cases for the on-disk cache of generated content."""
+
+    def test_get_put_persists(self, tmp_path):
+        """Test generated content is found again by kind and prompt after reopening the cache."""
+        cache = TransformCache(str(tmp_path / "generated.db"))
+        assert cache.get("blog", "prompt") is None
+        cache.put("blog", "prompt", "post")
+        reopened = TransformCache(str(tmp_path / "generated.db"))
+        assert reopened.get("blog", "prompt") == "post"
+        assert reopened.get("title", "prompt") is None
+        assert reopened.get("blog", "other prompt") is None
+
+    @patch('transform.genai')
+    def test_transformer_uses_cache(self, mock_genai, tmp_path):
+        """Test a cached prompt is answered without calling Gemini and new responses are stored."""
+        model_configs = {key: {"name": f"model-{key}", "rpm": 0, "tpm": 1000} for key in ("blog", "summary", "linkedin", "title")}
+        model = mock_genai.GenerativeModel.return_value
+        model.model_name = "model-blog"
+        model.count_tokens_async = AsyncMock(return_value=Mock(total_tokens=1))
+        model.generate_content_async = AsyncMock(return_value=Mock(text="fresh post"))
+        cache = TransformCache(str(tmp_path / "generated.db"))
+        transformer = Transformer("fake_api_key", model_configs, cache=cache)
+
+        assert asyncio.run(transformer._call_gemini_async('blog', "prompt")) == "fresh post"
+        assert asyncio.run(transformer._call_gemini_async('blog', "prompt")) == "fresh post"
+        model.generate_content_async.assert_awaited_once_with("prompt")
+
+    @patch('transform.genai')
+    def test_generation_settings_are_part_of_the_cache_key(self, mock_genai, tmp_path):
+        """Test content generated with another output cap is not served from the cache."""
+        model = mock_genai.GenerativeModel.return_value
+        model.model_name = "model-title"
+        model.generate_content_async = AsyncMock(side_effect=[Mock(text="Short"), Mock(text="Longer title")])
+        cache = TransformCache(str(tmp_path / "generated.db"))
+        for max_output_tokens in (8, 64, 64):
+            model_configs = {key: {"name": "model-title", "rpm": 0, "tpm": 100000, "max_output_tokens": max_output_tokens}
+                             for key in ("blog", "summary", "linkedin", "title")}
+            transformer = Transformer("fake_api_key", model_configs, cache=cache)
+            asyncio.run(transformer._call_gemini_async('title', "prompt"))
+        assert model.generate_content_async.await_count == 2
+        assert cache.get('title:model-title:{"max_output_tokens":64}', "prompt") == "Longer title"
+
+    @patch('transform.genai')
+    def test_roles_sharing_a_model_share_the_strictest_limits(self, mock_genai):
+        """Test a model used by several roles gets one limiter with the lowest RPM and TPM configured for it."""
+        model_configs = {"blog": {"name": "flash", "rpm": 10, "tpm": 250000},
+                         "summary": {"name": "lite", "rpm": 15, "tpm": 250000},
+                         "linkedin": {"name": "flash", "rpm": 0, "tpm": 100000},
+                         "title": {"name": "flash", "rpm": 30, "tpm": 0}}
+        transformer = Transformer("fake_api_key", model_configs)
+        assert set(transformer.rate_limiters) == {"flash", "lite"}
+        assert transformer.rate_limiters["flash"].capacity == 100000
+        assert transformer.rate_limiters["flash"]._rpm_delay == 6.0
+
+    @patch('transform.genai')
+    def test_prompt_tokens_are_estimated_locally(self, mock_genai):
+        """Test small prompts are not counted by the API and the bucket is corrected from the reported usage."""
+        model_configs = {key: {"name": "model", "rpm": 0, "tpm": 1000} for key in ("blog", "summary", "linkedin", "title")}
+        model = mock_genai.GenerativeModel.return_value
+        model.model_name = "model"
+        model.count_tokens_async = AsyncMock(return_value=Mock(total_tokens=900))
+        model.generate_content_async = AsyncMock(return_value=Mock(text="post", usage_metadata=Mock(prompt_token_count=30)))
+        transformer = Transformer("fake_api_key", model_configs)
+        limiter = transformer.rate_limiters["model"]
+
+        assert asyncio.run(transformer._call_gemini_async('blog', "x" * 40)) == "post"
+        model.count_tokens_async.assert_not_awaited()
+        assert limiter.tokens == pytest.approx(970, abs=1)
+
+        asyncio.run(transformer._call_gemini_async('blog', "x" * 2400))
+        model.count_tokens_async.assert_awaited_once()
+
+class TestBatchedDiffSummaries:
+    """Test cases for summarizing a commit's large diffs in one Gemini call."""
+
+    @patch('transform.genai')
+    def test_large_diffs_share_one_call(self, mock_genai):
+        """Test large diffs are summarized together, small ones quoted and a file left out summarized alone."""
+        model_configs = {key: {"name": "model", "rpm": 0, "tpm": 100000} for key in ("blog", "summary", "linkedin", "title")}
+        model = mock_genai.GenerativeModel.return_value
+        model.model_name = "model"
+        model.generate_content_async = AsyncMock(side_effect=[
+            Mock(text='```json\n{"a.py": "Reworks a.", "b.py": "Adds b."}\n```'),
+            Mock(text="Cleans up c."),
+        ])
+        transformer = Transformer("fake_api_key", model_configs, batch_diff_summaries=True)
+        files = [FileChange(filename=name, status="modified", additions=0, deletions=0, changes=0, raw_url=None, patch=patch)
+                 for name, patch in (("a.py", "+a\n" * 500), ("small.py", "+tiny"), ("b.py", "+b\n" * 500),
+                                     ("c.py", "+c\n" * 500))]
+
+        summary = asyncio.run(transformer.summarize_diff(files))
+        assert summary == ("File: a.py (modified)\nSummary: Reworks a.\n\n"
+                           "File: small.py (modified)\n+tiny\n\n"
+                           "File: b.py (modified)\nSummary: Adds b.\n\n"
+                           "File: c.py (modified)\nSummary: Cleans up c.")
+        assert model.generate_content_async.await_count == 2
+
+class TestTrivialInputs:
+    """Test cases for generation requests answered without calling Gemini."""
+
+    @patch('transform.genai')
+    def test_nothing_to_write_about_skips_gemini(self, mock_genai):
+        """Test a commit without message, note or diff, and a blank post's title, make no Gemini call."""
+        model_configs = {key: {"name": "model", "rpm": 0, "tpm": 100000} for key in ("blog", "summary", "linkedin", "title")}
+        model = mock_genai.GenerativeModel.return_value
+        model.generate_content_async = AsyncMock()
+        transformer = Transformer("fake_api_key", model_configs)
+        empty_file = FileChange(filename="a.py", status="renamed", additions=0, deletions=0, changes=0, raw_url=None,
+                                patch=None)
+
+        assert asyncio.run(transformer.generate_blog_post("  ", [empty_file])) == ""
+        assert asyncio.run(transformer.generate_all("", [])) is None
+        assert asyncio.run(transformer.generate_linkedin_summary("", [empty_file])) == ""
+        assert asyncio.run(transformer.generate_click_worthy_title("", "fix: typo\n\nDetails")) == "fix: typo"
+        assert asyncio.run(transformer.generate_click_worthy_title(" ")) == "Default Blog Post Title"
+        model.generate_content_async.assert_not_awaited()
+
+class TestCondensePatch:
+    """Test cases for shortening large patches before they are summarized."""
+
+    def test_whole_hunks_are_kept_with_definitions_first(self):
+        """Test hunks are dropped whole, preferring those that change definitions, and stay in order."""
+        plain = "@@ -1,2 +1,2 @@\n-x = 1\n+x = 2\n"
+        definition = "@@ -10,2 +10,3 @@\n+def helper():\n+    return 1\n"
+        patch = plain * 3 + definition + plain
+        assert condense_patch(patch, len(patch)) == patch
+
+        condensed = condense_patch(patch, len(definition) + 2 * len(plain))
+        assert condensed == plain * 2 + definition + "\n... (2 hunks omitted)"
+
+    def test_context_lines_are_stripped(self):
+        """Test unchanged lines and no-newline markers are removed, hunk headers and changes kept."""
+        patch = "@@ -1,4 +1,4 @@ def f():\n a = 1\n-b = 2\n+b = 3\n c = 4\n\\ No newline at end of file\n@@ -9 +9 @@\n-x\n+y"
+        assert strip_context_lines(patch) == "@@ -1,4 +1,4 @@ def f():\n-b = 2\n+b = 3\n@@ -9 +9 @@\n-x\n+y"
+
+    def test_patch_without_fitting_hunks_is_truncated(self):
+        """Test a patch whose hunks don't fit is cut off at the limit."""
+        patch = "@@ -1 +1 @@\n" + "+" + "x" * 100 + "\n"
+        assert condense_patch(patch, 20) == patch[:20] + "\n... (diff truncated)"
+
+class TestServerRetryDelay:
+    """Test cases for reading the retry delay from Gemini rate limit errors."""
+
+    def test_retry_info_delay_is_read(self):
+        """Test the RetryInfo delay is found in REST-style and protobuf error details."""
+        from google.api_core import exceptions as google_exceptions
+        from google.rpc import error_details_pb2
+        rest_error = google_exceptions.ResourceExhausted(
+            "quota", details=[{"@type": "type.googleapis.com/google.rpc.QuotaFailure"},
+                              {"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": "27s"}])
+        assert server_retry_delay(rest_error) == 27.0
+
+        retry_info = error_details_pb2.RetryInfo()
+        retry_info.retry_delay.seconds = 5
+        assert server_retry_delay(google_exceptions.ResourceExhausted("quota", details=[retry_info])) == 5.0
+        assert server_retry_delay(google_exceptions.ResourceExhausted("quota")) is None
+
+class TestAsyncTokenRateLimiter:
+    """Test cases for the per-model TPM and RPM limits."""
+
+    def test_rpm_delay_spaces_concurrent_requests(self):
+        """Test concurrent callers get successive request slots and the first goes out at once."""
+        limiter = AsyncTokenRateLimiter(capacity=1000, refill_rate_per_minute=1000, rpm_limit=600)
+
+        async def request():
+            await limiter.enforce_rpm_delay()
+            return time.monotonic()
+
+        async def run():
+            start = time.monotonic()
+            return [sent - start for sent in await asyncio.gather(*[request() for _ in range(3)])]
+
+        sent = sorted(asyncio.run(run()))
+        assert sent[0] < 0.05
+        assert sent[1] == pytest.approx(0.1, abs=0.05) and sent[2] == pytest.approx(0.2, abs=0.05)
+
+class TestAdaptiveConcurrencyLimiter:
+    """Test cases for the AIMD limit on Gemini requests in flight."""
+
+    def test_limit_halves_on_rate_limiting_and_recovers(self):
+        """Test the limit caps requests in flight, halves on a 429 and grows by one per success."""
+        limiter = AdaptiveConcurrencyLimiter(4)
+        in_flight = []
+
+        async def request(rate_limited):
+            await limiter.acquire()
+            in_flight.append(limiter._in_flight)
+            await asyncio.sleep(0.01)
+            limiter.release(rate_limited)
+
+        async def run():
+            await asyncio.gather(*[request(False) for _ in range(10)])
+            assert max(in_flight) == 4
+            await asyncio.gather(request(True))
+            assert limiter.limit == 2
+            in_flight.clear()
+            await asyncio.gather(*[request(False) for _ in range(2)])
+            assert max(in_flight) == 2 and limiter.limit == 4
+
+        asyncio.run(run())
+
+class TestSanitizer:
+    """Test cases for the HTML sanitizer."""
+
+    def test_entities_are_normalized(self):
+        """Test characters written as entities in ASCII markup are NFKC-normalized once decoded."""
+        assert Sanitizer().fix_malformed_html("<p>Hello&nbsp;world &#xFB01;</p>", normalize=True) == "<p>Hello world fi</p>"
+
 class TestPublisher:
     """Test cases for the Publisher module."""
 
@@ -258,6 +761,209 @@ class TestPublisher:
         assert image_url == "http://test.com/image.png"
         self.mock_client_instance.call.assert_called_once()
 
+    def test_identical_media_is_uploaded_once(self, tmp_path):
+        """Test a file with the same content as an earlier upload reuses its URL."""
+        first = tmp_path / "first.png"
+        first.write_bytes(b"same image data")
+        copy = tmp_path / "copy.png"
+        copy.write_bytes(b"same image data")
+
+        self.mock_client_instance.call.return_value = {"url": "http://test.com/first.png"}
+        assert self.publisher.upload_media(str(first)) == "http://test.com/first.png"
+        assert self.publisher.upload_media(str(copy)) == "http://test.com/first.png"
+        self.mock_client_instance.call.assert_called_once()
+
+    def test_calls_share_one_connection(self):
+        """Test successive XML-RPC calls reuse a single keep-alive connection to WordPress."""
+        from xmlrpc.server import SimpleXMLRPCServer, SimpleXMLRPCRequestHandler
+
+        class KeepAliveHandler(SimpleXMLRPCRequestHandler):
+            protocol_version = "HTTP/1.1"
+            rpc_paths = ("/xmlrpc.php",)
+
+        connections = []
+
+        class CountingServer(SimpleXMLRPCServer):
+            def get_request(self):
+                request = super().get_request()
+                connections.append(request[1])
+                return request
+
+        server = CountingServer(("127.0.0.1", 0), requestHandler=KeepAliveHandler, logRequests=False, allow_none=True)
+        server.register_function(lambda: ["wp.newPost"], "mt.supportedMethods")
+        server.register_function(lambda *args: "42", "wp.newPost")
+        threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        try:
+            publisher = Publisher(f"http://127.0.0.1:{server.server_address[1]}/xmlrpc.php", "user", "pass")
+            assert publisher.publish_post("One", "<p>1</p>") == "42"
+            assert publisher.publish_post("Two", "<p>2</p>") == "42"
+            publisher.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert len(connections) == 1
+
+    def test_large_requests_are_gzipped_when_enabled(self):
+        """Test requests over the threshold are sent gzipped only when request compression is enabled."""
+        from xmlrpc.server import SimpleXMLRPCServer, SimpleXMLRPCRequestHandler
+
+        encodings = []
+
+        class Handler(SimpleXMLRPCRequestHandler):
+            rpc_paths = ("/xmlrpc.php",)
+
+            def do_POST(self):
+                encodings.append(self.headers.get("Content-Encoding"))
+                super().do_POST()
+
+        server = SimpleXMLRPCServer(("127.0.0.1", 0), requestHandler=Handler, logRequests=False, allow_none=True)
+        server.register_function(lambda: ["wp.newPost"], "mt.supportedMethods")
+        server.register_function(lambda blog_id, username, password, content: str(len(content["post_content"])), "wp.newPost")
+        threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/xmlrpc.php"
+            for compress_requests in (False, True):
+                publisher = Publisher(url, "user", "pass", compress_requests=compress_requests)
+                assert publisher.publish_post("Short", "<p>1</p>") == "8"
+                assert publisher.publish_post("Long", "<p>" + "x" * 5000 + "</p>") == "5007"
+                publisher.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+        # Only the long post of the compressing publisher is gzipped
+        assert encodings[-1] == "gzip" and encodings.count("gzip") == 1
+
+    def test_publish_posts_batch_uses_one_multicall(self):
+        """Test a batch of posts is sent as one system.multicall request, with per-post failures reported as None."""
+        from xmlrpc.server import SimpleXMLRPCServer, SimpleXMLRPCRequestHandler
+
+        class Handler(SimpleXMLRPCRequestHandler):
+            rpc_paths = ("/xmlrpc.php",)
+
+        titles = []
+
+        def new_post(blog_id, username, password, content):
+            titles.append(content["post_title"])
+            if content["post_title"] == "Bad":
+                raise ValueError("rejected")
+            return str(len(titles))
+
+        server = SimpleXMLRPCServer(("127.0.0.1", 0), requestHandler=Handler, logRequests=False, allow_none=True)
+        server.register_multicall_functions()
+        server.register_function(lambda: ["wp.newPost", "system.multicall"], "mt.supportedMethods")
+        server.register_function(new_post, "wp.newPost")
+        threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        try:
+            publisher = Publisher(f"http://127.0.0.1:{server.server_address[1]}/xmlrpc.php", "user", "pass")
+            with patch.object(publisher, "publish_post") as publish_post:
+                post_ids = publisher.publish_posts_batch([
+                    {"title": "One", "content_html": "<p>1</p>", "tags": ["a"]},
+                    {"title": "Bad", "content_html": "<p>2</p>"},
+                    {"title": "Three", "content_html": "<p>3</p>", "categories": ["c"]},
+                ])
+            publisher.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert post_ids == ["1", None, "3"]
+        assert titles == ["One", "Bad", "Three"]
+        publish_post.assert_not_called()
+
+    def test_publish_posts_batch_fallback_reports_failures(self):
+        """Test without system.multicall each post is published on its own and a failing one yields None."""
+        self.mock_client_instance.supported_methods = []
+        with patch.object(self.publisher, "publish_post",
+                          side_effect=["1", xmlrpc.client.Fault(403, "Sorry, you are not allowed to do that."), "3"]):
+            post_ids = self.publisher.publish_posts_batch([
+                {"title": "One", "content_html": "<p>1</p>"},
+                {"title": "Bad", "content_html": "<p>2</p>"},
+                {"title": "Three", "content_html": "<p>3</p>"},
+            ])
+        assert post_ids == ["1", None, "3"]
+
+    def test_ensure_category_exists_caches_terms(self):
+        """Test the category list is fetched once and created categories are remembered."""
+        existing = SimpleNamespace(name="Development")
+        self.mock_client_instance.call.return_value = [existing]
+
+        assert self.publisher.ensure_category_exists("Development") is True
+        assert self.publisher.ensure_category_exists("News") is True
+        assert self.publisher.ensure_category_exists("News") is True
+        called = [call.args[0].method_name for call in self.mock_client_instance.call.call_args_list]
+        assert called == ["wp.getTerms", "wp.newTerm"]
+
+        self.publisher.invalidate_category_cache()
+        self.publisher.ensure_category_exists("News")
+        called = [call.args[0].method_name for call in self.mock_client_instance.call.call_args_list]
+        assert called == ["wp.getTerms", "wp.newTerm", "wp.getTerms", "wp.newTerm"]
+
+    def test_ensure_category_exists_reloads_terms_after_fault(self):
+        """Test a failed term creation drops the cached names, so the retry sees a category created elsewhere."""
+        existing = SimpleNamespace(name="News")
+        self.mock_client_instance.call.side_effect = [[], xmlrpc.client.Fault(500, "A term with the name provided already exists."), [existing]]
+        with patch("time.sleep"):
+            assert self.publisher.ensure_category_exists("News") is True
+        called = [call.args[0].method_name for call in self.mock_client_instance.call.call_args_list]
+        assert called == ["wp.getTerms", "wp.newTerm", "wp.getTerms"]
+
+    def test_prewarmed_terms_are_sent_by_id(self):
+        """Test prewarmed categories and tags are looked up once and sent by ID, others still by name."""
+        existing = SimpleNamespace(name="Development", id="7")
+        self.mock_client_instance.supported_methods = []
+        self.mock_client_instance.call.side_effect = [[existing], [], "12"]
+        self.publisher.prewarm_terms(categories=["Development"], tags=["automated"])
+        called = [call.args[0].method_name for call in self.mock_client_instance.call.call_args_list]
+        assert called == ["wp.getTerms", "wp.getTerms", "wp.newTerm"]
+
+        post = self.publisher._build_post("Title", "<p>Body</p>", ["automated", "new-tag"], ["Development"], "publish")
+        assert sorted((term.taxonomy, term.id) for term in post.terms) == [("category", "7"), ("post_tag", "12")]
+        assert post.terms_names == {"post_tag": ["new-tag"]}
+
+    def test_prewarm_terms_batches_lookups_and_creations(self):
+        """Test the term lookups go out in one system.multicall request and the creations in another."""
+        from xmlrpc.server import SimpleXMLRPCServer, SimpleXMLRPCRequestHandler
+
+        requests = []
+
+        class Handler(SimpleXMLRPCRequestHandler):
+            rpc_paths = ("/xmlrpc.php",)
+
+            def do_POST(self):
+                requests.append(self.path)
+                super().do_POST()
+
+        terms = {"category": [{"term_id": "7", "name": "Development", "taxonomy": "category"}], "post_tag": []}
+        server = SimpleXMLRPCServer(("127.0.0.1", 0), requestHandler=Handler, logRequests=False, allow_none=True)
+        server.register_multicall_functions()
+        server.register_function(lambda: ["wp.getTerms", "wp.newTerm", "system.multicall"], "mt.supportedMethods")
+        server.register_function(lambda blog_id, username, password, taxonomy: terms[taxonomy], "wp.getTerms")
+        server.register_function(lambda blog_id, username, password, content: f"new-{content['name']}", "wp.newTerm")
+        threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        try:
+            publisher = Publisher(f"http://127.0.0.1:{server.server_address[1]}/xmlrpc.php", "user", "pass")
+            requests.clear()
+            publisher.prewarm_terms(categories=["Development", "News"], tags=["automated", "github"])
+            publisher.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert len(requests) == 2
+        assert publisher._term_ids == {("category", "Development"): "7", ("category", "News"): "new-News",
+                                       ("post_tag", "automated"): "new-automated", ("post_tag", "github"): "new-github"}
+
+    def test_permanent_faults_are_not_retried(self):
+        """Test WordPress faults are retried unless they are permission or argument errors."""
+        from publisher import _is_retryable_wordpress_fault
+        assert _is_retryable_wordpress_fault(xmlrpc.client.Fault(500, "Could not insert post into the database."))
+        assert not _is_retryable_wordpress_fault(xmlrpc.client.Fault(403, "Incorrect username or password."))
+        assert not _is_retryable_wordpress_fault(xmlrpc.client.Fault(401, "Sorry, you are not allowed to publish posts."))
+        assert not _is_retryable_wordpress_fault(ValueError("not a fault"))
+
+        self.mock_client_instance.call.side_effect = xmlrpc.client.Fault(403, "Incorrect username or password.")
+        with pytest.raises(xmlrpc.client.Fault):
+            self.publisher.publish_post("Title", "<p>Body</p>")
+        self.mock_client_instance.call.assert_called_once()
+
     def test_guess_mime_type(self):
         """Test MIME type guessing."""
         assert self.publisher._guess_mime_type("image.png") == "image/png"
@@ -277,18 +983,20 @@ class TestExporter:
         )
         self.export_path.mkdir(exist_ok=True)
 
-    @patch('exporter.requests.get')
+    @patch('exporter.requests.Session.get')
     def test_trigger_simply_static_export(self, mock_get):
         """Test triggering Simply Static export."""
         mock_response = Mock()
         mock_response.raise_for_status.return_value = None
-        mock_response.text = "Export triggered"
+        mock_response.raw.read.return_value = b"Export triggered"
         mock_get.return_value = mock_response
         
         result = self.exporter.trigger_simply_static_export()
         assert result is True
-        mock_get.assert_called_once_with(self.exporter.simply_static_export_trigger_url, timeout=60)
+        mock_get.assert_called_once_with(self.exporter.simply_static_export_trigger_url, timeout=60, stream=True)
+        mock_response.close.assert_called_once()
 
+    @patch('exporter.INotify', None)
     @patch('exporter.time.sleep')
     def test_wait_for_export_completion(self, mock_sleep):
         """Test waiting for export completion."""
@@ -303,8 +1011,66 @@ class TestExporter:
 
         mock_sleep.side_effect = simulate_files_appear
 
-        result = self.exporter.wait_for_export_completion(timeout=10, check_interval=1)
+        result = self.exporter.wait_for_export_completion(timeout=10, check_interval=1, completion_marker=None)
+        assert result is True
+
+    @patch('exporter.time.sleep')
+    def test_wait_for_export_completion_marker(self, mock_sleep):
+        """Test waiting returns as soon as the completion marker is written by the current export."""
+        marker = self.export_path / "index.html"
+        marker.write_text("old export")
+        os.utime(marker, (0, 0))
+
+        def export_finishes(*args, **kwargs):
+            if mock_sleep.call_count == 3:
+                (self.export_path / "post.html").write_text("post")
+                marker.write_text("new export")
+
+        mock_sleep.side_effect = export_finishes
+        assert self.exporter.wait_for_export_completion(timeout=10, check_interval=1, completion_marker="index.html") is True
+        assert [round(call.args[0], 3) for call in mock_sleep.call_args_list] == [0.1, 0.15, 0.225]
+        # Files may still be written after the marker, so the whole export is staged
+        assert self.exporter.get_changed_files() is None
+
+    @patch('exporter.time.sleep')
+    @patch('exporter.requests.Session.get')
+    def test_wait_for_export_completion_status_url(self, mock_get, mock_sleep):
+        """Test waiting for export completion by polling the status URL."""
+        running = Mock(status_code=200)
+        running.json.return_value = {"status": "running"}
+        done = Mock(status_code=200)
+        done.json.return_value = {"status": "done"}
+        mock_get.side_effect = [Mock(status_code=503), running, done]
+
+        status_exporter = Exporter(
+            wordpress_url="http://test.com",
+            simply_static_export_trigger_url="http://test.com/export",
+            export_path=str(self.export_path),
+            status_url="http://test.com/export-status"
+        )
+        assert status_exporter.wait_for_export_completion(timeout=10) is True
+        assert mock_get.call_count == 3
+        assert [call.args[0] for call in mock_sleep.call_args_list] == [0.1, 0.2]
+
+    @pytest.mark.skipif(exporter.INotify is None, reason="inotify_simple is not available")
+    def test_wait_for_export_completion_events(self):
+        """Test waiting for export completion using file events."""
+        def write_files():
+            for i in range(3):
+                (self.export_path / f"file_{i}.html").write_text("content")
+
+        writer = threading.Timer(0.2, write_files)
+        writer.start()
+        result = self.exporter.wait_for_export_completion(timeout=10, check_interval=1, completion_marker=None)
+        writer.join()
         assert result is True
+        assert sorted(self.exporter.get_changed_files()) == ["file_0.html", "file_1.html", "file_2.html"]
+
+def git_responses(**stdout_by_subcommand):
+    """Returns a `subprocess.run` side effect answering each git command by subcommand, with empty output by default."""
+    def run(command, *args, **kwargs):
+        return subprocess.CompletedProcess(command, 0, stdout_by_subcommand.get(command[1].replace("-", "_"), b""), b"")
+    return run
 
 class TestDeployer:
     """Test cases for the Deployer module."""
@@ -328,39 +1094,165 @@ class TestDeployer:
     @patch('deployer.subprocess.run')
     def test_initialize_repo_new(self, mock_subprocess_run):
         """Test initializing a new Git repository."""
-        mock_subprocess_run.return_value = Mock(returncode=0, stdout="", stderr="")
+        mock_subprocess_run.return_value = Mock(returncode=0, stdout=b"", stderr=b"")
         result = self.deployer.initialize_repo()
         assert result is True
         assert mock_subprocess_run.call_count == 3 # init, remote add, checkout
 
+    @patch('deployer.asyncio.create_subprocess_exec')
+    def test_initialize_repo_async_new(self, mock_create_subprocess_exec):
+        """Test initializing a new Git repository with concurrent remote/checkout commands."""
+        mock_process = Mock(returncode=0)
+        mock_process.communicate = AsyncMock(return_value=(b"", b""))
+        mock_create_subprocess_exec.return_value = mock_process
+        result = asyncio.run(self.deployer.initialize_repo_async())
+        assert result is True
+        commands = [call.args[1] for call in mock_create_subprocess_exec.call_args_list]
+        assert commands == ["init", "remote", "checkout"]
+
+    @patch('deployer.subprocess.run')
+    def test_local_git_command_not_retried(self, mock_subprocess_run):
+        """Test a failing local git command surfaces immediately instead of being retried."""
+        mock_subprocess_run.side_effect = subprocess.CalledProcessError(128, ["git", "status"], stderr=b"fatal")
+        with pytest.raises(subprocess.CalledProcessError):
+            self.deployer._run_git_command(["status"])
+        assert mock_subprocess_run.call_count == 1
+
+    @patch('deployer.time.sleep')
+    @patch('deployer.subprocess.run')
+    def test_network_git_command_retried(self, mock_subprocess_run, mock_sleep):
+        """Test a failing push is retried with backoff and re-raised after the last attempt."""
+        mock_subprocess_run.side_effect = subprocess.CalledProcessError(1, ["git", "push"], stderr=b"timeout")
+        with pytest.raises(subprocess.CalledProcessError):
+            self.deployer._run_git_command_network(["push", "origin", "gh-pages"])
+        assert mock_subprocess_run.call_count == 3
+        assert [call.args[0] for call in mock_sleep.call_args_list] == [4, 8]
+
+    @patch('deployer.time.sleep')
+    @patch('deployer.subprocess.run')
+    def test_rejected_push_not_retried(self, mock_subprocess_run, mock_sleep):
+        """Test a push rejected for a stale lease fails at once instead of being retried."""
+        mock_subprocess_run.side_effect = subprocess.CalledProcessError(
+            1, ["git", "push"], stderr=b" ! [rejected]        gh-pages -> gh-pages (stale info)\nerror: failed to push some refs")
+        with pytest.raises(subprocess.CalledProcessError):
+            self.deployer._run_git_command_network(["push", "--force-with-lease=refs/heads/gh-pages:c1", "origin", "gh-pages"])
+        assert mock_subprocess_run.call_count == 1
+        mock_sleep.assert_not_called()
+
     @patch('deployer.subprocess.run')
     def test_deploy_no_changes(self, mock_subprocess_run):
         """Test deploy when there are no changes to commit."""
-        # Mock git status --porcelain to return empty string (no changes)
-        mock_subprocess_run.side_effect = [
-            Mock(returncode=0, stdout="", stderr=""), # for initialize_repo
-            Mock(returncode=0, stdout="", stderr=""), # for git add .
-            Mock(returncode=0, stdout="", stderr="")  # for git status --porcelain
-        ]
+        # Mock git write-tree to return the tree the remote branch already has (no changes)
+        mock_subprocess_run.side_effect = git_responses(for_each_ref=b"c1 tree1\n", write_tree=b"tree1\n")
         result = self.deployer.deploy()
         assert result is True
-        # Should not call git commit or git push
-        assert mock_subprocess_run.call_count == 3 # initialize_repo calls + git add + git status
+        # Should not call git push
+        assert mock_subprocess_run.call_count == 6 # initialize_repo calls + git add + git for-each-ref + git write-tree
 
     @patch('deployer.subprocess.run')
     def test_deploy_with_changes(self, mock_subprocess_run):
         """Test deploy when there are changes to commit."""
-        # Mock git status --porcelain to return changes
-        mock_subprocess_run.side_effect = [
-            Mock(returncode=0, stdout="", stderr=""), # for initialize_repo
-            Mock(returncode=0, stdout="", stderr=""), # for git add .
-            Mock(returncode=0, stdout="M some_file.txt", stderr=""), # for git status --porcelain
-            Mock(returncode=0, stdout="", stderr=""), # for git commit
-            Mock(returncode=0, stdout="", stderr="")  # for git push
-        ]
+        # Mock git write-tree to return a tree that differs from the remote branch
+        mock_subprocess_run.side_effect = git_responses(for_each_ref=b"c1 tree1\n", write_tree=b"tree2\n", commit_tree=b"c2\n")
         result = self.deployer.deploy()
         assert result is True
-        assert mock_subprocess_run.call_count == 5 # initialize_repo calls + git add + git status + git commit + git push
+        assert mock_subprocess_run.call_count == 9 # initialize_repo calls + git add + refs/tree lookups + commit-tree + update-ref + push
+        push_command = mock_subprocess_run.call_args_list[-1].args[0]
+        assert push_command == ["git", "push", "--force-with-lease=refs/heads/gh-pages:c1", "origin", "gh-pages"]
+
+    @patch('deployer.subprocess.run')
+    def test_deploy_reuses_prepared_repo(self, mock_subprocess_run):
+        """Test a second deploy from the same Deployer skips repository preparation."""
+        mock_subprocess_run.return_value = Mock(returncode=0, stdout=b"", stderr=b"")
+        assert self.deployer.deploy() is True
+        (self.local_repo_path / ".git").mkdir()
+        assert self.deployer.deploy() is True
+        commands = [call.args[0][1] for call in mock_subprocess_run.call_args_list]
+        assert commands.count("checkout") == 1
+        assert commands.count("push") == 2
+
+    @patch('deployer.subprocess.run')
+    def test_deploy_skips_unchanged_tree(self, mock_subprocess_run):
+        """Test deploy skips all git commands when the tree matches the last deployed fingerprint."""
+        (self.local_repo_path / ".git").mkdir()
+        (self.local_repo_path / "index.html").write_text("<h1>Blog</h1>")
+        mock_subprocess_run.return_value = Mock(returncode=0, stdout=b"", stderr=b"")
+        assert self.deployer.deploy() is True
+        calls_after_first_deploy = mock_subprocess_run.call_count
+
+        assert self.deployer.deploy() is True
+        assert mock_subprocess_run.call_count == calls_after_first_deploy
+
+        (self.local_repo_path / "post.html").write_text("<p>New post</p>")
+        assert self.deployer.deploy() is True
+        assert mock_subprocess_run.call_count > calls_after_first_deploy
+
+    @patch('deployer.subprocess.run')
+    def test_deploy_with_changed_files(self, mock_subprocess_run):
+        """Test deploy hashes and stages only the given paths and skips git when none changed."""
+        assert self.deployer.deploy(changed_files=[]) is True
+        mock_subprocess_run.assert_not_called()
+
+        (self.local_repo_path / "posts").mkdir()
+        (self.local_repo_path / "index.html").write_text("<h1>Blog</h1>")
+        (self.local_repo_path / "posts" / "one.html").write_text("<p>Post</p>")
+
+        def run_git(command, **kwargs):
+            stdout = b""
+            if command[1] == "hash-object":
+                stdout = b"blob1\nblob2\n"
+            elif command[1:3] == ["ls-files", "--deleted"]:
+                stdout = b"deleted.html\0posts/removed.html\0"
+            return Mock(returncode=0, stdout=stdout, stderr=b"")
+
+        mock_subprocess_run.side_effect = run_git
+        result = self.deployer.deploy(changed_files=["index.html", "posts/one.html", "deleted.html"])
+        assert result is True
+        calls = {call.args[0][1]: call for call in mock_subprocess_run.call_args_list}
+        assert "add" not in calls
+        assert calls["hash-object"].kwargs["input"] == b"index.html\nposts/one.html\n"
+        assert calls["update-index"].kwargs["input"].split(b"\0")[:4] == [
+            b"0 0000000000000000000000000000000000000000\tposts/removed.html",
+            b"0 0000000000000000000000000000000000000000\tdeleted.html",
+            b"100644 blob1\tindex.html",
+            b"100644 blob2\tposts/one.html",
+        ]
+
+    @patch('deployer.subprocess.run')
+    def test_deploy_skips_unchanged_blobs(self, mock_subprocess_run):
+        """Test files rewritten with identical content are not re-hashed by git."""
+        (self.local_repo_path / "index.html").write_bytes(b"<h1>Blog</h1>")
+        (self.local_repo_path / "new.html").write_bytes(b"<p>New</p>")
+        index_sha = hashlib.sha1(b"blob 13\0<h1>Blog</h1>").hexdigest()
+
+        def run_git(command, **kwargs):
+            stdout = b""
+            if command[1:3] == ["ls-files", "-s"]:
+                stdout = f"100644 {index_sha} 0\tindex.html\0".encode()
+            elif command[1] == "hash-object":
+                stdout = b"blob2\n"
+            return Mock(returncode=0, stdout=stdout, stderr=b"")
+
+        mock_subprocess_run.side_effect = run_git
+        assert self.deployer.deploy(changed_files=["index.html", "new.html"]) is True
+        calls = {call.args[0][1]: call for call in mock_subprocess_run.call_args_list}
+        assert calls["hash-object"].kwargs["input"] == b"new.html\n"
+        assert calls["update-index"].kwargs["input"] == b"100644 blob2\tnew.html\0"
+
+    @patch('deployer.subprocess.run')
+    def test_deploy_oneshot(self, mock_subprocess_run):
+        """Test the one-shot deploy runs every git step in a single shell invocation."""
+        mock_subprocess_run.return_value = Mock(returncode=0, stdout=b"", stderr=b"")
+        assert self.deployer.deploy_oneshot("Release; rm -rf /") is True
+        assert mock_subprocess_run.call_count == 1
+        command = mock_subprocess_run.call_args.args[0]
+        assert command[:2] == ["/bin/sh", "-c"]
+        assert "-m 'Release; rm -rf /'" in command[2]
+        assert 'git push "$lease" origin gh-pages' in command[2]
+
+        mock_subprocess_run.return_value = Mock(returncode=1, stdout=b"", stderr=b"fatal: rejected")
+        (self.local_repo_path / "index.html").write_text("<h1>Blog</h1>")
+        assert self.deployer.deploy_oneshot() is False
 
 # Integration test outline
 class TestIntegration:
@@ -441,7 +1333,7 @@ class TestIntegration:
         mock_ingester_class.assert_called_once_with(
             github_token="mock_gh_token",
             notion_token="mock_notion_token",
-            state_file="processed_state.json"
+            state_file="processed_state.db"
         )
         mock_ingester_instance.fetch_github_commits.assert_called_once_with("mock_user/mock_repo", since_days=1)
         mock_ingester_instance.fetch_notion_notes.assert_called_once() # Called with since_date
@@ -481,6 +1373,116 @@ class TestIntegration:
         # This would require inspecting the file system or mocking os.makedirs/open
         # For now, we'll assume the main.py logic handles this correctly based on the mock
 
+    def test_deploy_if_needed_remembers_failed_deployments(self, tmp_path, monkeypatch):
+        """Test the site is deployed only while published posts are pending, including those of a failed run."""
+        import main
+        monkeypatch.chdir(tmp_path)
+        export_and_deploy = AsyncMock(return_value=False)
+        monkeypatch.setattr(main, "export_and_deploy", export_and_deploy)
+
+        asyncio.run(main.deploy_if_needed({}, Mock(), Mock(), []))
+        export_and_deploy.assert_not_awaited()
+
+        asyncio.run(main.deploy_if_needed({}, Mock(), Mock(), ["12"]))
+        assert main.load_pending_deploy() == ["12"]
+
+        export_and_deploy.return_value = True
+        asyncio.run(main.deploy_if_needed({}, Mock(), Mock(), []))
+        assert export_and_deploy.await_count == 2
+        assert main.load_pending_deploy() == []
+
+        asyncio.run(main.deploy_if_needed({}, Mock(), Mock(), [], force=True))
+        assert export_and_deploy.await_count == 3
+
+    def test_slow_linkedin_summary_does_not_hold_up_the_next_post(self, tmp_path, monkeypatch):
+        """Test posts are published in commit order without waiting for earlier LinkedIn summaries."""
+        import main
+        monkeypatch.chdir(tmp_path)
+        config = {
+            "github_token": "token", "github_repo": "owner/repo", "github_repo_name": "repo", "gemini_api_key": "key",
+            "notion_token": None, "notion_database_id": None, "model_configs": {}, "wp_url": "http://wp.local",
+            "wp_xmlrpc_url": "http://wp.local/xmlrpc.php", "wp_username": "user", "wp_app_password": "pass",
+            "wp_compress_requests": False, "simply_static_trigger_url": None, "simply_static_status_url": None,
+            "simply_static_export_path": str(tmp_path), "simply_static_completion_marker": "",
+            "github_pages_repo_url": "https://github.com/owner/pages.git", "deploy_oneshot": False,
+            "combined_generation": False, "batch_diff_summaries": False, "skip_empty_commits": False,
+            "transform_concurrency": 4, "pipeline_concurrency": 1, "context_max_chars": 0,
+        }
+        commits = [{"sha": f"{i}" * 40, "message": f"Commit {i}", "files": [], "date": f"2024-01-0{i + 1}T00:00:00+00:00"}
+                   for i in range(2)]
+        events = []
+
+        async def commit_stream(repo, shas):
+            for commit in commits:
+                yield commit
+
+        async def linkedin_summary(commit_message, **kwargs):
+            await asyncio.sleep(0.5 if commit_message == "Commit 0" else 0)
+            events.append(("linkedin", commit_message))
+            return "Summary"
+
+        def publish_post(title, **kwargs):
+            events.append(("publish", title))
+            return title
+
+        with patch.object(main, "load_env_variables", return_value=config), patch.object(main, "Ingester") as ingester_class, \
+                patch.object(main, "Transformer") as transformer_class, patch.object(main, "Publisher") as publisher_class, \
+                patch.object(main, "Exporter"), patch.object(main, "Deployer"), patch.object(main, "export_and_deploy", AsyncMock()):
+            ingester = ingester_class.return_value
+            ingester.list_github_commit_shas_async = AsyncMock(return_value=[commit["sha"] for commit in commits])
+            ingester.iter_github_commits_async = commit_stream
+            ingester.aclose = AsyncMock()
+            transformer = transformer_class.return_value
+            transformer.summarize_diff = AsyncMock(return_value="diff")
+            transformer.generate_blog_post = AsyncMock(side_effect=lambda commit_message, **kwargs: f"Post for {commit_message}")
+            transformer.generate_click_worthy_title = AsyncMock(side_effect=lambda commit_message, **kwargs: commit_message)
+            transformer.generate_linkedin_summary = linkedin_summary
+            publisher_class.return_value.publish_post = publish_post
+            asyncio.run(main.run_pipeline("incremental", 1))
+
+        assert events.index(("publish", "Commit 1")) < events.index(("linkedin", "Commit 0"))
+        assert [event for event in events if event[0] == "publish"] == [("publish", "Commit 0"), ("publish", "Commit 1")]
+
+    def test_post_context_drops_oldest_posts_in_one_go(self):
+        """Test the context keeps every post without a budget and halves itself once the budget is exceeded."""
+        from main import PostContext
+        unbounded = PostContext()
+        for sha in ("aaa", "bbb"):
+            unbounded.add(sha, "post")
+        assert str(unbounded) == "\n\n--- Blog Post for Commit aaa ---\npost\n\n--- Blog Post for Commit bbb ---\npost"
+
+        bounded = PostContext(max_chars=200)
+        sizes = []
+        for index in range(4):
+            bounded.add(f"sha{index}", "x" * 30)
+            sizes.append(str(bounded).count("--- Blog Post"))
+        assert sizes == [1, 2, 3, 1]
+        assert "sha3" in str(bounded) and "sha2" not in str(bounded)
+
+    def test_ignore_pattern_matches_the_whole_word(self):
+        """Test only commits with the word 'ignore' in their subject are skipped."""
+        from main import IGNORE_PATTERN
+        assert IGNORE_PATTERN.search("[IGNORE] bump version")
+        assert IGNORE_PATTERN.search("wip: ignore this")
+        assert not IGNORE_PATTERN.search("Update .gitignore")
+        assert not IGNORE_PATTERN.search("Handle ignored files")
+
+    def test_missing_env_variables_raise_config_error(self, monkeypatch):
+        """Test missing required variables are reported together as a ConfigError instead of exiting."""
+        from main import load_env_variables, ConfigError
+        for var in ("GITHUB_TOKEN", "GITHUB_REPO", "GEMINI_API_KEY", "WP_XMLRPC_URL", "WP_USERNAME",
+                    "WP_APP_PASSWORD", "SIMPLY_STATIC_EXPORT_PATH", "GITHUB_PAGES_REPO_URL"):
+            monkeypatch.delenv(var, raising=False)
+        monkeypatch.setenv("GITHUB_TOKEN", "token")
+        load_env_variables.cache_clear()
+        try:
+            with pytest.raises(ConfigError) as excinfo:
+                load_env_variables()
+        finally:
+            load_env_variables.cache_clear()
+        assert "GITHUB_REPO" in str(excinfo.value) and "GITHUB_PAGES_REPO_URL" in str(excinfo.value)
+        assert "GITHUB_TOKEN" not in str(excinfo.value)
+
 if __name__ == "__main__":
     # Run tests with: python -m pytest test_modules.py -v
     pytest.main([__file__, "-v"])
@@ -5,65 +5,335 @@ Ingestion Module: Handles fetching data from GitHub and Notion, and managing pro
 
 import os
 import re
-import json
+import asyncio
+import itertools
+import tempfile
 import logging
-from datetime import datetime, timedelta
+import sqlite3
+from dataclasses import dataclass
+import httpx
+import orjson
+from datetime import datetime, timedelta, timezone
+from collections import deque
+from collections.abc import Iterable, Iterator, MutableSet
 from typing import Optional
-from github import Github, RateLimitExceededException, UnknownObjectException, GithubException
+from github import Github
 from notion_client import Client
-from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception_type, before_log, after_log
+from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception, before_log, after_log
 
 # Configure logging for this module
 logger = logging.getLogger(__name__)
 
+GITHUB_API_URL = "https://api.github.com"
+
+# Maximum number of Notion block requests in flight at once (Notion allows about 3 requests per second)
+NOTION_CONCURRENCY = 3
+
+# Diffs longer than this (in characters) are written to the patch cache instead of kept in memory
+PATCH_SPILL_CHARS = 16 * 1024
+
+# Commits per page when listing (the GitHub maximum)
+GITHUB_PAGE_SIZE = 100
+
+# Maximum number of commit detail requests in flight at once
+GITHUB_DETAIL_CONCURRENCY = 10
+
+# Commit details fetched ahead of the consumer when streaming commits
+GITHUB_DETAIL_PREFETCH = 2 * GITHUB_DETAIL_CONCURRENCY
+
+# A commit SHA in a Notion note title: Git's 7-character short form up to the full 40 characters
+NOTION_SHA_PATTERN = re.compile(r'\b([0-9a-f]{7,40})\b', re.IGNORECASE)
+
+def _write_file_atomically(path: str, data: bytes):
+    """
+    Writes `data` to a temporary file next to `path` and renames it over `path`, so an
+    interrupted write never leaves a truncated file behind. The data is flushed to disk
+    before the rename, so a crash cannot leave the new name pointing at an empty file either.
+    """
+    with tempfile.NamedTemporaryFile('wb', dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp', delete=False) as f:
+        try:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        except BaseException:
+            f.close()
+            os.unlink(f.name)
+            raise
+        temp_path = f.name
+    os.replace(temp_path, path)
+
+def _index_by_short_sha(shas: Iterable[str]) -> dict:
+    """Groups SHAs by their first 7 characters, so SHA prefixes can be resolved with one lookup."""
+    index: dict = {}
+    for sha in shas:
+        index.setdefault(sha[:7].lower(), []).append(sha)
+    return index
+
+def match_notes_to_commits(notes_by_sha: dict, commit_shas: Iterable[str]) -> dict:
+    """
+    Resolves the SHAs written in Notion note titles (7 to 40 characters) to full commit SHAs.
+    A note whose SHA is a prefix of several of the commits is ambiguous and is not used; when
+    several notes match one commit, the one with the longest SHA wins.
+
+    Args:
+        notes_by_sha (dict): Notes keyed by the SHA in their title, as returned by `fetch_notion_notes_async`.
+        commit_shas (Iterable[str]): Full SHAs of the commits being processed.
+
+    Returns:
+        dict: The notes, keyed by the full SHA of their commit.
+    """
+    index = _index_by_short_sha(commit_shas)
+    matched: dict = {}
+    for note_sha in sorted(notes_by_sha, key=len):
+        candidates = [sha for sha in index.get(note_sha[:7], ()) if sha.lower().startswith(note_sha)]
+        if len(candidates) > 1:
+            logger.warning(f"Notion note '{notes_by_sha[note_sha]['title']}' matches {len(candidates)} commits "
+                           f"({', '.join(sha[:10] for sha in candidates)}); use a longer SHA in its title. Ignoring it.")
+            continue
+        if candidates:
+            matched[candidates[0]] = notes_by_sha[note_sha]
+    return matched
+
+@dataclass(slots=True)
+class FileChange:
+    """
+    A file changed by a commit, as reported by the GitHub API.
+    """
+    filename: str
+    status: str
+    additions: int
+    deletions: int
+    changes: int
+    raw_url: Optional[str] # URL to fetch raw content for diff if needed
+    patch: Optional[str] # The actual diff content (absent for binary files or when spilled to disk)
+    patch_path: Optional[str] = None # Where a large patch was written instead of being kept in memory
+
+    def read_patch(self) -> Optional[str]:
+        """
+        Returns the diff content, reading it from `patch_path` if it was spilled to disk.
+        """
+        if self.patch is None and self.patch_path:
+            with open(self.patch_path, 'r', encoding='utf-8') as f:
+                return f.read()
+        return self.patch
+
+class ShaSet(MutableSet):
+    """
+    A set of commit SHAs that keeps full hex SHAs as their 20-byte binary digests, a bit over
+    half the memory of the 40-character strings. Anything else (short SHAs, Notion IDs) is
+    kept as given. Iterating yields the SHAs as strings.
+    """
+    __slots__ = ("_digests", "_others")
+
+    def __init__(self, shas: Iterable[str] = ()):
+        self._digests: set = set()
+        self._others: set = set()
+        for sha in shas:
+            self.add(sha)
+
+    @staticmethod
+    def _digest(sha: str) -> Optional[bytes]:
+        """Returns the binary digest of a full lowercase hex SHA, or None for anything else."""
+        if len(sha) != 40:
+            return None
+        try:
+            digest = bytes.fromhex(sha)
+        except ValueError:
+            return None
+        return digest if digest.hex() == sha else None
+
+    def __contains__(self, sha) -> bool:
+        if not isinstance(sha, str):
+            return False
+        digest = self._digest(sha)
+        return digest in self._digests if digest is not None else sha in self._others
+
+    def __iter__(self) -> Iterator[str]:
+        yield from (digest.hex() for digest in self._digests)
+        yield from self._others
+
+    def __len__(self) -> int:
+        return len(self._digests) + len(self._others)
+
+    def add(self, sha: str):
+        digest = self._digest(sha)
+        if digest is not None:
+            self._digests.add(digest)
+        else:
+            self._others.add(sha)
+
+    def discard(self, sha: str):
+        digest = self._digest(sha)
+        if digest is not None:
+            self._digests.discard(digest)
+        else:
+            self._others.discard(sha)
+
+    def clear(self):
+        self._digests.clear()
+        self._others.clear()
+
+    def update(self, shas: Iterable[str]):
+        for sha in shas:
+            self.add(sha)
+
+    def __repr__(self) -> str:
+        return f"ShaSet({sorted(self)!r})"
+
+def _is_retryable_github_error(exception: BaseException) -> bool:
+    """
+    Returns True for GitHub API failures worth retrying: network errors, rate limiting and server
+    errors. A 403 is only retried when it is a (secondary) rate limit, not a permission error;
+    other client errors (e.g. bad credentials, unknown commit) fail immediately.
+    """
+    if isinstance(exception, httpx.HTTPStatusError):
+        response = exception.response
+        if response.status_code == 403:
+            return (response.headers.get("x-ratelimit-remaining") == "0"
+                    or "retry-after" in response.headers
+                    or b"rate limit" in response.content.lower())
+        return response.status_code == 429 or response.status_code >= 500
+    return isinstance(exception, httpx.TransportError)
+
+# Retry policy shared by all GitHub API calls, built once at import
+_github_retry = retry(wait=wait_exponential(multiplier=1, min=4, max=10),
+                      stop=stop_after_attempt(5),
+                      retry=retry_if_exception(_is_retryable_github_error),
+                      before_sleep=before_log(logger, logging.INFO),
+                      after=after_log(logger, logging.WARNING))
+
 class Ingester:
     """
     Manages data ingestion from GitHub and Notion, and tracks processed items.
     """
 
-    def __init__(self, github_token: str, notion_token: str, state_file: str = 'processed_state.json'):
+    # Property names Notion databases commonly use for the title column, checked before scanning
+    _TITLE_KEYS = ("title", "Name", "name")
+
+    def __init__(self, github_token: str, notion_token: str, state_file: str = 'processed_state.db',
+                 patch_cache_dir: str = os.path.join('.cache', 'patches')):
         """
         Initializes the Ingester with API tokens and state file path.
 
         Args:
             github_token (str): GitHub personal access token.
             notion_token (str): Notion integration token (optional).
-            state_file (str): Path to the JSON file storing processed item SHAs/IDs.
+            state_file (str): Path to the SQLite database storing processed item SHAs/IDs.
+            patch_cache_dir (str): Directory that large diffs are written to instead of being kept in memory.
         """
+        self.github_token = github_token
         self.github_client = Github(github_token)
         self.notion_client = Client(auth=notion_token) if notion_token else None
         self.state_file = state_file
+        self.patch_cache_dir = patch_cache_dir
+        # Commit folders under patch_cache_dir already created this run
+        self._patch_dirs = set()
         self.processed_shas = self._load_processed_shas()
+        # ETag and SHAs of the first commit list page per repository, next to the state file
+        self.list_cache_file = os.path.splitext(state_file)[0] + '.etags.json'
+        self._list_cache = self._load_list_cache()
+        # Created on first use by _github_api_client
+        self._api_client: Optional[httpx.AsyncClient] = None
+        self._api_client_loop = None
+
+    def _open_state_db(self) -> sqlite3.Connection:
+        """
+        Opens the SQLite state database, creating the table on first use. WAL mode with
+        `synchronous=NORMAL` keeps each insert to a short append without a full fsync.
+        """
+        conn = sqlite3.connect(self.state_file)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS shas(sha TEXT PRIMARY KEY) WITHOUT ROWID")
+        conn.commit()
+        return conn
+
+    def _load_processed_shas(self) -> ShaSet:
+        """
+        Loads the set of already processed SHAs from the state database. On the first run with
+        a database, the SHAs of an older `.ndjson` or `.json` state file with the same name are
+        imported into it.
 
-    def _load_processed_shas(self) -> set:
+        Returns:
+            ShaSet: A set of processed SHAs.
         """
-        Loads the set of already processed SHAs from the state file.
+        legacy_file = None
+        if not os.path.exists(self.state_file):
+            base = os.path.splitext(self.state_file)[0]
+            legacy_file = next((path for path in (base + '.ndjson', base + '.json')
+                                if path != self.state_file and os.path.exists(path)), None)
+
+        self._state_db = self._open_state_db()
+        if legacy_file:
+            logger.info(f"Migrating processed state from {legacy_file} to {self.state_file}.")
+            shas = self._load_legacy_state(legacy_file)
+            self._insert_processed_shas(shas)
+            return shas
+        return ShaSet(sha for (sha,) in self._state_db.execute("SELECT sha FROM shas"))
+
+    def _load_list_cache(self) -> dict:
+        """
+        Loads the cached first page of each repository's commit list (its ETag, query, SHAs and next link).
 
         Returns:
-            set: A set of processed SHAs.
+            dict: The cache, keyed by repository name (empty if missing or unreadable).
         """
-        if os.path.exists(self.state_file):
-            try:
-                with open(self.state_file, 'r') as f:
-                    return set(json.load(f))
-            except json.JSONDecodeError:
-                logger.warning(f"Corrupted state file {self.state_file}. Starting with empty state.")
-                return set()
-        return set()
-    
+        try:
+            with open(self.list_cache_file, 'rb') as f:
+                return orjson.loads(f.read())
+        except FileNotFoundError:
+            return {}
+        except (OSError, orjson.JSONDecodeError) as e:
+            logger.warning(f"Could not read commit list cache {self.list_cache_file}: {e}. Starting without it.")
+            return {}
+
+    def _save_list_cache(self, repo_name: str, page: dict):
+        """
+        Records the first page of a repository's commit list under its ETag, for conditional requests.
+
+        Args:
+            repo_name (str): The full name of the GitHub repository.
+            page (dict): The page's `etag`, `since` query, `shas` and `next` link.
+        """
+        if page["etag"]:
+            self._list_cache[repo_name] = page
+        elif self._list_cache.pop(repo_name, None) is None:
+            return
+        try:
+            _write_file_atomically(self.list_cache_file, orjson.dumps(self._list_cache))
+        except OSError as e:
+            logger.warning(f"Could not save commit list cache {self.list_cache_file}: {e}")
+
+    def _load_legacy_state(self, path: str) -> ShaSet:
+        """
+        Loads SHAs from a state file in an older format: a JSON list, or one SHA per line.
+
+        Returns:
+            ShaSet: A set of processed SHAs (empty if the file is corrupted).
+        """
+        with open(path, 'rb') as f:
+            data = f.read()
+        if not data.lstrip().startswith(b'['):
+            return ShaSet(line.strip() for line in data.decode().splitlines() if line.strip())
+        try:
+            return ShaSet(orjson.loads(data))
+        except orjson.JSONDecodeError:
+            logger.warning(f"Corrupted state file {path}. Starting with empty state.")
+            return ShaSet()
+
     def mark_as_processed(self, sha: str):
-        """Adds a SHA to the processed set and saves the state file."""
+        """Adds a SHA to the processed set and records it in the state database."""
         self.processed_shas.add(sha)
-        self._save_processed_shas()
+        self._insert_processed_shas([sha])
 
-    def _save_processed_shas(self):
+    def _insert_processed_shas(self, shas: Iterable[str]):
         """
-        Saves the current set of processed SHAs to the state file.
+        Inserts SHAs into the state database in one transaction; SHAs already present are ignored.
         """
         try:
-            with open(self.state_file, 'w') as f:
-                json.dump(list(self.processed_shas), f, indent=4)
-        except IOError as e:
+            with self._state_db:
+                self._state_db.executemany("INSERT OR IGNORE INTO shas VALUES (?)", ((sha,) for sha in shas))
+        except sqlite3.Error as e:
             logger.error(f"Failed to save processed SHAs to {self.state_file}: {e}")
 
     def _get_notion_page_title(self, page: dict) -> str:
@@ -78,118 +348,362 @@ class Ingester:
             str: The concatenated title text or "Untitled".
         """
         properties = page.get("properties", {})
+        # Fast path: the title property is almost always named after one of the usual keys
+        for key in self._TITLE_KEYS:
+            prop_value = properties.get(key)
+            if prop_value and prop_value.get("type") == "title":
+                return "".join(part["plain_text"] for part in prop_value["title"])
         for prop_value in properties.values():
             if prop_value.get("type") == "title":
-                title_parts = [part.get("plain_text", "") for part in prop_value.get("title", [])]
-                return "".join(title_parts)
+                return "".join(part["plain_text"] for part in prop_value["title"])
         return "Untitled"
 
-    @retry(wait=wait_exponential(multiplier=1, min=4, max=10),
-           stop=stop_after_attempt(5),
-           retry=retry_if_exception_type((RateLimitExceededException, GithubException)),
-           before_sleep=before_log(logger, logging.INFO),
-           after=after_log(logger, logging.WARNING))
-    def _get_github_repo(self, repo_name: str):
+    def _github_api_client(self) -> httpx.AsyncClient:
+        """
+        Returns the HTTP client used for GitHub REST API calls, sized for the commit detail concurrency.
+        The client (and its open connections) is reused by later fetches on the same event loop,
+        so repeated runs in one process skip the connection and TLS setup.
+        """
+        loop = asyncio.get_running_loop()
+        if self._api_client is None or self._api_client.is_closed or self._api_client_loop is not loop:
+            headers = {
+                "Authorization": f"Bearer {self.github_token}",
+                "Accept": "application/vnd.github+json",
+            }
+            limits = httpx.Limits(max_connections=GITHUB_DETAIL_CONCURRENCY)
+            self._api_client = httpx.AsyncClient(base_url=GITHUB_API_URL, headers=headers, limits=limits, timeout=30)
+            self._api_client_loop = loop
+        return self._api_client
+
+    async def aclose(self):
+        """
+        Closes the GitHub REST API client, if one was opened.
         """
-        Helper to get GitHub repository with retry logic.
+        if self._api_client is not None:
+            await self._api_client.aclose()
+            self._api_client = None
+            self._api_client_loop = None
+
+    @_github_retry
+    async def _get_commit_page(self, client: httpx.AsyncClient, url: str, params: Optional[dict] = None,
+                               headers: Optional[dict] = None) -> httpx.Response:
         """
-        return self.github_client.get_repo(repo_name)
+        Helper to get one page of the commit list with retry logic.
+        """
+        response = await client.get(url, params=params, headers=headers)
+        if response.status_code not in (304, 409): # Not modified / the repository is empty
+            response.raise_for_status()
+        return response
 
-    @retry(wait=wait_exponential(multiplier=1, min=4, max=10),
-           stop=stop_after_attempt(5),
-           retry=retry_if_exception_type((RateLimitExceededException, GithubException)),
-           before_sleep=before_log(logger, logging.INFO),
-           after=after_log(logger, logging.WARNING))
-    def _get_github_commit(self, repo, sha: str):
+    async def _iter_commit_sha_pages(self, client: httpx.AsyncClient, repo_name: str, since: Optional[datetime] = None):
         """
-        Helper to get a specific GitHub commit with retry logic.
+        Yields the SHAs of a repository's commits page by page, newest first, reading 100 per page
+        and following the `Link: rel="next"` header. The next page is only requested once the
+        caller asks for it. The first page is requested conditionally with the ETag from the last
+        run, and a 304 Not Modified answer (which costs no rate limit) is served from the list cache.
+
+        Args:
+            client (httpx.AsyncClient): Client from `_github_api_client`.
+            repo_name (str): The full name of the GitHub repository (e.g., 'owner/repo').
+            since (datetime, optional): Only list commits after this (timezone-aware) time.
+
+        Yields:
+            list: The commit SHAs of one page.
         """
-        return repo.get_commit(sha)
+        url: Optional[str] = f"/repos/{repo_name}/commits"
+        params: Optional[dict] = {"per_page": GITHUB_PAGE_SIZE}
+        if since:
+            # The query asks from the start of the day, so it (and with it the ETag) stays the same across
+            # runs on the same day; the commits listed from before `since` itself are dropped below
+            query_since = since.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+            params["since"] = query_since.strftime("%Y-%m-%dT%H:%M:%SZ") # type: ignore
+        # The ETag only matches the same query, so a cached page is reused only for the same `since`
+        cached_page = self._list_cache.get(repo_name)
+        if cached_page and (cached_page.get("since") != params.get("since") or "dates" not in cached_page):
+            cached_page = None
+        headers: Optional[dict] = {"If-None-Match": cached_page["etag"]} if cached_page else None
+        first_page = True
+        while url:
+            response = await self._get_commit_page(client, url, params, headers)
+            if response.status_code == 409:
+                return
+            if response.status_code == 304 and cached_page:
+                logger.info(f"Commit list for {repo_name} is unchanged since the last run.")
+                page_shas, page_dates = cached_page["shas"], cached_page["dates"]
+                url = cached_page["next"]
+            else:
+                page = orjson.loads(response.content)
+                page_shas = [commit["sha"] for commit in page]
+                page_dates = [self._listed_commit_date(commit) for commit in page]
+                url = response.links.get("next", {}).get("url")
+                if first_page:
+                    self._save_list_cache(repo_name, {
+                        "etag": response.headers.get("etag"), "since": params.get("since"), # type: ignore
+                        "shas": page_shas, "dates": page_dates, "next": url,
+                    })
+            if since:
+                page_shas = [sha for sha, date in zip(page_shas, page_dates)
+                             if date is None or datetime.fromisoformat(date) >= since]
+            yield page_shas
+            params = None # The next link already carries the query string
+            headers = None # Only the first page is requested conditionally
+            first_page = False
+
+    @staticmethod
+    def _listed_commit_date(commit: dict) -> Optional[str]:
+        """Returns the committer date of a commit from the commit list, the date GitHub's `since` filters on."""
+        details = commit.get("commit") or {}
+        return (details.get("committer") or details.get("author") or {}).get("date")
+
+    @_github_retry
+    async def _fetch_commit_detail(self, client: httpx.AsyncClient, semaphore: asyncio.Semaphore, repo_name: str, sha: str) -> Optional[dict]:
+        """
+        Fetches a single commit, including its file changes, from the GitHub REST API with retry logic.
 
-    def fetch_github_commits(self, repo_name: str, since_days: int = 0, batch_mode: bool = False) -> list:
+        Args:
+            client (httpx.AsyncClient): Client carrying the GitHub API headers.
+            semaphore (asyncio.Semaphore): Bounds the number of concurrent requests.
+            repo_name (str): The full name of the GitHub repository (e.g., 'owner/repo').
+            sha (str): The commit SHA.
+
+        Returns:
+            Optional[dict]: The commit JSON, or None if the commit does not exist or is not accessible.
         """
-        Fetches commits from a GitHub repository.
+        async with semaphore:
+            response = await client.get(f"/repos/{repo_name}/commits/{sha}")
+        if response.status_code in (404, 422):
+            logger.warning(f"Commit {sha} not found or accessible. Skipping.")
+            return None
+        response.raise_for_status()
+        return orjson.loads(response.content)
+
+    def _write_patch(self, sha: str, index: int, patch: str) -> Optional[str]:
+        """
+        Writes a large diff to `{patch_cache_dir}/{sha}/{index}.diff`, atomically via a temporary file.
+
+        Returns:
+            Optional[str]: The path written, or None if the diff could not be written (it is then kept in memory).
+        """
+        patch_dir = os.path.join(self.patch_cache_dir, sha)
+        patch_path = os.path.join(patch_dir, f"{index}.diff")
+        try:
+            if patch_dir not in self._patch_dirs:
+                os.makedirs(patch_dir, exist_ok=True)
+                self._patch_dirs.add(patch_dir)
+            _write_file_atomically(patch_path, patch.encode('utf-8'))
+            return patch_path
+        except OSError as e:
+            logger.warning(f"Could not write diff for commit {sha} to {patch_path}: {e}")
+            return None
+
+    def _parse_commit_detail(self, detail: dict) -> dict:
+        """
+        Converts a commit JSON from the GitHub REST API into the commit dict used by the pipeline.
+
+        Args:
+            detail (dict): The commit JSON.
+
+        Returns:
+            dict: The commit with its message, author, date, URL and changed files (as `FileChange`s).
+        """
+        author = detail["commit"]["author"]
+        files_changed = [
+            FileChange(file["filename"], file["status"], file["additions"], file["deletions"],
+                       file["changes"], file.get("raw_url"), file.get("patch"))
+            for file in detail.get("files", [])
+        ]
+        for index, file_change in enumerate(files_changed):
+            if file_change.patch and len(file_change.patch) > PATCH_SPILL_CHARS:
+                file_change.patch_path = self._write_patch(detail["sha"], index, file_change.patch)
+                if file_change.patch_path:
+                    file_change.patch = None
+        date = author["date"]
+        if date.endswith("Z"):
+            date = date[:-1] + "+00:00" # GitHub's UTC timestamps are already ISO 8601 otherwise
+        else:
+            date = datetime.fromisoformat(date).isoformat()
+        return {
+            'sha': detail["sha"],
+            'message': detail["commit"]["message"],
+            'author': author["name"],
+            'date': date,
+            'url': detail["html_url"],
+            'files': files_changed
+        }
+
+    async def list_github_commit_shas_async(self, repo_name: str, since_days: int = 0, batch_mode: bool = False) -> list:
+        """
+        Lists the SHAs of a repository's unprocessed commits, read 100 per page from the REST API.
+        This is cheap next to the commit details, which `iter_github_commits_async` then fetches.
+        In incremental mode, listing stops at the first page whose commits are all processed. An
+        unprocessed commit (e.g. one whose post failed) is therefore only retried while it is on
+        or before that page: once a full page of newer commits has been processed, it is no longer
+        listed. Use batch mode to pick such commits up again.
 
         Args:
             repo_name (str): The full name of the GitHub repository (e.g., 'owner/repo').
             since_days (int): Number of days to look back for new commits. If 0, fetches all.
-            batch_mode (bool): If True, fetches all historical commits regardless of `since_days`
+            batch_mode (bool): If True, lists all historical commits regardless of `since_days`
                                and does not filter by processed SHAs. Used for initial setup.
 
         Returns:
-            list: A list of dictionaries, each representing a commit with relevant details.
+            list: The commit SHAs, oldest first.
         """
         logger.info(f"Fetching GitHub commits for {repo_name}...")
-        commits_data = []
         try:
-            repo = self._get_github_repo(repo_name)
-            
-            if batch_mode:
-                # Implement pagination for large number of commits in batch mode
-                # Iterate through all commits, handling pagination automatically
-                commits = repo.get_commits()
-            else:
-                since_date = datetime.now() - timedelta(days=since_days)
-                commits = repo.get_commits(since=since_date)
-
-            for commit in commits:
-                if not batch_mode and commit.sha in self.processed_shas:
-                    logger.info(f"Skipping already processed commit: {commit.sha[:8]}")
-                    continue # Skip already processed commits in incremental mode
-
-                try:
-                    # Fetch full commit details to get file changes (diffs)
-                    full_commit = self._get_github_commit(repo, commit.sha)
-                    files_changed = []
-                    for file in full_commit.files:
-                        files_changed.append({
-                            'filename': file.filename,
-                            'status': file.status,
-                            'additions': file.additions,
-                            'deletions': file.deletions,
-                            'changes': file.changes,
-                            'raw_url': file.raw_url, # URL to fetch raw content for diff if needed
-                            'patch': file.patch # The actual diff content
-                        })
-
-                    commits_data.append({
-                        'sha': commit.sha,
-                        'message': commit.commit.message,
-                        'author': commit.commit.author.name,
-                        'date': commit.commit.author.date.isoformat(),
-                        'url': commit.html_url,
-                        'files': files_changed
-                    })
-                    self.processed_shas.add(commit.sha)
-                except UnknownObjectException:
-                    logger.warning(f"Commit {commit.sha} not found or accessible. Skipping.")
-                except GithubException as e:
-                    logger.error(f"GitHub API error processing commit {commit.sha}: {e}")
-                except Exception as e:
-                    logger.error(f"Unexpected error processing commit {commit.sha}: {e}", exc_info=True)
+            client = self._github_api_client()
+            since_date = None if batch_mode else datetime.now(timezone.utc) - timedelta(days=since_days)
+
+            shas = []
+            skipped = 0
+            async for page_shas in self._iter_commit_sha_pages(client, repo_name, since=since_date):
+                if batch_mode:
+                    shas.extend(page_shas)
+                    continue
+                new_shas = [sha for sha in page_shas if sha not in self.processed_shas]
+                skipped += len(page_shas) - len(new_shas)
+                if page_shas and not new_shas:
+                    # Commits are listed newest first, so a page with nothing new almost always means the
+                    # rest of the window was handled by earlier runs; stop paging through it. Failed commits
+                    # older than this page are not retried (see the docstring).
+                    logger.debug("Reached a page of already processed commits. Not listing older commits.")
+                    break
+                if logger.isEnabledFor(logging.DEBUG) and len(new_shas) < len(page_shas):
+                    logger.debug(f"Skipping {len(page_shas) - len(new_shas)} already processed commits on this page.")
+                shas.extend(new_shas)
+            if skipped:
+                logger.info(f"Skipped {skipped} already processed commits.")
 
-            logger.info(f"Fetched {len(commits_data)} new/unprocessed commits.")
             # Reverse the list to process commits from oldest to newest
-            commits_data.reverse()
-            logger.info("Commits sorted chronologically (oldest first).")
-            return commits_data
-        except GithubException as e:
+            shas.reverse()
+            logger.info(f"Found {len(shas)} new/unprocessed commits.")
+            return shas
+        except httpx.HTTPError as e:
             logger.critical(f"Failed to fetch GitHub repository {repo_name} due to API error: {e}")
             return []
         except Exception as e:
             logger.critical(f"An unexpected error occurred during GitHub ingestion: {e}", exc_info=True)
             return []
 
-    def fetch_notion_notes(self, database_id: str, since_date: Optional[datetime]) -> dict:
+    async def iter_github_commits_async(self, repo_name: str, shas: list):
+        """
+        Yields the details of the given commits in order. Only a small window of details is fetched
+        ahead of the caller, so memory stays flat however long the history is and the first commit
+        can be processed while later ones are still being fetched.
+
+        Args:
+            repo_name (str): The full name of the GitHub repository (e.g., 'owner/repo').
+            shas (list): The commit SHAs, e.g. from `list_github_commit_shas_async`.
+
+        Yields:
+            dict: The commit with its message, author, date, URL and changed files. Commits that
+                  could not be fetched are logged and left out.
+        """
+        client = self._github_api_client()
+        semaphore = asyncio.Semaphore(GITHUB_DETAIL_CONCURRENCY)
+        pending = deque()
+        upcoming = iter(shas)
+        try:
+            while True:
+                # Keep the window of in-flight detail requests full
+                for sha in itertools.islice(upcoming, GITHUB_DETAIL_PREFETCH - len(pending)):
+                    pending.append((sha, asyncio.ensure_future(self._fetch_commit_detail(client, semaphore, repo_name, sha))))
+                if not pending:
+                    return
+                sha, task = pending.popleft()
+                try:
+                    detail = await task
+                except httpx.HTTPError as e:
+                    logger.error(f"GitHub API error processing commit {sha}: {e}")
+                    continue
+                except Exception as e:
+                    logger.error(f"Unexpected error processing commit {sha}: {e}", exc_info=True)
+                    continue
+                if detail is None:
+                    continue # Not found or accessible, already logged
+                try:
+                    commit = self._parse_commit_detail(detail)
+                except (KeyError, TypeError, ValueError) as e:
+                    logger.error(f"Unexpected response for commit {sha}: {e}", exc_info=True)
+                    continue
+                self.processed_shas.add(sha)
+                yield commit
+        finally:
+            # The caller stopped early (or failed); don't leave the fetches ahead of it running
+            for _, task in pending:
+                task.cancel()
+
+    async def fetch_github_commits_async(self, repo_name: str, since_days: int = 0, batch_mode: bool = False) -> list:
         """
-        Fetches notes (pages) from a Notion database.
+        Fetches commits from a GitHub repository: the SHAs of all unprocessed commits are listed, then
+        their details (file changes) are fetched concurrently.
+
+        Args:
+            repo_name (str): The full name of the GitHub repository (e.g., 'owner/repo').
+            since_days (int): Number of days to look back for new commits. If 0, fetches all.
+            batch_mode (bool): If True, fetches all historical commits regardless of `since_days`
+                               and does not filter by processed SHAs. Used for initial setup.
+
+        Returns:
+            list: A list of dictionaries, each representing a commit with relevant details, oldest first.
+        """
+        shas = await self.list_github_commit_shas_async(repo_name, since_days=since_days, batch_mode=batch_mode)
+        commits_data = [commit async for commit in self.iter_github_commits_async(repo_name, shas)]
+        logger.info(f"Fetched {len(commits_data)} new/unprocessed commits.")
+        return commits_data
+
+    def fetch_github_commits(self, repo_name: str, since_days: int = 0, batch_mode: bool = False) -> list:
+        """
+        Synchronous wrapper around `fetch_github_commits_async`, for callers without an event loop.
+
+        Args:
+            repo_name (str): The full name of the GitHub repository (e.g., 'owner/repo').
+            since_days (int): Number of days to look back for new commits. If 0, fetches all.
+            batch_mode (bool): See `fetch_github_commits_async`.
+
+        Returns:
+            list: A list of dictionaries, each representing a commit with relevant details.
+        """
+        async def fetch_and_close() -> list:
+            try:
+                return await self.fetch_github_commits_async(repo_name, since_days=since_days, batch_mode=batch_mode)
+            finally:
+                await self.aclose() # The client cannot outlive this event loop
+
+        return asyncio.run(fetch_and_close())
+
+    async def _fetch_page_blocks(self, semaphore: asyncio.Semaphore, page_id: str) -> list:
+        """
+        Fetches all child blocks of a Notion page, following `next_cursor` past the first 100.
+        Each request runs in a worker thread, bounded by `semaphore`.
+        """
+        blocks = []
+        start_cursor = None
+        while True:
+            async with semaphore:
+                response = await asyncio.to_thread(
+                    self.notion_client.blocks.children.list, block_id=page_id, start_cursor=start_cursor # type: ignore
+                )
+            blocks.extend(response["results"])
+            if not response.get("has_more"):
+                return blocks
+            start_cursor = response["next_cursor"]
+
+    async def fetch_notion_notes_async(self, database_id: str, since_date: Optional[datetime],
+                                       only_shas: Optional[set] = None) -> dict:
+        """
+        Fetches notes (pages) from a Notion database. The block content of all linked pages in a
+        result page is fetched concurrently, a few requests at a time to respect Notion's rate limit.
 
         Args:
             database_id (str): The ID of the Notion database.
             since_date (Optional[datetime]): Only fetch notes created/updated after this date.
+            only_shas (set, optional): SHAs of the commits being processed; the content of notes
+                                       linked to any other commit is not fetched.
 
         Returns:
-            list: A list of dictionaries, each representing a Notion page with relevant details.
+            dict: Notion pages with relevant details, keyed by the lowercase commit SHA (7 to 40 characters)
+                  in their title. `match_notes_to_commits` resolves these to full SHAs.
         """
         if not self.notion_client:
             logger.warning("Notion client not initialized. Skipping Notion ingestion.")
@@ -209,38 +723,51 @@ class Ingester:
 
 
             # Notion API integration to fetch notes with pagination and filtering
+            only_index = _index_by_short_sha(only_shas) if only_shas is not None else None
+            semaphore = asyncio.Semaphore(NOTION_CONCURRENCY)
             has_more = True
             start_cursor = None
             while has_more:
-                response = self.notion_client.databases.query(
+                response = await asyncio.to_thread(
+                    self.notion_client.databases.query,
                     database_id=database_id,
                     filter=filter_obj,
                     start_cursor=start_cursor
                 )
+                linked_pages = []
                 for page in response["results"]:  # type: ignore
-                    page_id = page["id"]
                     title = self._get_notion_page_title(page)
 
-                    # Find a 7-character commit SHA in the title
-                    match = re.search(r'\b([0-9a-f]{7})\b', title, re.IGNORECASE)
+                    # Find a commit SHA in the title
+                    match = NOTION_SHA_PATTERN.search(title)
                     if not match:
-                        logger.info(f"Skipping Notion note '{title}' as it does not contain a 7-character commit SHA.")
+                        logger.info(f"Skipping Notion note '{title}' as it does not contain a commit SHA.")
+                        continue
+
+                    note_sha = match.group(1).lower()
+                    if only_index is not None and not any(
+                        sha.lower().startswith(note_sha) for sha in only_index.get(note_sha[:7], ())
+                    ):
+                        logger.debug(f"Skipping Notion note '{title}' as commit '{note_sha}' is not being processed.")
                         continue
+                    logger.info(f"Found commit SHA '{note_sha}' in Notion note '{title}'.")
+                    linked_pages.append((note_sha, title, page))
 
-                    commit_sha_short = match.group(1).lower()
-                    logger.info(f"Found commit SHA '{commit_sha_short}' in Notion note '{title}'.")
-                    
-                    # Fetch block content
-                    content_blocks = self.notion_client.blocks.children.list(block_id=page_id)
-                    page_content = ""
-                    for block in content_blocks["results"]:  # type: ignore
+                # Fetch block content for all linked pages at once
+                all_content_blocks = await asyncio.gather(
+                    *[self._fetch_page_blocks(semaphore, page["id"]) for _, _, page in linked_pages]
+                )
+                for (note_sha, title, page), content_blocks in zip(linked_pages, all_content_blocks):
+                    content_parts = []
+                    for block in content_blocks:
                         if "type" in block and block["type"] == "paragraph" and "rich_text" in block["paragraph"]:
                             for text_obj in block["paragraph"]["rich_text"]:
                                 if "plain_text" in text_obj:
-                                    page_content += text_obj["plain_text"] + "\n"
-                    
-                    notes_data[commit_sha_short] = {
-                        'id': page_id,
+                                    content_parts.append(text_obj["plain_text"])
+                    page_content = "".join(f"{part}\n" for part in content_parts)
+
+                    notes_data[note_sha] = {
+                        'id': page["id"],
                         'title': title,
                         'content': page_content,
                         'last_edited_time': page["last_edited_time"],
@@ -256,7 +783,21 @@ class Ingester:
             logger.error(f"Error fetching Notion notes from database {database_id}: {e}", exc_info=True)
             return {}
 
-    def get_processed_shas(self) -> set:
+    def fetch_notion_notes(self, database_id: str, since_date: Optional[datetime], only_shas: Optional[set] = None) -> dict:
+        """
+        Synchronous wrapper around `fetch_notion_notes_async`, for callers without an event loop.
+
+        Args:
+            database_id (str): The ID of the Notion database.
+            since_date (Optional[datetime]): Only fetch notes created/updated after this date.
+            only_shas (set, optional): SHAs of the commits being processed.
+
+        Returns:
+            dict: Notion pages with relevant details, keyed by the lowercase commit SHA in their title.
+        """
+        return asyncio.run(self.fetch_notion_notes_async(database_id, since_date, only_shas))
+
+    def get_processed_shas(self) -> ShaSet:
         """
         Returns the set of SHAs that have been processed.
         """
@@ -6,16 +6,26 @@ and integrates the ingestion, transformation, publishing, exporting, and deploym
 """
 
 import argparse
+import atexit
+import functools
 import os
+import re
+import sys
+import queue
 import logging
-import json
+import logging.handlers
 from datetime import datetime, timedelta
+from types import MappingProxyType
+from typing import Optional
 from dotenv import load_dotenv # For loading environment variables from .env file
 from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception_type, before_log, after_log
 import asyncio
+import orjson
+from collections import deque
 # Import modules
-from ingest import Ingester
+from ingest import Ingester, match_notes_to_commits
 from transform import Transformer
+from transform_cache import TransformCache
 from publisher import Publisher
 from exporter import Exporter
 from deployer import Deployer
@@ -25,13 +35,86 @@ import markdown
 # Load environment variables from .env file
 load_dotenv()
 
+def configure_logging():
+    """
+    Logs to stderr through a queue, like `logging.basicConfig` (and, like it, only if logging is not
+    configured yet). Callers only enqueue their records; a background thread formats and writes them,
+    so a slow terminal or log file never stalls the event loop. Queued records are flushed at exit.
+    """
+    root = logging.getLogger()
+    if root.handlers:
+        return
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(logging.INFO)
+    listener.start()
+    atexit.register(listener.stop)
+
 # Configure logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+configure_logging()
 logger = logging.getLogger(__name__)
 
-def load_env_variables():
+# IDs of posts published since the last successful deployment, kept across runs
+PENDING_DEPLOY_FILE = "pending_deploy.json"
+
+# Cached posts republished per XML-RPC request in repost mode
+REPOST_BATCH_SIZE = 20
+
+# Tags of every published post
+POST_TAGS = ["automated", "github", "gemini"]
+
+# Commits whose subject contains the word "ignore" get no blog post
+IGNORE_PATTERN = re.compile(r"\bignore\b", re.IGNORECASE)
+
+class ConfigError(RuntimeError):
+    """Raised when the pipeline's configuration is incomplete."""
+
+class PostContext:
     """
-    Loads and validates environment variables.
+    The previous blog posts sent to Gemini as context for the next one. With a `max_chars` budget,
+    the oldest posts are dropped once the context outgrows it, down to half the budget at once. The
+    start of the prompt then stays the same for the next several posts, so Gemini's implicit prompt
+    caching can keep reusing it, and the tokens sent per post stop growing with the history.
+    The posts are joined only when the context is read, so adding many cached posts in a row
+    doesn't copy the growing text once per post.
+    """
+
+    def __init__(self, max_chars: int = 0):
+        """
+        Args:
+            max_chars (int): Most characters of previous posts to keep. 0 keeps every post.
+        """
+        self.max_chars = max_chars
+        self._posts = deque()
+        self._chars = 0
+        self._text: Optional[str] = ""
+
+    def add(self, short_sha: str, content: str):
+        """Appends a commit's blog post, dropping the oldest posts if the budget is exceeded."""
+        post = f"\n\n--- Blog Post for Commit {short_sha} ---\n{content}"
+        self._posts.append(post)
+        self._chars += len(post)
+        if self.max_chars and self._chars > self.max_chars:
+            while len(self._posts) > 1 and self._chars > self.max_chars // 2:
+                self._chars -= len(self._posts.popleft())
+        self._text = None
+
+    def __str__(self) -> str:
+        if self._text is None:
+            self._text = "".join(self._posts)
+        return self._text
+
+@functools.lru_cache(maxsize=1)
+def load_env_variables() -> MappingProxyType:
+    """
+    Loads and validates environment variables. The result is read once per process and returned
+    as a read-only mapping, so changes to the environment take effect after a restart.
+
+    Raises:
+        ConfigError: If any required environment variable is missing.
     """
     # Central config loading
     config = {
@@ -45,30 +128,51 @@ def load_env_variables():
         "wp_xmlrpc_url": os.getenv("WP_XMLRPC_URL"),
         "wp_username": os.getenv("WP_USERNAME"),
         "wp_app_password": os.getenv("WP_APP_PASSWORD"),
+        # Gzip large XML-RPC requests; only for servers set up to decompress request bodies
+        "wp_compress_requests": os.getenv("WP_COMPRESS_REQUESTS", "").lower() in ("1", "true", "yes"),
         "simply_static_export_path": os.getenv("SIMPLY_STATIC_EXPORT_PATH"),
         "simply_static_trigger_url": os.getenv("SIMPLY_STATIC_TRIGGER_URL"),
+        "simply_static_status_url": os.getenv("SIMPLY_STATIC_STATUS_URL"),
+        "simply_static_completion_marker": os.getenv("SIMPLY_STATIC_COMPLETION_MARKER", ""),
         "github_pages_repo_url": os.getenv("GITHUB_PAGES_REPO_URL"),
-        # Model configurations with defaults
+        "deploy_oneshot": os.getenv("DEPLOY_ONESHOT", "").lower() in ("1", "true", "yes"),
+        # Generate each post's title and LinkedIn summary in the same Gemini call as the post
+        "combined_generation": os.getenv("COMBINED_GENERATION", "").lower() in ("1", "true", "yes"),
+        # Summarize a commit's large diffs in one Gemini call instead of one call per file
+        "batch_diff_summaries": os.getenv("BATCH_DIFF_SUMMARIES", "").lower() in ("1", "true", "yes"),
+        # Commits whose title, LinkedIn summary and publication may run while the next post is generated
+        "transform_concurrency": int(os.getenv("TRANSFORM_CONCURRENCY", "4")),
+        # Generate no post for commits without file changes or a Notion note (e.g. merges)
+        "skip_empty_commits": os.getenv("SKIP_EMPTY_COMMITS", "").lower() in ("1", "true", "yes"),
+        # Commits from the same day whose blog posts are generated at once, without seeing each other's posts
+        "pipeline_concurrency": int(os.getenv("PIPELINE_CONCURRENCY", "1")),
+        # Most characters of previous posts sent as context with each new post (0 for all of them)
+        "context_max_chars": int(os.getenv("CONTEXT_MAX_CHARS", "0")),
+        # Model configurations with defaults (a max_output_tokens of 0 leaves the model's own limit)
         'model_configs': {
             'blog': {
                 'name': os.getenv("GEMINI_BLOG_MODEL", "gemini-2.5-flash"),
                 'rpm': int(os.getenv("GEMINI_BLOG_RPM", "10")),
-                'tpm': int(os.getenv("GEMINI_BLOG_TPM", "250000"))
+                'tpm': int(os.getenv("GEMINI_BLOG_TPM", "250000")),
+                'max_output_tokens': int(os.getenv("GEMINI_BLOG_MAX_OUTPUT_TOKENS", "0"))
             },
             'summary': {
                 'name': os.getenv("GEMINI_SUMMARY_MODEL", "gemini-2.5-flash-lite"),
                 'rpm': int(os.getenv("GEMINI_SUMMARY_RPM", "15")),
-                'tpm': int(os.getenv("GEMINI_SUMMARY_TPM", "250000"))
+                'tpm': int(os.getenv("GEMINI_SUMMARY_TPM", "250000")),
+                'max_output_tokens': int(os.getenv("GEMINI_SUMMARY_MAX_OUTPUT_TOKENS", "0"))
             },
             'linkedin': {
                 'name': os.getenv("GEMINI_LINKEDIN_MODEL", "gemini-2.5-flash"),
                 'rpm': int(os.getenv("GEMINI_LINKEDIN_RPM", "10")),
-                'tpm': int(os.getenv("GEMINI_LINKEDIN_TPM", "250000"))
+                'tpm': int(os.getenv("GEMINI_LINKEDIN_TPM", "250000")),
+                'max_output_tokens': int(os.getenv("GEMINI_LINKEDIN_MAX_OUTPUT_TOKENS", "0"))
             },
             'title': {
                 'name': os.getenv("GEMINI_TITLE_MODEL", "gemma-3-27b-it"),
                 'rpm': int(os.getenv("GEMINI_TITLE_RPM", "30")),
-                'tpm': int(os.getenv("GEMINI_TITLE_TPM", "15000"))
+                'tpm': int(os.getenv("GEMINI_TITLE_TPM", "15000")),
+                'max_output_tokens': int(os.getenv("GEMINI_TITLE_MAX_OUTPUT_TOKENS", "0"))
             }
         }
     }
@@ -79,21 +183,160 @@ def load_env_variables():
         "github_pages_repo_url"
     ]
 
-    for var in required_vars:
-        if not config.get(var):
-            logger.error(f"Missing required environment variable: {var.upper()}")
-            exit(1)
-    
-    return config
+    missing = [var.upper() for var in required_vars if not config[var]]
+    if missing:
+        raise ConfigError(f"Missing required environment variables: {', '.join(missing)}")
+
+    return MappingProxyType(config)
+
+
+def read_text_file(path: str) -> str:
+    """Returns the content of a UTF-8 text file."""
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
 
 
-async def run_pipeline(mode: str, since_days: int = 7):
+def write_text_file(path: str, content: str):
+    """Writes `content` to a UTF-8 text file, replacing it."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+def save_linkedin_summaries(output_dir: str, summaries: list):
+    """
+    Writes the LinkedIn summaries of a run, one Markdown file per commit, creating the output folder once.
+
+    Args:
+        output_dir (str): The folder to write the summaries to.
+        summaries (list): (short SHA, Notion note title or "", summary) tuples.
+    """
+    if not summaries:
+        return
+    os.makedirs(output_dir, exist_ok=True)
+    for short_sha, notion_title, summary in summaries:
+        summary_filename = os.path.join(output_dir, f"linkedin_summary_{short_sha}.md")
+        header = f"# LinkedIn Summary for Commit {short_sha}\n\n"
+        if notion_title:
+            header += f"Based on Notion Note: \"{notion_title}\"\n\n"
+        try:
+            with open(summary_filename, "w", encoding="utf-8") as f:
+                f.write(header + summary)
+        except OSError as e:
+            logger.error(f"Failed to save LinkedIn summary {summary_filename}: {e}")
+    logger.info(f"Saved {len(summaries)} LinkedIn summaries to {output_dir}")
+
+
+def load_pending_deploy() -> list:
+    """Returns the IDs of posts published but not yet deployed, as recorded in `PENDING_DEPLOY_FILE`."""
+    try:
+        with open(PENDING_DEPLOY_FILE, "rb") as f:
+            return orjson.loads(f.read())
+    except FileNotFoundError:
+        return []
+    except (OSError, orjson.JSONDecodeError) as e:
+        logger.warning(f"Could not read {PENDING_DEPLOY_FILE}, assuming a deployment is due: {e}")
+        return ["unknown"]
+
+def save_pending_deploy(post_ids: list):
+    """Records the IDs of posts published but not yet deployed; an empty list removes the record."""
+    try:
+        if post_ids:
+            with open(PENDING_DEPLOY_FILE, "wb") as f:
+                f.write(orjson.dumps(post_ids))
+        elif os.path.exists(PENDING_DEPLOY_FILE):
+            os.remove(PENDING_DEPLOY_FILE)
+    except OSError as e:
+        logger.error(f"Failed to update {PENDING_DEPLOY_FILE}: {e}")
+
+async def deploy_if_needed(config: dict, exporter: Exporter, deployer: Deployer, published_post_ids: list, force: bool = False):
+    """
+    Exports and deploys the site if any post was published since the last successful deployment,
+    including posts from an earlier run whose export or deployment failed.
+
+    Args:
+        config (dict): The loaded configuration.
+        exporter (Exporter): The exporter for the WordPress site.
+        deployer (Deployer): The deployer for the GitHub Pages repository.
+        published_post_ids (list): IDs of the posts published by this run.
+        force (bool): Export and deploy even if nothing was published.
+    """
+    pending = load_pending_deploy()
+    if published_post_ids:
+        pending += [post_id for post_id in published_post_ids if post_id not in pending]
+        save_pending_deploy(pending)
+    if not pending and not force:
+        logger.info("No posts published since the last deployment. Skipping export and deployment.")
+        return
+    logger.info(f"Export & Deployment Phase: Generating static site and deploying {len(pending)} new posts...")
+    if await export_and_deploy(config, exporter, deployer):
+        save_pending_deploy([])
+
+async def export_and_deploy(config: dict, exporter: Exporter, deployer: Deployer) -> bool:
+    """
+    Runs the Simply Static export (if a trigger URL is configured) and deploys the result.
+
+    When the export is triggered from here, only the files it wrote are handed to the deployer,
+    so git does not have to rescan the whole export folder.
+
+    Args:
+        config (dict): The loaded configuration.
+        exporter (Exporter): The exporter for the WordPress site.
+        deployer (Deployer): The deployer for the GitHub Pages repository.
+
+    Returns:
+        bool: True if the site was exported (when triggered from here) and deployed.
+    """
+    try:
+        changed_files = None
+        trigger_url = config.get("simply_static_trigger_url")
+        if trigger_url:
+            # Remote-trigger flow (when URL is provided)
+            # Preparing the deploy repository does not depend on the export, so overlap it with the trigger request
+            export_triggered, _ = await asyncio.gather(
+                exporter.trigger_simply_static_export_async(),
+                deployer.initialize_repo_async()
+            )
+            if export_triggered:
+                if exporter.wait_for_export_completion(completion_marker=config.get("simply_static_completion_marker") or None):
+                    logger.info("Simply Static export completed via trigger URL. Proceeding to deployment.")
+                    changed_files = exporter.get_changed_files()
+                else:
+                    logger.error("Simply Static export did not complete in time.")
+                    return False
+            else:
+                logger.error("Failed to trigger Simply Static export via URL.")
+                return False
+        else:
+            # No trigger URL: assume static-export folder is already populated
+            logger.info("No Simply Static trigger URL provided; using pre-exported files at: "
+                        f"{config['simply_static_export_path']}")
+
+        # Deploy whatever is in the export folder
+        commit_message = "Automated blog update from pipeline"
+        if config.get("deploy_oneshot") and changed_files is None:
+            # CI runs have nothing to recover between git steps, so run them as one shell invocation
+            deployed = await asyncio.to_thread(deployer.deploy_oneshot, commit_message)
+        else:
+            deployed = await deployer.deploy_async(commit_message=commit_message, changed_files=changed_files)
+        if deployed:
+            logger.info("Static site successfully deployed to GitHub Pages.")
+        else:
+            logger.error("Failed to deploy static site to GitHub Pages.")
+        return deployed
+    except Exception as e:
+        logger.error(f"Error during export or deployment phase: {e}", exc_info=True)
+        return False
+
+
+async def run_pipeline(mode: str, since_days: int = 7, max_workers_llm: int = 8, force_deploy: bool = False):
     """
     Runs the automated blog generation pipeline.
 
     Args:
         mode (str): 'batch' to process all historical commits, 'incremental' for new commits.
         since_days (int): Number of days to look back for incremental mode.
+        max_workers_llm (int): Most Gemini requests in flight at once. 0 means no limit.
+        force_deploy (bool): Export and deploy the site even if no post was published since the last deployment.
     """
     logger.info(f"Starting Automated Blog Generator pipeline in {mode} mode...")
 
@@ -105,7 +348,8 @@ async def run_pipeline(mode: str, since_days: int = 7):
         exporter = Exporter(
             wordpress_url=config["wp_url"], # type: ignore
             simply_static_export_trigger_url=config["simply_static_trigger_url"], # type: ignore
-            export_path=config["simply_static_export_path"] # type: ignore
+            export_path=config["simply_static_export_path"], # type: ignore
+            status_url=config["simply_static_status_url"] # type: ignore
         )
         deployer = Deployer(
             local_repo_path=config["simply_static_export_path"], # type: ignore
@@ -113,31 +357,8 @@ async def run_pipeline(mode: str, since_days: int = 7):
         )
 
         logger.info("Triggering static site export and deployment...")
-        try:
-            trigger_url = config.get("simply_static_trigger_url")
-            if trigger_url:
-                # Remote-trigger flow (when URL is provided)
-                if exporter.trigger_simply_static_export():
-                    if exporter.wait_for_export_completion():
-                        logger.info("Simply Static export completed via trigger URL. Proceeding to deployment.")
-                    else:
-                        logger.error("Simply Static export did not complete in time.")
-                        return
-                else:
-                    logger.error("Failed to trigger Simply Static export via URL.")
-                    return
-            else:
-                # No trigger URL: assume static-export folder is already populated
-                logger.info("No Simply Static trigger URL provided; using pre-exported files at: "
-                            f"{config['simply_static_export_path']}")
-
-            # Deploy whatever is in the export folder
-            if deployer.deploy(commit_message="Automated blog update from pipeline"):
-                logger.info("Static site successfully deployed to GitHub Pages.")
-            else:
-                logger.error("Failed to deploy static site to GitHub Pages.")
-        except Exception as e:
-            logger.error(f"Error during export or deployment phase: {e}", exc_info=True)
+        if await export_and_deploy(config, exporter, deployer):
+            save_pending_deploy([])
         
         logger.info("Export-only mode finished.")
         return # Exit the pipeline early
@@ -148,11 +369,15 @@ async def run_pipeline(mode: str, since_days: int = 7):
         publisher = Publisher(
             xmlrpc_url=config["wp_xmlrpc_url"],  # type: ignore
             username=config["wp_username"],      # type: ignore
-            app_password=config["wp_app_password"]  # type: ignore
+            app_password=config["wp_app_password"],  # type: ignore
+            compress_requests=config["wp_compress_requests"]
         )
         transformer = Transformer(
             gemini_api_key=config["gemini_api_key"], # type: ignore
-            model_configs=config["model_configs"] # type: ignore
+            model_configs=config["model_configs"], # type: ignore
+            cache=TransformCache(),
+            max_concurrent_requests=max_workers_llm,
+            batch_diff_summaries=config["batch_diff_summaries"]
         )
         sanitizer = Sanitizer()
         blog_cache_dir = "generated_blogs"
@@ -162,56 +387,67 @@ async def run_pipeline(mode: str, since_days: int = 7):
             logger.warning(f"No cached blog directory found at {blog_cache_dir}. Nothing to repost.")
             return
 
-        for filename in sorted(os.listdir(blog_cache_dir)):
-            if filename.endswith(".md"):
-                sha = filename[len("blog_"):-len(".md")]
-                path = os.path.join(blog_cache_dir, filename)
-                with open(path, "r", encoding="utf-8") as f:
-                    content_md = f.read()
-                # --- NEW REPOST WORKFLOW ---
-                # 1. Convert cached Markdown to HTML
-                content_html = markdown.markdown(content_md)
-                # 2. Sanitize the HTML
-                sanitized_html = sanitizer.sanitize_content(content_html)
-                
-                title = await transformer.generate_click_worthy_title(
-                    blog_post_content=content_md # Title generation can still use MD
-                )
-                
-                try:
-                    post_id = publisher.publish_post(
-                        title=title,
-                        content_html=sanitized_html,
-                        tags=["automated", "github", "gemini"],
-                        categories=[f"{github_repo_name}"]
-                    )
-                    if post_id:
-                        logger.info(f"Reposted cached blog for commit {sha}. Post ID: {post_id}")
-                    else:
-                        logger.error(f"Failed to repost cached blog for commit {sha}")
-                except Exception as e:
-                    logger.error(f"Error reposting commit {sha}: {e}", exc_info=True)
+        # Posts reference their category and tags by ID, looked up once for all batches
+        await asyncio.to_thread(publisher.prewarm_terms, categories=[github_repo_name], tags=POST_TAGS)
+
+        filenames = [filename for filename in sorted(os.listdir(blog_cache_dir)) if filename.endswith(".md")]
+        # Reposts are published a batch at a time, each batch in a single XML-RPC request
+        for start in range(0, len(filenames), REPOST_BATCH_SIZE):
+            batch = []
+            for filename in filenames[start:start + REPOST_BATCH_SIZE]:
+                with open(os.path.join(blog_cache_dir, filename), "r", encoding="utf-8") as f:
+                    batch.append((filename[len("blog_"):-len(".md")], f.read()))
+
+            # Title generation can still use MD; the titles of a batch are generated concurrently
+            titles = await asyncio.gather(*[
+                transformer.generate_click_worthy_title(blog_post_content=content_md) for _, content_md in batch
+            ])
+            posts = [
+                {
+                    "title": title,
+                    # Convert cached Markdown to HTML and sanitize it
+                    "content_html": sanitizer.sanitize_content(markdown.markdown(content_md)),
+                    "tags": POST_TAGS,
+                    "categories": [f"{github_repo_name}"]
+                }
+                for (_, content_md), title in zip(batch, titles)
+            ]
+
+            post_ids = await asyncio.to_thread(publisher.publish_posts_batch, posts)
+            for (sha, _), post_id in zip(batch, post_ids):
+                if post_id:
+                    logger.info(f"Reposted cached blog for commit {sha}. Post ID: {post_id}")
+                else:
+                    logger.error(f"Failed to repost cached blog for commit {sha}")
+        publisher.close()
         return
 
     # Initialize modules
     ingester = Ingester(
         github_token=config["github_token"], # type: ignore
         notion_token=config["notion_token"], # type: ignore
-        state_file="processed_state.json"
+        state_file="processed_state.db"
     )
     transformer = Transformer(
         gemini_api_key=config["gemini_api_key"], # type: ignore
-        model_configs=config["model_configs"] # type: ignore
+        model_configs=config["model_configs"], # type: ignore
+        cache=TransformCache(),
+        max_concurrent_requests=max_workers_llm,
+        batch_diff_summaries=config["batch_diff_summaries"]
     )
-    publisher = Publisher(
+    # Connecting to WordPress is a blocking XML-RPC round trip, so it runs in a thread while GitHub is queried
+    publisher_task = asyncio.ensure_future(asyncio.to_thread(
+        Publisher,
         xmlrpc_url=config["wp_xmlrpc_url"], # type: ignore
         username=config["wp_username"], # type: ignore
-        app_password=config["wp_app_password"] # type: ignore
-    )
+        app_password=config["wp_app_password"], # type: ignore
+        compress_requests=config["wp_compress_requests"]
+    ))
     exporter = Exporter(
         wordpress_url=config["wp_url"], # type: ignore
         simply_static_export_trigger_url=config["simply_static_trigger_url"], # type: ignore
-        export_path=config["simply_static_export_path"] # type: ignore
+        export_path=config["simply_static_export_path"], # type: ignore
+        status_url=config["simply_static_status_url"] # type: ignore
     )
     deployer = Deployer(
         local_repo_path=config["simply_static_export_path"], # type: ignore
@@ -222,159 +458,293 @@ async def run_pipeline(mode: str, since_days: int = 7):
     # --- Ingestion Phase ---
     logger.info("Ingestion Phase: Fetching data...")
 
-    # 1. Fetch all recent/unprocessed commits from GitHub. This is our primary source.
-    commits_to_process = []
+    # 1. List all recent/unprocessed commits on GitHub. This is our primary source; their details
+    #    are streamed in while the commits are processed.
     if mode == "batch":
-        commits_to_process = ingester.fetch_github_commits(config["github_repo"], batch_mode=True) # type: ignore
+        shas_to_process = await ingester.list_github_commit_shas_async(config["github_repo"], batch_mode=True) # type: ignore
     else: # incremental
-        commits_to_process = ingester.fetch_github_commits(config["github_repo"], since_days=since_days) # type: ignore
+        shas_to_process = await ingester.list_github_commit_shas_async(config["github_repo"], since_days=since_days) # type: ignore
+    publisher = await publisher_task
+
+    if not shas_to_process:
+        logger.info("No new commits to process.")
+        await ingester.aclose()
+        publisher.close()
+        await deploy_if_needed(config, exporter, deployer, [], force_deploy)
+        return
 
-    # 2. Fetch recent Notion notes to be used as optional enhancements.
+    # Look up the category and tag IDs once in the background; the first publication waits for it
+    prewarm_task = asyncio.ensure_future(asyncio.to_thread(
+        publisher.prewarm_terms, categories=[config["github_repo_name"]], tags=POST_TAGS
+    ))
+
+    # 2. Fetch recent Notion notes to be used as optional enhancements. Only notes linked to a
+    #    commit in this run are read in full.
     notion_notes_by_sha = {}
     if config["notion_token"] and config["notion_database_id"]:
         notion_since_date = datetime.now() - timedelta(days=since_days) if mode == "incremental" else None
-        notion_notes_by_sha = ingester.fetch_notion_notes(config["notion_database_id"], since_date=notion_since_date) # type: ignore
-
-    if not commits_to_process:
-        logger.info("No new commits to process. Exiting pipeline.")
-        return
+        notion_notes = await ingester.fetch_notion_notes_async(
+            config["notion_database_id"], since_date=notion_since_date, # type: ignore
+            only_shas=set(shas_to_process)
+        )
+        # Keyed by full SHA, so a short SHA shared by two commits can't attach a note to the wrong one
+        notion_notes_by_sha = match_notes_to_commits(notion_notes, shas_to_process)
 
-    logger.info(f"Transformation & Publishing Phase: Processing {len(commits_to_process)} commits...")
-    posts_were_published = False
+    logger.info(f"Transformation & Publishing Phase: Processing {len(shas_to_process)} commits...")
     linkedin_summary_output_dir = "linkedin_summaries"
     blog_cache_dir = "generated_blogs"
     os.makedirs(blog_cache_dir, exist_ok=True)
+    # Cached posts are listed once, instead of checked with a stat per commit (and again per look-ahead)
+    cached_post_files = {entry.name for entry in os.scandir(blog_cache_dir)}
     
-    aggregated_context = ""
-
-    # 3. Iterate through every commit sequentially.
-    for commit_data in commits_to_process:
+    aggregated_context = PostContext(config["context_max_chars"])
+    github_repo_name = config["github_repo_name"]
+    # Bounds the commits whose title, summary and publication are still in flight
+    finish_slots_count = max(1, config["transform_concurrency"])
+    finish_slots = asyncio.Semaphore(finish_slots_count)
+    # Blog posts of the same day generated at once
+    post_concurrency = max(1, config["pipeline_concurrency"])
+
+    async def finish_commit(commit_data: dict, blog_post_content_md: str, notion_content: str, notion_title_for_log: str,
+                            diff_summary: str, previous_published: Optional[asyncio.Event], published: asyncio.Event,
+                            generated: Optional[dict] = None) -> Optional[str]:
+        """
+        Generates the title and LinkedIn summary for a commit's blog post (unless `generated` already
+        holds them) and publishes it. Runs in the background while the next commit's post is generated;
+        publications still happen in commit order: each waits for `previous_published`, and `published`
+        is set as soon as this commit's publication is over (whatever its outcome), without waiting
+        for its LinkedIn summary. Returns the ID of the published post, or None.
+        """
         short_sha = commit_data['sha'][:7]
-        commit_message_subject = commit_data['message'].splitlines()[0]
         blog_cache_path = os.path.join(blog_cache_dir, f"blog_{short_sha}.md")
-
-        # A. Check ignore list
-        if "ignore" in commit_message_subject.lower():
-            logger.info(f"Skipping commit {short_sha} because 'ignore' was found in the commit message.")
-            continue
-
-        # B. Check cache
-        if os.path.exists(blog_cache_path):
-            logger.info(f"Found cached blog post for commit {short_sha}. Loading from cache.")
-            with open(blog_cache_path, "r", encoding="utf-8") as f:
-                blog_post_content = f.read()
-            # Add to context and continue to next commit
-            aggregated_context += f"\n\n--- Blog Post for Commit {short_sha} ---\n{blog_post_content}"
-            continue
-
-        # C. Process the commit (if not ignored or cached)
-        matching_note = notion_notes_by_sha.get(short_sha)
-        notion_content = ""
-        notion_title_for_log = ""
-        if matching_note:
-            notion_content = matching_note['content']
-            notion_title_for_log = matching_note['title']
-            logger.info(f"Processing commit {short_sha} - Found matching Notion note: '{notion_title_for_log}'")
-        else:
-            logger.info(f"Processing commit {short_sha} - No matching Notion note found.")
-
+        linkedin_task = None
         try:
-            # Generate content asynchronously
-            blog_post_content_md = await transformer.generate_blog_post(
-                commit_message=commit_data['message'],
-                files_changed=commit_data["files"],
-                notion_content=notion_content,
-                aggregated_context=aggregated_context
-            )
-            
-            if not blog_post_content_md:
-                logger.warning(f"Skipping commit {short_sha} due to empty generated blog content.")
-                continue
+            # Rendering and sanitizing parse the whole post; run them in a thread so the event loop
+            # keeps driving the next post's generation meanwhile
+            render_html = asyncio.to_thread(lambda: sanitizer.sanitize_content(markdown.markdown(blog_post_content_md)))
 
-            content_html = markdown.markdown(blog_post_content_md)
-            sanitized_html = sanitizer.sanitize_content(content_html)
+            if generated:
+                blog_post_title = generated["title"]
+                sanitized_html = await render_html
+            else:
+                # These can run concurrently after the main blog post is done. Publishing only needs the
+                # title, so the LinkedIn summary keeps generating while the post is published.
+                linkedin_task = asyncio.create_task(transformer.generate_linkedin_summary(
+                    commit_message=commit_data['message'],
+                    files_changed=commit_data["files"],
+                    notion_content=notion_content,
+                    diff_summary=diff_summary
+                ))
+                title_task = transformer.generate_click_worthy_title(
+                    commit_message=commit_data['message'],
+                    blog_post_content=blog_post_content_md
+                )
+                sanitized_html, blog_post_title = await asyncio.gather(render_html, title_task)
 
-            # These can run concurrently after the main blog post is done
-            title_task = transformer.generate_click_worthy_title(
-                commit_message=commit_data['message'],
-                blog_post_content=blog_post_content_md
-            )
-            linkedin_task = transformer.generate_linkedin_summary(
-                commit_message=commit_data['message'],
-                files_changed=commit_data["files"],
-                notion_content=notion_content
-            )
-            
-            blog_post_title, linkedin_summary = await asyncio.gather(title_task, linkedin_task)
-            github_repo_name = config["github_repo_name"]
-
-            # Publish to WordPress
-            post_id = publisher.publish_post(
-                title=blog_post_title,
-                content_html=sanitized_html,
-                tags=["automated", "github", "gemini"],
-                categories=[f"{github_repo_name}"]
-            )
+            # Keep WordPress posts in commit order; the first one waits for the term IDs
+            if previous_published:
+                await previous_published.wait()
+            else:
+                await asyncio.wait([prewarm_task])
+
+            # Publish to WordPress without blocking the event loop
+            try:
+                post_id = await asyncio.to_thread(
+                    publisher.publish_post,
+                    title=blog_post_title,
+                    content_html=sanitized_html,
+                    tags=POST_TAGS,
+                    categories=[f"{github_repo_name}"]
+                )
+            finally:
+                published.set() # The next commit may publish now
 
             if post_id:
-                posts_were_published = True
                 logger.info(f"Successfully published post for commit {short_sha}. Post ID: {post_id}")
                 
-                # Cache the successful post
-                with open(blog_cache_path, "w", encoding="utf-8") as f:
-                    f.write(blog_post_content_md)
+                # Cache the successful post; the write runs in a thread, like the publication
+                await asyncio.to_thread(write_text_file, blog_cache_path, blog_post_content_md)
+                cached_post_files.add(os.path.basename(blog_cache_path))
                 logger.info(f"Blog post for {short_sha} cached successfully.")
 
-                # Add to context for the next iteration
-                aggregated_context += f"\n\n--- Blog Post for Commit {short_sha} ---\n{blog_post_content_md}"
-
                 # Mark commit as processed only after successful publication and caching
                 ingester.mark_as_processed(commit_data['sha'])
 
-                # Save LinkedIn summary
+                # LinkedIn summaries are written together once all commits are done
+                linkedin_summary = await linkedin_task if linkedin_task else generated["linkedin_summary"]
                 if linkedin_summary:
-                    summary_filename = os.path.join(linkedin_summary_output_dir, f"linkedin_summary_{short_sha}.md")
-                    os.makedirs(linkedin_summary_output_dir, exist_ok=True)
-                    with open(summary_filename, "w", encoding="utf-8") as f:
-                        f.write(f"# LinkedIn Summary for Commit {short_sha}\n\n")
-                        if notion_title_for_log:
-                            f.write(f"Based on Notion Note: \"{notion_title_for_log}\"\n\n")
-                        f.write(linkedin_summary)
-                    logger.info(f"LinkedIn summary saved to {summary_filename}")
+                    linkedin_summaries.append((short_sha, notion_title_for_log, linkedin_summary))
+                return post_id
             else:
                 logger.error(f"Failed to publish post for commit {short_sha}.")
+                return None
 
         except Exception as e:
             logger.error(f"Failed to process commit {short_sha} due to an unexpected error: {e}", exc_info=True)
+            return None
+        finally:
+            # Don't leave the LinkedIn summary generating once its post failed
+            if linkedin_task and not linkedin_task.done():
+                linkedin_task.cancel()
+            published.set() # Also when this commit failed before publishing
+            finish_slots.release()
+
+    def is_empty_commit(commit_data: dict) -> bool:
+        """Returns True if empty commits are skipped and this one changes no files and has no Notion note."""
+        return (config["skip_empty_commits"] and not commit_data["files"]
+                and commit_data['sha'] not in notion_notes_by_sha)
+
+    def needs_generation(commit_data: dict) -> bool:
+        """Returns True if a commit is neither ignored, empty nor already cached, so a post will be generated for it."""
+        short_sha = commit_data['sha'][:7]
+        return (not IGNORE_PATTERN.search(commit_data['message'].partition('\n')[0])
+                and f"blog_{short_sha}.md" not in cached_post_files
+                and not is_empty_commit(commit_data))
+
+    # Diff summaries don't depend on earlier posts, so they are started for the next few commits ahead
+    diff_summary_tasks: dict = {}
+
+    def prefetch_diff_summaries(upcoming_commits: list):
+        """Starts summarizing the diffs of the next commits that need a post, up to the transform concurrency."""
+        scheduled = 0
+        for upcoming in upcoming_commits:
+            if scheduled >= finish_slots_count:
+                break
+            if not needs_generation(upcoming):
+                continue
+            scheduled += 1
+            if upcoming['sha'] not in diff_summary_tasks:
+                diff_summary_tasks[upcoming['sha']] = asyncio.create_task(transformer.summarize_diff(upcoming["files"]))
+
+    async def generate_post(commit_data: dict, context: str) -> Optional[tuple]:
+        """
+        Generates the blog post for a commit, with `context` holding the posts before it.
+
+        Returns:
+            Optional[tuple]: The post, the Notion note content and title, the diff summary and the title and
+                             LinkedIn summary generated with the post (if any), or None if no post was generated.
+        """
+        short_sha = commit_data['sha'][:7]
+        matching_note = notion_notes_by_sha.get(commit_data['sha'])
+        notion_content = ""
+        notion_title_for_log = ""
+        if matching_note:
+            notion_content = matching_note['content']
+            notion_title_for_log = matching_note['title']
+            logger.info(f"Processing commit {short_sha} - Found matching Notion note: '{notion_title_for_log}'")
+        else:
+            logger.info(f"Processing commit {short_sha} - No matching Notion note found.")
 
-    # --- Export & Deployment Phase ---
-    if posts_were_published:
-        logger.info("Export & Deployment Phase: Generating static site and deploying...")
         try:
-            trigger_url = config.get("simply_static_trigger_url")
-            if trigger_url:
-                # Remote-trigger flow (when URL is provided)
-                if exporter.trigger_simply_static_export():
-                    if exporter.wait_for_export_completion():
-                        logger.info("Simply Static export completed via trigger URL. Proceeding to deployment.")
-                    else:
-                        logger.error("Simply Static export did not complete in time.")
-                        return
-                else:
-                    logger.error("Failed to trigger Simply Static export via URL.")
-                    return
-            else:
-                # No trigger URL: assume static-export folder is already populated
-                logger.info("No Simply Static trigger URL provided; using pre-exported files at: "
-                            f"{config['simply_static_export_path']}")
-
-            # Deploy whatever is in the export folder
-            if deployer.deploy(commit_message="Automated blog update from pipeline"):
-                logger.info("Static site successfully deployed to GitHub Pages.")
+            summary_task = diff_summary_tasks.pop(commit_data['sha'], None)
+            diff_summary = await summary_task if summary_task else await transformer.summarize_diff(commit_data["files"])
+            generated = None
+            if config["combined_generation"]:
+                generated = await transformer.generate_all(
+                    commit_message=commit_data['message'],
+                    files_changed=commit_data["files"],
+                    notion_content=notion_content,
+                    aggregated_context=context,
+                    diff_summary=diff_summary
+                )
+            if generated:
+                blog_post_content_md = generated["blog_post"]
             else:
-                logger.error("Failed to deploy static site to GitHub Pages.")
+                # Generate content asynchronously
+                blog_post_content_md = await transformer.generate_blog_post(
+                    commit_message=commit_data['message'],
+                    files_changed=commit_data["files"],
+                    notion_content=notion_content,
+                    aggregated_context=context,
+                    diff_summary=diff_summary
+                )
         except Exception as e:
-            logger.error(f"Error during export or deployment phase: {e}", exc_info=True)
+            logger.error(f"Failed to process commit {short_sha} due to an unexpected error: {e}", exc_info=True)
+            return None
+
+        if not blog_post_content_md:
+            logger.warning(f"Skipping commit {short_sha} due to empty generated blog content.")
+            return None
+        return blog_post_content_md, notion_content, notion_title_for_log, diff_summary, generated
+
+    # (short SHA, Notion note title, summary) of each published commit
+    linkedin_summaries = []
+
+    # 3. Iterate through every commit in order. Each blog post needs the previous posts as context,
+    #    so posts are generated one after another (or a same-day group at a time); the rest of each
+    #    commit's work overlaps the next post.
+    finish_tasks = []
+    # Set once the latest scheduled commit's publication is over, so the next one can publish
+    last_published: Optional[asyncio.Event] = None
+    commit_stream = ingester.iter_github_commits_async(config["github_repo"], shas_to_process) # type: ignore
+    upcoming_commits = deque()
+    while True:
+        # Keep the next few commits on hand, so their diffs can be summarized ahead of time
+        while len(upcoming_commits) <= max(finish_slots_count, post_concurrency):
+            next_commit = await anext(commit_stream, None)
+            if next_commit is None:
+                break
+            upcoming_commits.append(next_commit)
+        if not upcoming_commits:
+            break
+        commit_data = upcoming_commits.popleft()
+        short_sha = commit_data['sha'][:7]
+        commit_message_subject = commit_data['message'].partition('\n')[0]
+        blog_cache_path = os.path.join(blog_cache_dir, f"blog_{short_sha}.md")
+
+        # A. Check ignore list
+        if IGNORE_PATTERN.search(commit_message_subject):
+            logger.info(f"Skipping commit {short_sha} because 'ignore' was found in the commit message.")
+            continue
+
+        # B. Check cache
+        if f"blog_{short_sha}.md" in cached_post_files:
+            logger.info(f"Found cached blog post for commit {short_sha}. Loading from cache.")
+            # Read in a thread, so the commits still being published keep going meanwhile
+            blog_post_content = await asyncio.to_thread(read_text_file, blog_cache_path)
+            # Add to context and continue to next commit
+            aggregated_context.add(short_sha, blog_post_content)
+            continue
+
+        # C. Skip commits with nothing to write about, if configured
+        if is_empty_commit(commit_data):
+            logger.info(f"Skipping commit {short_sha} because it changes no files and has no Notion note.")
+            continue
+
+        # D. Process the commit (if not ignored, cached or empty). Commits from the same day don't see each
+        #    other's posts, so up to `post_concurrency` of them are generated at once from the posts before them.
+        group = [commit_data]
+        while (len(group) < post_concurrency and upcoming_commits and needs_generation(upcoming_commits[0])
+               and upcoming_commits[0]['date'][:10] == commit_data['date'][:10]):
+            group.append(upcoming_commits.popleft())
+        prefetch_diff_summaries([*group, *upcoming_commits])
+        posts = await asyncio.gather(*[generate_post(commit, str(aggregated_context)) for commit in group])
+
+        for commit, post in zip(group, posts):
+            if post is None:
+                continue
+            blog_post_content_md, notion_content, notion_title_for_log, diff_summary, generated = post
+
+            # Add to context for the next iteration
+            aggregated_context.add(commit['sha'][:7], blog_post_content_md)
+
+            await finish_slots.acquire()
+            published = asyncio.Event()
+            finish_tasks.append(asyncio.create_task(finish_commit(
+                commit, blog_post_content_md, notion_content, notion_title_for_log, diff_summary,
+                last_published, published, generated
+            )))
+            last_published = published
+
+    await ingester.aclose()
+
+    published_post_ids = [post_id for post_id in await asyncio.gather(*finish_tasks) if post_id]
+    await prewarm_task
+    publisher.close()
+    save_linkedin_summaries(linkedin_summary_output_dir, linkedin_summaries)
+
+    # --- Export & Deployment Phase ---
+    await deploy_if_needed(config, exporter, deployer, published_post_ids, force_deploy)
 
 
 if __name__ == "__main__":
@@ -392,6 +762,21 @@ if __name__ == "__main__":
         default=7, 
         help="Number of days to look back for commits/notes in incremental mode. Default is 7."
     )
+    parser.add_argument(
+        "--max-workers-llm",
+        type=int,
+        default=8,
+        help="Maximum number of Gemini requests in flight at once, across all models (0 for no limit). Default is 8."
+    )
+    parser.add_argument(
+        "--force-deploy",
+        action="store_true",
+        help="Export and deploy the static site even if no post was published since the last deployment."
+    )
     args = parser.parse_args()
 
-    asyncio.run(run_pipeline(args.mode, args.since_days))
\ No newline at end of file
+    try:
+        asyncio.run(run_pipeline(args.mode, args.since_days, args.max_workers_llm, args.force_deploy))
+    except ConfigError as e:
+        logger.error(e)
+        sys.exit(1)
\ No newline at end of file
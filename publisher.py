@@ -5,27 +5,62 @@ via XML-RPC or REST API.
 """
 
 import os
+import collections
+import collections.abc
+import hashlib
 import logging
 import mimetypes
 import socket
+import threading
 import markdown
 from typing import Optional
-from wordpress_xmlrpc import Client, WordPressPost
+from wordpress_xmlrpc import Client, WordPressPost, WordPressTerm
 from wordpress_xmlrpc.methods.posts import NewPost, EditPost
 from wordpress_xmlrpc.methods.media import UploadFile
 from wordpress_xmlrpc.methods.taxonomies import GetTerms, NewTerm
 from wordpress_xmlrpc.compat import xmlrpc_client
-from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception_type, before_log, after_log
+from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception, before_log, after_log
 
 # Configure logging for this module
 logger = logging.getLogger(__name__)
 
+# python-wordpress-xmlrpc still looks up `collections.Iterable` to convert list results (e.g. of
+# wp.getTerms); the alias was removed in Python 3.10
+if not hasattr(collections, "Iterable"):
+    collections.Iterable = collections.abc.Iterable  # type: ignore
+
+# MIME types for uploads, built once from Python's own table rather than the host's mime.types,
+# so a file is uploaded with the same type from every machine
+_MIME_TYPES = mimetypes.MimeTypes()
+_MIME_TYPES.add_type("image/webp", ".webp")
+
+# Size above which XML-RPC requests are gzipped, when request compression is enabled
+GZIP_REQUEST_THRESHOLD = 1024
+
+# XML-RPC fault codes WordPress uses for requests that fail the same way every time: bad
+# arguments, bad credentials or missing permissions, and unknown posts or terms
+WORDPRESS_PERMANENT_FAULT_CODES = frozenset({400, 401, 403, 404})
+
+def _is_retryable_wordpress_fault(exception: BaseException) -> bool:
+    """
+    Returns True for XML-RPC faults worth retrying, i.e. any fault but the permanent ones
+    (e.g. a 500 when WordPress fails to insert a post or term).
+    """
+    return isinstance(exception, xmlrpc_client.Fault) and exception.faultCode not in WORDPRESS_PERMANENT_FAULT_CODES
+
+# Retry policy shared by all WordPress calls, built once at import
+_wordpress_retry = retry(wait=wait_exponential(multiplier=1, min=4, max=10),
+                         stop=stop_after_attempt(5),
+                         retry=retry_if_exception(_is_retryable_wordpress_fault),
+                         before_sleep=before_log(logger, logging.INFO), # type: ignore
+                         after=after_log(logger, logging.WARNING))
+
 class Publisher:
     """
     Manages connection and content publishing to WordPress.
     """
 
-    def __init__(self, xmlrpc_url: str, username: str, app_password: str):
+    def __init__(self, xmlrpc_url: str, username: str, app_password: str, compress_requests: bool = False):
         """
         Initializes the Publisher with WordPress credentials.
 
@@ -33,9 +68,25 @@ class Publisher:
             xmlrpc_url (str): The XML-RPC endpoint of your WordPress site (e.g., http://localhost/wordpress/xmlrpc.php).
             username (str): Your WordPress username.
             app_password (str): Your WordPress application password.
+            compress_requests (bool): Gzip requests larger than `GZIP_REQUEST_THRESHOLD`. The web server
+                                      in front of WordPress has to decompress them, as PHP doesn't.
         """
         try:
-            self.client = Client(xmlrpc_url, username, app_password)
+            # One transport holds one HTTP/1.1 keep-alive connection, reused by every call (xmlrpc.client
+            # reconnects transparently if the server closed it while idle)
+            self.transport = xmlrpc_client.SafeTransport() if xmlrpc_url.lower().startswith("https") else xmlrpc_client.Transport()
+            # The transport already asks for gzipped responses; requests are only gzipped on request
+            if compress_requests:
+                self.transport.encode_threshold = GZIP_REQUEST_THRESHOLD
+            self.client = Client(xmlrpc_url, username, app_password, transport=self.transport)
+            # Names of the site's categories, loaded by the first `ensure_category_exists` call
+            self._category_cache: Optional[set] = None
+            # Publisher methods run in worker threads; category checks take turns on the cache
+            self._category_lock = threading.Lock()
+            # IDs of the terms loaded by `prewarm_terms`, by (taxonomy, name)
+            self._term_ids: dict = {}
+            # URLs of the media uploaded by this Publisher, by SHA-256 of their content
+            self._media_urls: dict = {}
             logger.info(f"Successfully connected to WordPress XML-RPC at {xmlrpc_url}")
         except socket.gaierror as e:
             logger.critical(f"DNS lookup failed for WordPress URL '{xmlrpc_url}'. [Errno {e.errno}] {e.strerror}")
@@ -46,11 +97,92 @@ class Publisher:
             logger.critical(f"Failed to connect to WordPress at {xmlrpc_url}: {e}", exc_info=True)
             raise
 
-    @retry(wait=wait_exponential(multiplier=1, min=4, max=10),
-           stop=stop_after_attempt(5),
-           retry=retry_if_exception_type(xmlrpc_client.Fault),
-           before_sleep=before_log(logger, logging.INFO), # type: ignore
-           after=after_log(logger, logging.WARNING))
+    def invalidate_category_cache(self):
+        """
+        Forgets the cached category names and term IDs, e.g. after categories were edited in WordPress directly.
+        """
+        self._category_cache = None
+        self._term_ids = {}
+
+    def prewarm_terms(self, categories: Optional[list] = None, tags: Optional[list] = None):
+        """
+        Looks up the IDs of the given categories and tags once, creating the missing ones, so later
+        posts reference them by ID and WordPress doesn't resolve their names again for every post.
+        All lookups share one request, as do all creations. Terms that can't be looked up or created
+        are still sent by name.
+
+        Args:
+            categories (Optional[list]): Names of the categories the posts will use.
+            tags (Optional[list]): Names of the tags the posts will use.
+        """
+        wanted = [(taxonomy, names) for taxonomy, names in (('category', categories), ('post_tag', tags)) if names]
+        if not wanted:
+            return
+        try:
+            missing = []
+            for (taxonomy, names), existing in zip(wanted, self._call_many([GetTerms(taxonomy) for taxonomy, _ in wanted])):
+                if isinstance(existing, xmlrpc_client.Fault):
+                    logger.warning(f"Failed to look up {taxonomy} IDs, posts will name them instead: {existing}")
+                    continue
+                existing_ids = {term.name: term.id for term in existing}
+                for name in dict.fromkeys(names):
+                    if name in existing_ids:
+                        self._term_ids[(taxonomy, name)] = existing_ids[name]
+                    else:
+                        missing.append((taxonomy, name))
+
+            new_terms = []
+            for taxonomy, name in missing:
+                term = WordPressTerm()
+                term.taxonomy = taxonomy  # type: ignore
+                term.name = name  # type: ignore
+                new_terms.append(NewTerm(term))
+            for (taxonomy, name), term_id in zip(missing, self._call_many(new_terms)):
+                if isinstance(term_id, xmlrpc_client.Fault):
+                    logger.warning(f"Failed to create {taxonomy} '{name}', posts will name it instead: {term_id}")
+                else:
+                    self._term_ids[(taxonomy, name)] = term_id
+                    logger.info(f"Created {taxonomy} '{name}'.")
+        except Exception as e:
+            logger.warning(f"Failed to look up term IDs, posts will name their terms instead: {e}")
+
+    def _call_many(self, methods: list) -> list:
+        """
+        Makes several XML-RPC calls in one `system.multicall` request, or one request per call if the
+        server does not support it.
+
+        Returns:
+            list: The result of each call, in order, or the `Fault` it failed with.
+        """
+        if not methods:
+            return []
+        results = []
+        if 'system.multicall' not in self.client.supported_methods:
+            for method in methods:
+                try:
+                    results.append(self.client.call(method))
+                except xmlrpc_client.Fault as e:
+                    results.append(e)
+            return results
+
+        multicall = xmlrpc_client.MultiCall(self.client.server)
+        for method in methods:
+            getattr(multicall, method.method_name)(*method.get_args(self.client))
+        raw_results = multicall()
+        for index, method in enumerate(methods):
+            try:
+                results.append(method.process_result(raw_results[index]))
+            except xmlrpc_client.Fault as e:
+                results.append(e)
+        return results
+
+    def close(self):
+        """
+        Closes the connection to WordPress. A later call opens a new one.
+        """
+        self.transport.close()
+
+    @_wordpress_retry
     def publish_post(self, title: str, content_html: str, tags: Optional[list] = None, categories: Optional[list] = None, status: str = 'publish') -> Optional[str]:
         """
         Publishes a new post to WordPress.
@@ -60,21 +192,8 @@ class Publisher:
             content_html (str): The content of the blog post in HTML format.
             ...
         """
-        post = WordPressPost()
-        post.title = title  # type: ignore
-        post.content = content_html  # type: ignore
-        post.post_status = status  # type: ignore
-
-
-        terms_names_dict = {}
-        if tags:
-            terms_names_dict['post_tag'] = tags
-        if categories:
-            terms_names_dict['category'] = categories
-
-        if terms_names_dict:
-            post.terms_names = terms_names_dict  # type: ignore
-        logger.info(f"Attempting to publish post: {title}")
+        post = self._build_post(title, content_html, tags, categories, status)
+        logger.debug(f"Attempting to publish post: {title}")
         try:
             post_id: str = self.client.call(NewPost(post))  # type: ignore
             logger.info(f"Successfully published post with ID: {post_id}")
@@ -86,11 +205,86 @@ class Publisher:
             logger.error(f"Unexpected error publishing post: {e}", exc_info=True)
             return None
 
-    @retry(wait=wait_exponential(multiplier=1, min=4, max=10),
-           stop=stop_after_attempt(5),
-           retry=retry_if_exception_type(xmlrpc_client.Fault),
-           before_sleep=before_log(logger, logging.INFO), # type: ignore
-           after=after_log(logger, logging.WARNING))
+    def publish_posts_batch(self, posts: list) -> list:
+        """
+        Publishes several posts in a single request, using WordPress's `system.multicall`. Falls back
+        to one `publish_post` call per post if the server does not support it. A batch is not retried
+        as a whole, since that would publish its successful posts twice.
+
+        Args:
+            posts (list): Dicts with the `publish_post` arguments (`title`, `content_html` and optionally
+                          `tags`, `categories` and `status`).
+
+        Returns:
+            list: The ID of each published post, in order, or None for each post that failed.
+        """
+        if not posts:
+            return []
+        if 'system.multicall' not in self.client.supported_methods:
+            post_ids = []
+            for post in posts:
+                try:
+                    post_ids.append(self.publish_post(**post))
+                except Exception as e:
+                    # A WordPress fault, or a transient error that outlasted the retries
+                    logger.error(f"Failed to publish post '{post['title']}': {e}")
+                    post_ids.append(None)
+            return post_ids
+
+        multicall = xmlrpc_client.MultiCall(self.client.server)
+        for post in posts:
+            method = NewPost(self._build_post(post['title'], post['content_html'], post.get('tags'),
+                                              post.get('categories'), post.get('status', 'publish')))
+            getattr(multicall, method.method_name)(*method.get_args(self.client))
+
+        logger.debug(f"Attempting to publish {len(posts)} posts in one request")
+        try:
+            results = multicall()
+        except Exception as e:
+            logger.error(f"Unexpected error publishing a batch of {len(posts)} posts: {e}", exc_info=True)
+            return [None] * len(posts)
+
+        post_ids = []
+        for index, post in enumerate(posts):
+            try:
+                post_ids.append(results[index])
+            except xmlrpc_client.Fault as e:
+                logger.error(f"WordPress XML-RPC error publishing post '{post['title']}': {e}")
+                post_ids.append(None)
+        logger.info(f"Successfully published {sum(post_id is not None for post_id in post_ids)} of {len(posts)} posts")
+        return post_ids
+
+    def _build_post(self, title: str, content_html: str, tags: Optional[list], categories: Optional[list], status: str) -> WordPressPost:
+        """Builds the `WordPressPost` for a new post."""
+        post = WordPressPost()
+        post.title = title  # type: ignore
+        post.content = content_html  # type: ignore
+        post.post_status = status  # type: ignore
+        self._set_terms(post, tags, categories)
+        return post
+
+    def _set_terms(self, post: WordPressPost, tags: Optional[list], categories: Optional[list]):
+        """Sets a post's tags and categories, by ID for the prewarmed ones and by name otherwise."""
+        terms = []
+        terms_names_dict = {}
+        for taxonomy, names in (('post_tag', tags), ('category', categories)):
+            for name in names or []:
+                term_id = self._term_ids.get((taxonomy, name))
+                if term_id is None:
+                    # Not prewarmed: WordPress resolves (or creates) the term by name
+                    terms_names_dict.setdefault(taxonomy, []).append(name)
+                else:
+                    term = WordPressTerm()
+                    term.id = term_id  # type: ignore
+                    term.taxonomy = taxonomy  # type: ignore
+                    terms.append(term)
+
+        if terms:
+            post.terms = terms  # type: ignore
+        if terms_names_dict:
+            post.terms_names = terms_names_dict  # type: ignore
+
+    @_wordpress_retry
     def update_post(self, post_id: str, title: Optional[str] = None, content_md: Optional[str] = None, tags: Optional[list] = None, categories: Optional[list] = None, status: Optional[str] = None) -> bool:
         """
         Updates an existing post in WordPress.
@@ -110,16 +304,8 @@ class Publisher:
         if title: post.title = title  # type: ignore
         if content_md: post.content = markdown.markdown(content_md) # type: ignore
         if status: post.post_status = status  # type: ignore
-
-        terms_names_dict = {}
-        if tags:
-            terms_names_dict['post_tag'] = tags
-        if categories:
-            terms_names_dict['category'] = categories
-
-        if terms_names_dict:
-            post.terms_names = terms_names_dict  # type: ignore
-        logger.info(f"Attempting to update post with ID: {post_id}")
+        self._set_terms(post, tags, categories)
+        logger.debug(f"Attempting to update post with ID: {post_id}")
         try:
             self.client.call(EditPost(post_id, post))
             logger.info(f"Successfully updated post with ID: {post_id}")
@@ -131,14 +317,11 @@ class Publisher:
             logger.error(f"Unexpected error updating post {post_id}: {e}", exc_info=True)
             return False
 
-    @retry(wait=wait_exponential(multiplier=1, min=4, max=10),
-           stop=stop_after_attempt(5),
-           retry=retry_if_exception_type(xmlrpc_client.Fault),
-           before_sleep=before_log(logger, logging.INFO), # type: ignore
-           after=after_log(logger, logging.WARNING))
+    @_wordpress_retry
     def upload_media(self, file_path: str, mime_type: Optional[str] = None) -> Optional[str]:
         """
-        Uploads a media file to WordPress.
+        Uploads a media file to WordPress. A file whose exact content was already uploaded by this
+        Publisher (e.g. when a post is retried) is not uploaded again; its earlier URL is returned.
 
         Args:
             file_path (str): Absolute path to the file to upload.
@@ -148,7 +331,7 @@ class Publisher:
         Returns:
             Optional[str]: The URL of the uploaded file, or None if an error occurred.
         """
-        logger.info(f"Attempting to upload media: {file_path}")
+        logger.debug(f"Attempting to upload media: {file_path}")
         data = {
             'name': os.path.basename(file_path),
             'type': mime_type if mime_type else self._guess_mime_type(file_path),
@@ -156,7 +339,7 @@ class Publisher:
 
         try:
             with open(file_path, 'rb') as f:
-                data['bits'] = xmlrpc_client.Binary(f.read())
+                content = f.read()
         except FileNotFoundError:
             logger.error(f"Media file not found: {file_path}")
             return None
@@ -164,9 +347,16 @@ class Publisher:
             logger.error(f"Error reading media file {file_path}: {e}", exc_info=True)
             return None
 
+        digest = hashlib.sha256(content).hexdigest()
+        if digest in self._media_urls:
+            logger.info(f"Media {file_path} was already uploaded. URL: {self._media_urls[digest]}")
+            return self._media_urls[digest]
+        data['bits'] = xmlrpc_client.Binary(content)
+
         try:
             response: dict = self.client.call(UploadFile(data))  # type: ignore
             logger.info(f"Successfully uploaded media. URL: {response['url']}")
+            self._media_urls[digest] = response['url']
             return response['url']
         except xmlrpc_client.Fault as e:
             logger.error(f"WordPress XML-RPC error uploading media {file_path}: {e}")
@@ -178,20 +368,16 @@ class Publisher:
     def _guess_mime_type(self, file_path: str) -> str:
         """
         Helper to guess MIME type based on file extension.
-        Uses the standard library `mimetypes` module.
+        Uses the standard library `mimetypes` table, loaded once per process.
         """
-        mimetypes.init()
-        mime_type, _ = mimetypes.guess_type(file_path)
+        mime_type, _ = _MIME_TYPES.guess_type(file_path)
         return mime_type or "application/octet-stream"
 
-    @retry(wait=wait_exponential(multiplier=1, min=4, max=10),
-           stop=stop_after_attempt(5),
-           retry=retry_if_exception_type(xmlrpc_client.Fault),
-           before_sleep=before_log(logger, logging.INFO), # type: ignore
-           after=after_log(logger, logging.WARNING))
+    @_wordpress_retry
     def ensure_category_exists(self, category_name: str) -> bool:
         """
-        Ensures a category exists in WordPress, creating it if necessary.
+        Ensures a category exists in WordPress, creating it if necessary. The category list is
+        fetched once and cached, so later calls only go to WordPress to create a category.
 
         Args:
             category_name (str): The name of the category.
@@ -199,20 +385,27 @@ class Publisher:
         Returns:
             bool: True if the category exists or was created, False otherwise.
         """
-        logger.info(f"Ensuring category '{category_name}' exists...")
+        logger.debug(f"Ensuring category '{category_name}' exists...")
         try:
-            categories = self.client.call(GetTerms('category'))
-            for cat in categories:
-                if cat.name == category_name:
-                    logger.info(f"Category '{category_name}' already exists.")
+            with self._category_lock:
+                if self._category_cache is None:
+                    self._category_cache = {cat.name for cat in self.client.call(GetTerms('category'))}
+                if category_name in self._category_cache:
+                    logger.debug(f"Category '{category_name}' already exists.")
                     return True
-            
-            # Category does not exist, create it
-            self.client.call(NewTerm(category_name, 'category'))
+
+                # Category does not exist, create it
+                term = WordPressTerm()
+                term.taxonomy = 'category'  # type: ignore
+                term.name = category_name  # type: ignore
+                self.client.call(NewTerm(term))
+                self._category_cache.add(category_name)
             logger.info(f"Category '{category_name}' created.")
             return True
         except xmlrpc_client.Fault as e:
             logger.error(f"WordPress XML-RPC error ensuring category '{category_name}': {e}")
+            # The cached names may be stale, e.g. the category was just created elsewhere; the retry reloads them
+            self._category_cache = None
             raise # Re-raise to trigger retry
         except Exception as e:
             logger.error(f"Unexpected error ensuring category '{category_name}': {e}", exc_info=True)
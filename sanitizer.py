@@ -1,5 +1,6 @@
+import html
 import logging
-from bs4 import BeautifulSoup
+from lxml import html as lxml_html
 import unicodedata
 
 logger = logging.getLogger(__name__)
@@ -20,41 +21,53 @@ class Sanitizer:
         Returns:
             str: The cleaned and sanitized content.
         """
+        if not content_md.strip():
+            return "" # Nothing to fix or normalize
         logger.info("Sanitizing content...")
         
-        # Step 1: Fix potentially broken HTML embedded in the Markdown.
+        # Fix potentially broken HTML embedded in the Markdown.
         # This is the most critical step for fixing issues like unclosed <code> tags.
-        sanitized_content = self.fix_malformed_html(content_md)
-        
-        # Step 2: Normalize Unicode to remove non-standard characters.
+        # Unicode is normalized in the same pass, to remove non-standard characters from the text.
         # This helps prevent server hangs from "dirty" text.
-        sanitized_content = self.normalize_unicode(sanitized_content)
+        sanitized_content = self.fix_malformed_html(content_md, normalize=True)
 
         logger.info("Content sanitization complete.")
         return sanitized_content
 
-    def fix_malformed_html(self, text: str) -> str:
+    def fix_malformed_html(self, text: str, normalize: bool = False) -> str:
         """
         Parses the text as HTML, fixes structural issues, and extracts only the
         content within the <body> tag to avoid adding extra <html> wrappers.
 
         Args:
             text (str): The input string, which may contain malformed HTML.
+            normalize (bool): Also normalize the Unicode of the text and attribute values in
+                              the parsed tree (see `normalize_unicode`), before serializing it.
 
         Returns:
             str: The string with corrected HTML structure.
         """
+        if not text.strip():
+            return "" # lxml rejects empty documents
         try:
-            soup = BeautifulSoup(text, 'lxml')
-            if soup.body:
-                # Return only the inner content of the body tag
-                return ''.join(str(c) for c in soup.body.contents)
-            else:
-                # If for some reason a body tag wasn't created, return the parsed string
-                return str(soup)
+            body = lxml_html.document_fromstring(text).body
+            if normalize:
+                for node in body.iter():
+                    if node.text:
+                        node.text = self.normalize_unicode(node.text)
+                    if node.tail:
+                        node.tail = self.normalize_unicode(node.tail)
+                    if isinstance(node.tag, str):
+                        for name, value in node.attrib.items():
+                            node.set(name, self.normalize_unicode(value))
+            # Return only the inner content of the body tag: its leading text, then each child (with
+            # the text after it), serialized by lxml directly
+            return html.escape(body.text or '', quote=False) + ''.join(
+                lxml_html.tostring(child, encoding='unicode') for child in body
+            )
         except Exception as e:
             logger.error(f"Error during HTML sanitization: {e}")
-            return text # Return original text on failure
+            return self.normalize_unicode(text) if normalize else text # Return original text on failure
 
     def normalize_unicode(self, text: str) -> str:
         """
@@ -67,6 +80,8 @@ class Sanitizer:
         Returns:
             str: The normalized string.
         """
+        if text.isascii():
+            return text # NFKC leaves ASCII unchanged
         try:
             # NFKC (Normalization Form Compatibility Composition) is a good choice for
             # ensuring consistent character representation.
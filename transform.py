@@ -4,16 +4,142 @@ Transformation Module: Handles preprocessing of diffs and messages, and interact
 to generate blog posts, LinkedIn summaries, and click-worthy titles.
 """
 import asyncio
+import hashlib
 import time
 import os
+import random
+import re
 import google.generativeai as genai
+import orjson
 import logging
+from collections import deque
+from itertools import islice
 from typing import Optional
-from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception_type, before_log, after_log
+from google.api_core import exceptions as google_exceptions
+from tenacity import retry, wait_exponential_jitter, stop_after_attempt, retry_if_exception_type, before_log, after_log
+from ingest import FileChange
+from transform_cache import TransformCache
 
 # Configure logging for this module
 logger = logging.getLogger(__name__)
 
+# Gemini API errors worth retrying: rate limiting, overload and server-side failures
+GEMINI_TRANSIENT_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+)
+
+# Rough number of prompt characters per Gemini token, used to estimate prompt sizes without an API call
+CHARS_PER_TOKEN_ESTIMATE = 4
+
+# Longest wait (in seconds) honored when a rate limit error says how long to wait before retrying
+MAX_GEMINI_RETRY_DELAY = 60
+
+def server_retry_delay(error: BaseException) -> Optional[float]:
+    """
+    Returns the delay a Gemini error asks for before retrying, from its `google.rpc.RetryInfo` detail.
+
+    Args:
+        error (BaseException): The error raised by the Gemini API.
+
+    Returns:
+        Optional[float]: The delay in seconds, or None if the error names none.
+    """
+    for detail in getattr(error, 'details', None) or ():
+        retry_delay = getattr(detail, 'retry_delay', None)
+        if retry_delay is not None:
+            return retry_delay.ToTimedelta().total_seconds()
+        if isinstance(detail, dict) and str(detail.get('retryDelay', '')).endswith('s'):
+            try:
+                return float(detail['retryDelay'][:-1])
+            except ValueError:
+                pass
+    return None
+
+_gemini_backoff = wait_exponential_jitter(initial=2, max=20, jitter=3)
+
+def _wait_for_gemini_retry(retry_state) -> float:
+    """Waits as long as the error asks for (capped and jittered), or backs off exponentially if it doesn't say."""
+    delay = server_retry_delay(retry_state.outcome.exception())
+    if delay is None:
+        return _gemini_backoff(retry_state)
+    return min(delay, MAX_GEMINI_RETRY_DELAY) + random.uniform(0, 1)
+
+# Generated, minified or vendored files, whose diffs say nothing about the change and only cost tokens
+GENERATED_FILE_PATTERN = re.compile(
+    r'(?:^|/)(?:package-lock\.json|yarn\.lock|pnpm-lock\.yaml|poetry\.lock|Pipfile\.lock|Cargo\.lock|composer\.lock|Gemfile\.lock)$'
+    r'|\.min\.(?:js|css)$|\.map$|(?:^|/)(?:vendor|dist|node_modules)/'
+)
+
+# Diffs longer than this (in characters) are summarized by Gemini; shorter ones are quoted as is
+LARGE_DIFF_CHARS = 1000
+
+# Longest diff (in characters) sent to the summary model; longer diffs are condensed to fit
+MAX_SUMMARIZED_DIFF_CHARS = 60 * 1024
+
+# One hunk of a GitHub patch, from its @@ header up to the next one
+HUNK_PATTERN = re.compile(r'^@@.*?(?=^@@|\Z)', re.M | re.S)
+
+# Lines of a patch that are neither changed lines nor hunk headers (unchanged context, "\ No newline" markers)
+CONTEXT_LINE_PATTERN = re.compile(r'^(?![+\-@]).*(?:\n|\Z)', re.M)
+
+# Changed lines that add or remove a definition or a TODO, the hunks kept first when condensing
+DEFINITION_LINE_PATTERN = re.compile(r'^[+-]\s*(?:async def |def |class |TODO|FIXME)', re.M)
+
+def strip_context_lines(patch: str) -> str:
+    """
+    Removes the unchanged context lines from a patch, keeping its hunk headers, which still say
+    where (and often in which function) each change is.
+
+    Args:
+        patch (str): A file's patch, as returned by GitHub.
+
+    Returns:
+        str: The hunk headers and changed lines of the patch.
+    """
+    return CONTEXT_LINE_PATTERN.sub('', patch)
+
+def condense_patch(patch: str, max_chars: int) -> str:
+    """
+    Shortens a patch to at most `max_chars` by dropping whole hunks instead of cutting it off at
+    the end. Hunks that change definitions (functions, classes, TODOs) are kept first, then the rest
+    in order; the kept hunks stay in patch order.
+
+    Args:
+        patch (str): A file's patch, as returned by GitHub.
+        max_chars (int): The longest patch to return, not counting the note on omitted hunks.
+
+    Returns:
+        str: The patch, or its kept hunks followed by a note on how many were omitted.
+    """
+    if len(patch) <= max_chars:
+        return patch
+    hunks = HUNK_PATTERN.findall(patch)
+    # sorted() is stable, so hunks of the same priority keep their order
+    by_priority = sorted(range(len(hunks)), key=lambda index: not DEFINITION_LINE_PATTERN.search(hunks[index]))
+    kept = set()
+    size = 0
+    for index in by_priority:
+        if size + len(hunks[index]) <= max_chars:
+            kept.add(index)
+            size += len(hunks[index])
+    if not kept:
+        return patch[:max_chars] + "\n... (diff truncated)"
+    return "".join(hunks[index] for index in sorted(kept)) + f"\n... ({len(hunks) - len(kept)} hunks omitted)"
+
+def _load_json_object(response_text: str) -> Optional[dict]:
+    """Parses a JSON object returned by Gemini, tolerating a Markdown code fence around it."""
+    text = response_text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[-1].rsplit("```", 1)[0]
+    try:
+        content = orjson.loads(text)
+    except orjson.JSONDecodeError:
+        return None
+    return content if isinstance(content, dict) else None
+
 class AsyncTokenRateLimiter:
     """
     Manages API call rates for both TPM and RPM with a unified delay mechanism.
@@ -26,6 +152,7 @@ class AsyncTokenRateLimiter:
         self.last_refill_time = time.monotonic()
         self._lock = asyncio.Lock()
         self._rpm_delay = 60.0 / rpm_limit if rpm_limit > 0 else 0
+        self._next_request_time = 0.0
 
     def _refill(self):
         """Refills the token bucket based on the time elapsed since the last refill."""
@@ -54,10 +181,79 @@ class AsyncTokenRateLimiter:
 
             self.tokens -= tokens_to_consume
 
+    def reconcile(self, estimated_tokens: int, actual_tokens: int):
+        """
+        Corrects the bucket once a call reports how many tokens its prompt actually used.
+
+        Args:
+            estimated_tokens (int): The tokens consumed for the call beforehand.
+            actual_tokens (int): The prompt tokens reported by the API.
+        """
+        self.tokens = min(self.capacity, self.tokens - (actual_tokens - estimated_tokens))
+
     async def enforce_rpm_delay(self):
-        """Asynchronously enforces the mandatory delay between requests."""
+        """
+        Asynchronously enforces the mandatory delay between requests. Each caller reserves the next
+        free slot, so concurrent callers are spaced out instead of all waking after the same delay,
+        and a request after a pause goes out at once.
+        """
         if self._rpm_delay > 0:
-            await asyncio.sleep(self._rpm_delay)
+            now = time.monotonic()
+            request_time = max(now, self._next_request_time)
+            self._next_request_time = request_time + self._rpm_delay
+            if request_time > now:
+                await asyncio.sleep(request_time - now)
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Limits the number of requests in flight, AIMD-style: the limit is halved whenever the API
+    reports rate limiting and grows back by one with each successful request, up to `max_limit`.
+    """
+    def __init__(self, max_limit: int):
+        self.max_limit = max_limit
+        self.limit = max_limit
+        self._in_flight = 0
+        self._waiters = deque()
+
+    async def acquire(self):
+        """Waits until fewer than `limit` requests are in flight and takes a slot."""
+        if self._in_flight < self.limit and not self._waiters:
+            self._in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the caller was cancelled; pass it on
+                self._in_flight -= 1
+                self._wake_waiters()
+            raise
+
+    def release(self, rate_limited: bool = False):
+        """
+        Gives a slot back and adjusts the limit.
+
+        Args:
+            rate_limited (bool): Whether the request was rejected for exceeding the API's rate limits.
+        """
+        self._in_flight -= 1
+        if rate_limited:
+            if self.limit > 1:
+                self.limit //= 2
+                logger.warning(f"Gemini rate limit reached. Allowing {self.limit} requests in flight.")
+        elif self.limit < self.max_limit:
+            self.limit += 1
+        self._wake_waiters()
+
+    def _wake_waiters(self):
+        """Hands free slots to waiting callers, in arrival order."""
+        while self._waiters and self._in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._in_flight += 1
+                waiter.set_result(None)
 
 class Transformer:
     """
@@ -65,44 +261,89 @@ class Transformer:
     using the Gemini API.
     """
 
-    def __init__(self, gemini_api_key: str, model_configs: dict):
+    def __init__(self, gemini_api_key: str, model_configs: dict, cache: Optional[TransformCache] = None,
+                 max_concurrent_requests: int = 0, batch_diff_summaries: bool = False):
         """
         Initializes the Transformer with API keys and model configurations.
 
         Args:
             gemini_api_key (str): Your Google AI Studio Gemini API key.
             model_configs (dict): A dictionary containing model names and their rate limits.
+            cache (TransformCache, optional): On-disk cache of generated content, consulted before each call.
+            max_concurrent_requests (int): Most Gemini requests in flight at once, across all models. 0 means no limit.
+                                           The limit is lowered temporarily while Gemini reports rate limiting.
+            batch_diff_summaries (bool): Whether a commit's large diffs are summarized in one Gemini call
+                                         instead of one call per file.
         """
+        self.cache = cache
+        self.batch_diff_summaries = batch_diff_summaries
+        self._request_slots = AdaptiveConcurrencyLimiter(max_concurrent_requests) if max_concurrent_requests > 0 else None
         genai.configure(api_key=gemini_api_key)
+        self._generation_configs = {
+            model_key: self._generation_config(model_configs[model_key])
+            for model_key in ('blog', 'summary', 'linkedin', 'title')
+        }
         self.models = {
-            'blog': genai.GenerativeModel(model_configs['blog']['name']),
-            'summary': genai.GenerativeModel(model_configs['summary']['name']),
-            'linkedin': genai.GenerativeModel(model_configs['linkedin']['name']),
-            'title': genai.GenerativeModel(model_configs['title']['name'])
+            model_key: genai.GenerativeModel(model_configs[model_key]['name'], generation_config=generation_config)
+            for model_key, generation_config in self._generation_configs.items()
         }
         
         self.rate_limiters = {}
+        # Summaries of large diffs, keyed by the SHA-256 of their prompt
+        self._diff_summaries: dict = {}
         unique_model_names = {cfg['name'] for cfg in model_configs.values()}
         
         for model_name in unique_model_names:
-            # Find the config for this unique model name
-            # This assumes model names in the config dict are consistent
-            config = next((cfg for cfg in model_configs.values() if cfg['name'] == model_name), None)
-            if config:
-                self.rate_limiters[model_name] = AsyncTokenRateLimiter(
-                    capacity=config['tpm'],
-                    refill_rate_per_minute=config['tpm'],
-                    rpm_limit=config['rpm']
-                )
-                logger.info(f"Initialized rate limiter for {model_name}: {config['rpm']} RPM, {config['tpm']} TPM")
-
+            # Roles sharing a model share its quota, so they get one limiter with the strictest limits set for any of them
+            configs = [cfg for cfg in model_configs.values() if cfg['name'] == model_name]
+            rpm = min((cfg['rpm'] for cfg in configs if cfg['rpm'] > 0), default=0)
+            tpm = min((cfg['tpm'] for cfg in configs if cfg['tpm'] > 0), default=0)
+            if len({(cfg['rpm'], cfg['tpm']) for cfg in configs}) > 1:
+                logger.warning(f"Conflicting rate limits configured for {model_name}; using {rpm} RPM, {tpm} TPM.")
+            self.rate_limiters[model_name] = AsyncTokenRateLimiter(
+                capacity=tpm,
+                refill_rate_per_minute=tpm,
+                rpm_limit=rpm
+            )
+            logger.info(f"Initialized rate limiter for {model_name}: {rpm} RPM, {tpm} TPM")
+
+
+    @staticmethod
+    def _generation_config(model_config: dict) -> Optional[dict]:
+        """
+        Returns the generation settings baked into a model, i.e. its `max_output_tokens` cap if one is
+        configured, so e.g. titles stop generating early. A model that thinks counts its thinking
+        tokens against the cap too.
+        """
+        if model_config.get('max_output_tokens'):
+            return {'max_output_tokens': model_config['max_output_tokens']}
+        return None
 
-    @retry(wait=wait_exponential(multiplier=1, min=4, max=10),
-           stop=stop_after_attempt(3),
-           retry=retry_if_exception_type(genai.types.BlockedPromptException),
+    @retry(wait=_wait_for_gemini_retry,
+           stop=stop_after_attempt(4),
+           retry=retry_if_exception_type(GEMINI_TRANSIENT_ERRORS),
            before_sleep=before_log(logger, logging.INFO),
-           after=after_log(logger, logging.WARNING))
-    
+           after=after_log(logger, logging.WARNING),
+           reraise=True)
+    async def _generate_content_async(self, model, prompt: str):
+        """
+        Sends one generation request, retrying rate limiting and server errors with jittered backoff
+        so concurrent callers don't retry in lockstep. A rate limit error that says how long to wait
+        is retried after that delay instead. Blocked prompts and bad requests fail at once.
+        A request slot is only held while a request is in flight, not during the backoff.
+        """
+        if self._request_slots is None:
+            return await model.generate_content_async(prompt)
+        await self._request_slots.acquire()
+        rate_limited = False
+        try:
+            return await model.generate_content_async(prompt)
+        except google_exceptions.ResourceExhausted:
+            rate_limited = True
+            raise
+        finally:
+            self._request_slots.release(rate_limited)
+
     async def _call_gemini_async(self, model_key: str, prompt: str) -> str:
         """
         Helper function to call Gemini API asynchronously with per-model rate limiting.
@@ -110,14 +351,28 @@ class Transformer:
         model = self.models[model_key]
         model_name = model.model_name
 
+        # 0. Content generated from the same prompt and settings in an earlier run needs no API call
+        cache_kind = f"{model_key}:{model_name}"
+        if self._generation_configs.get(model_key):
+            cache_kind += ":" + orjson.dumps(self._generation_configs[model_key], option=orjson.OPT_SORT_KEYS).decode()
+        if self.cache:
+            cached = self.cache.get(cache_kind, prompt)
+            if cached is not None:
+                logger.info(f"Using cached {model_key} content for prompt: {prompt[:100]}...")
+                return cached
+
         # 1. Pre-flight token counting and rate limiting
-        if model_name in self.rate_limiters:
-            limiter = self.rate_limiters[model_name]
+        limiter = self.rate_limiters.get(model_name)
+        estimated_tokens = None
+        if limiter:
             try:
-                # Count tokens before the main call
-                prompt_tokens = await model.count_tokens_async(prompt)
+                # Estimate the prompt size locally; only a prompt that could take a large share of the
+                # bucket is counted by the API, as an over-estimate there could stall the bucket
+                estimated_tokens = max(1, len(prompt) // CHARS_PER_TOKEN_ESTIMATE)
+                if estimated_tokens > limiter.capacity / 2:
+                    estimated_tokens = (await model.count_tokens_async(prompt)).total_tokens
                 # Consume tokens from the bucket (may wait)
-                await limiter.consume(prompt_tokens.total_tokens, model_name)
+                await limiter.consume(estimated_tokens, model_name)
                 # Enforce a fixed delay for RPM
                 await limiter.enforce_rpm_delay()
             except Exception as e:
@@ -128,7 +383,13 @@ class Transformer:
         response = None
         try:
             logger.info(f"Calling Gemini ({model_name}) with prompt: {prompt[:100]}...")
-            response = await model.generate_content_async(prompt)
+            response = await self._generate_content_async(model, prompt)
+            # Usage metadata is only reported by newer API versions
+            prompt_token_count = getattr(getattr(response, 'usage_metadata', None), 'prompt_token_count', None)
+            if estimated_tokens is not None and isinstance(prompt_token_count, int) and prompt_token_count > 0:
+                limiter.reconcile(estimated_tokens, prompt_token_count)
+            if self.cache and response.text:
+                self.cache.put(cache_kind, prompt, response.text)
             return response.text
         except ValueError:
             if response:
@@ -141,23 +402,43 @@ class Transformer:
             return ""
 
 
-    async def _summarize_single_file_async(self, file: dict) -> str:
+    async def _summarize_single_file_async(self, file: FileChange) -> str:
         """Asynchronously summarizes the diff for a single file."""
-        filename = file.get("filename", "Unknown File")
-        status = file.get("status", "")
-        patch = file.get("patch", "")
+        filename = file.filename or "Unknown File"
+        status = file.status or ""
+        patch = file.read_patch() or ""
 
         if not patch:
             return f"File: {filename} ({status}) - No patch content available."
 
-        if len(patch) > 1000:  # Arbitrary threshold for large diffs
-            logger.info(f"Summarizing large diff for {filename} using Gemini.")
-            summary_prompt = f"Summarize the following code diff for file {filename} ({status}):\n```\n{patch}\n```\nProvide a concise summary focusing on the key changes and their purpose."
-            diff_summary_text = await self._call_gemini_async('summary', summary_prompt)
+        if GENERATED_FILE_PATTERN.search(filename):
+            return f"File: {filename} ({status}) - Generated or vendored file, diff omitted."
+
+        if len(patch) > LARGE_DIFF_CHARS:
+            patch = condense_patch(strip_context_lines(patch), MAX_SUMMARIZED_DIFF_CHARS)
+            summary_prompt = f"Summarize the following code diff (unchanged lines omitted) for file {filename} ({status}):\n```\n{patch}\n```\nProvide a concise summary focusing on the key changes and their purpose."
+            # The same diff (e.g. a cherry-pick, or a commit summarized again) shares one Gemini call
+            prompt_key = hashlib.sha256(summary_prompt.encode()).digest()
+            summary_task = self._diff_summaries.get(prompt_key)
+            if summary_task is None:
+                logger.info(f"Summarizing large diff for {filename} using Gemini.")
+                summary_task = asyncio.ensure_future(self._call_gemini_async('summary', summary_prompt))
+                self._diff_summaries[prompt_key] = summary_task
+            else:
+                logger.info(f"Reusing the summary of an identical diff for {filename}.")
+            try:
+                diff_summary_text = await asyncio.shield(summary_task)
+            except BaseException:
+                if summary_task.done():
+                    self._diff_summaries.pop(prompt_key, None) # Let a later call retry it
+                raise
+            if not diff_summary_text:
+                self._diff_summaries.pop(prompt_key, None)
             return f"File: {filename} ({status})\nSummary: {diff_summary_text}"
         else:
-            lines = patch.split("\n")
-            relevant_lines = [line for line in lines if line.startswith(("+", "-")) and not line.startswith(("+++", "---"))]
+            # Stops scanning at the 11th changed line, which is only needed to know there are more
+            relevant_lines = list(islice((line for line in patch.split("\n")
+                                          if line.startswith(("+", "-")) and not line.startswith(("+++", "---"))), 11))
             summary = "\n".join(relevant_lines[:10]) + ("..." if len(relevant_lines) > 10 else "")
             return f"File: {filename} ({status})\n{summary}"
 
@@ -167,26 +448,115 @@ class Transformer:
         """
         if not files_changed:
             return "No significant code changes detected."
-        
-        tasks = [self._summarize_single_file_async(file) for file in files_changed]
-        summaries = await asyncio.gather(*tasks)
-        
-        return "\n\n".join(summaries)
 
+        batched = await self._summarize_large_diffs_batched(files_changed) if self.batch_diff_summaries else {}
+        tasks = [self._summarize_single_file_async(file) for file in files_changed if file.filename not in batched]
+        summaries = iter(await asyncio.gather(*tasks))
+
+        return "\n\n".join(batched[file.filename] if file.filename in batched else next(summaries)
+                           for file in files_changed)
+
+    async def _summarize_large_diffs_batched(self, files_changed: list) -> dict:
+        """
+        Summarizes a commit's large diffs with one Gemini call per batch of files, each batch holding
+        up to `MAX_SUMMARIZED_DIFF_CHARS` of (condensed) patches, so the instructions are sent once.
+
+        Args:
+            files_changed (list): List of changed files (`FileChange`) with diff patches.
+
+        Returns:
+            dict: The summaries, keyed by filename. Files missing from it (small diffs, single-file
+                  batches, or files the response left out) are summarized on their own.
+        """
+        large_diffs = {}
+        for file in files_changed:
+            if not file.filename or file.filename in large_diffs or GENERATED_FILE_PATTERN.search(file.filename):
+                continue
+            patch = file.read_patch() or ""
+            if len(patch) > LARGE_DIFF_CHARS:
+                large_diffs[file.filename] = (file.status or "", condense_patch(strip_context_lines(patch),
+                                                                                 MAX_SUMMARIZED_DIFF_CHARS))
+
+        batches, batch, batch_chars = [], [], 0
+        for filename, (status, patch) in large_diffs.items():
+            if batch and batch_chars + len(patch) > MAX_SUMMARIZED_DIFF_CHARS:
+                batches.append(batch)
+                batch, batch_chars = [], 0
+            batch.append((filename, status, patch))
+            batch_chars += len(patch)
+        batches = [batch for batch in batches + [batch] if len(batch) > 1]
+        if not batches:
+            return {}
+
+        logger.info(f"Summarizing {sum(map(len, batches))} large diffs using {len(batches)} Gemini call(s).")
+        responses = await asyncio.gather(*[self._call_gemini_async('summary', self._batched_summary_prompt(batch))
+                                           for batch in batches])
+        summaries = {}
+        for batch, response_text in zip(batches, responses):
+            content = _load_json_object(response_text) or {}
+            for filename, status, _ in batch:
+                summary = content.get(filename)
+                if isinstance(summary, str) and summary.strip():
+                    summaries[filename] = f"File: {filename} ({status})\nSummary: {summary.strip()}"
+                else:
+                    logger.warning(f"Batched summary is missing {filename}; summarizing it on its own.")
+        return summaries
+
+    @staticmethod
+    def _batched_summary_prompt(batch: list) -> str:
+        """Builds the prompt summarizing several (filename, status, patch) diffs at once."""
+        diffs = "\n---\n".join(f"### {filename} ({status})\n```\n{patch}\n```" for filename, status, patch in batch)
+        return ("Summarize each of the following code diffs (unchanged lines omitted) separately, giving a concise summary of the key "
+                "changes and their purpose for each file.\n"
+                "Respond with only a JSON object, without code fences, mapping each file name to its summary.\n\n"
+                + diffs)
+
+
+    async def summarize_diff(self, files_changed: list) -> str:
+        """
+        Summarizes a commit's code changes once, so the summary can be computed ahead of time and
+        shared by `generate_blog_post` and `generate_linkedin_summary`.
+
+        Args:
+            files_changed (list): List of changed files (`FileChange`) with diff patches.
+
+        Returns:
+            str: The summary of the code changes.
+        """
+        return await self._summarize_diff_async(files_changed)
 
-    async def generate_blog_post(self, commit_message: str, files_changed: list, notion_content: str = "", aggregated_context: str = "") -> str:
+    async def generate_blog_post(self, commit_message: str, files_changed: list, notion_content: str = "", aggregated_context: str = "",
+                                 diff_summary: Optional[str] = None) -> str:
         """
         Generates a Markdown-formatted blog post based on commit message, diff, previous posts and Notion content.
 
         Args:
             commit_message (str): The main commit message.
-            files_changed (list): List of changed files with diff patches.
+            files_changed (list): List of changed files (`FileChange`) with diff patches.
             notion_content (str): Optional, relevant content from Notion notes.
+            diff_summary (str, optional): A summary from `summarize_diff`; computed from `files_changed` if omitted.
 
         Returns:
-            str: The generated blog post in Markdown format.
+            str: The generated blog post in Markdown format, or an empty string if the commit has no
+                 message, note or diff to write about.
         """
-        diff_summary = await self._summarize_diff_async(files_changed)
+        if self._nothing_to_write_about(commit_message, files_changed, notion_content):
+            logger.warning("Commit has no message, Notion note or diff; not generating a blog post.")
+            return ""
+        if diff_summary is None:
+            diff_summary = await self._summarize_diff_async(files_changed)
+        prompt = self._blog_post_prompt(commit_message, diff_summary, notion_content, aggregated_context)
+        logger.info("Generating blog post with Gemini...")
+        return await self._call_gemini_async('blog', prompt)
+
+    @staticmethod
+    def _nothing_to_write_about(commit_message: str, files_changed: list, notion_content: str) -> bool:
+        """Returns True if a commit has no message, Notion note or diff to generate content from."""
+        return not (commit_message.strip() or notion_content.strip()
+                    or any(file.patch or file.patch_path for file in files_changed))
+
+    def _blog_post_prompt(self, commit_message: str, diff_summary: str, notion_content: str, aggregated_context: str) -> str:
+        """Builds the blog post prompt shared by `generate_blog_post` and `generate_all`."""
         context_prompt_part = ""
         if aggregated_context:
             context_prompt_part = f"""
@@ -217,15 +587,65 @@ class Transformer:
             5. Structure it with a clear introduction, body, and conclusion. Use headings and lists for readability.
 
 """
-        logger.info("Generating blog post with Gemini...")
-        return await self._call_gemini_async('blog', prompt)
+        return prompt
 
+    async def generate_all(self, commit_message: str, files_changed: list, notion_content: str = "", aggregated_context: str = "",
+                           diff_summary: Optional[str] = None) -> Optional[dict]:
+        """
+        Generates the blog post, its title and the LinkedIn summary in a single call to the blog model,
+        so the commit context is sent once instead of three times.
 
-    async def generate_linkedin_summary(self, commit_message: str, files_changed: list, notion_content: str = "") -> str:
+        Args:
+            commit_message (str): The main commit message.
+            files_changed (list): List of changed files (`FileChange`) with diff patches.
+            notion_content (str): Optional, relevant content from Notion notes.
+            aggregated_context (str): Previous blog posts, to avoid repetition.
+            diff_summary (str, optional): A summary from `summarize_diff`; computed from `files_changed` if omitted.
+
+        Returns:
+            Optional[dict]: The `title`, `blog_post` and `linkedin_summary`, or None if the response
+                            was not the expected JSON (callers fall back to the separate calls).
+        """
+        if self._nothing_to_write_about(commit_message, files_changed, notion_content):
+            return None
+        if diff_summary is None:
+            diff_summary = await self._summarize_diff_async(files_changed)
+        prompt = self._blog_post_prompt(commit_message, diff_summary, notion_content, aggregated_context) + """
+            Also write a click-worthy, SEO-friendly title for the post and a concise (100-150 words) LinkedIn
+            summary of the update focused on its value and impact, with a call to action if appropriate.
+
+            Respond with only a JSON object, without code fences, of this form:
+            {"title": "<title>", "blog_post": "<the Markdown blog post>", "linkedin_summary": "<LinkedIn summary>"}
+"""
+        logger.info("Generating blog post, title and LinkedIn summary with a single Gemini call...")
+        response_text = await self._call_gemini_async('blog', prompt)
+        return self._parse_generated_content(response_text)
+
+    def _parse_generated_content(self, response_text: str) -> Optional[dict]:
         """
-        Generates a concise LinkedIn-friendly summary of the changes.
+        Parses the JSON object returned for `generate_all`, tolerating a Markdown code fence around it.
         """
-        diff_summary = await self._summarize_diff_async(files_changed)
+        content = _load_json_object(response_text)
+        if content is None:
+            logger.warning("Combined Gemini response was not a valid JSON object.")
+            return None
+        if not all(isinstance(content.get(key), str) and content[key].strip()
+                                                    for key in ("title", "blog_post", "linkedin_summary")):
+            logger.warning("Combined Gemini response is missing the title, blog post or LinkedIn summary.")
+            return None
+        return content
+
+
+    async def generate_linkedin_summary(self, commit_message: str, files_changed: list, notion_content: str = "",
+                                        diff_summary: Optional[str] = None) -> str:
+        """
+        Generates a concise LinkedIn-friendly summary of the changes. A precomputed `diff_summary` is
+        used as is instead of summarizing `files_changed` again.
+        """
+        if self._nothing_to_write_about(commit_message, files_changed, notion_content):
+            return ""
+        if diff_summary is None:
+            diff_summary = await self._summarize_diff_async(files_changed)
 
         prompt = f"""You are a professional content creator for LinkedIn.
     Based on the following technical update, craft a concise (100-150 words) and impactful summary for a LinkedIn post.
@@ -247,8 +667,11 @@ class Transformer:
 
     async def generate_click_worthy_title(self, blog_post_content: str, commit_message: Optional[str] = None ) -> str:
         """
-        Generates a click-worthy and SEO-friendly title for the blog post.
+        Generates a click-worthy and SEO-friendly title for the blog post. A blank post is titled
+        with the commit subject without calling Gemini.
         """
+        if not blog_post_content.strip():
+            return (commit_message or "").strip().partition("\n")[0] or "Default Blog Post Title"
         prompt = f"""You are an expert in SEO and content marketing.
     Based on the following commit message and blog post content, generate 3-5 highly click-worthy and SEO-friendly titles.
     Prioritize titles that are engaging, informative, and include relevant keywords.
@@ -275,33 +698,45 @@ if __name__ == '__main__':
         print("Please set the GEMINI_API_KEY environment variable.")
     else:
         async def main():
-            transformer = Transformer(gemini_api_key=GEMINI_API_KEY) # type: ignore
+            # The default models and rate limits of main.py
+            model_configs = {
+                'blog': {'name': "gemini-2.5-flash", 'rpm': 10, 'tpm': 250000},
+                'summary': {'name': "gemini-2.5-flash-lite", 'rpm': 15, 'tpm': 250000},
+                'linkedin': {'name': "gemini-2.5-flash", 'rpm': 10, 'tpm': 250000},
+                'title': {'name': "gemma-3-27b-it", 'rpm': 30, 'tpm': 15000},
+            }
+            transformer = Transformer(gemini_api_key=GEMINI_API_KEY, model_configs=model_configs) # type: ignore
 
             sample_commit_message = "feat: Add user authentication with OAuth2"
             sample_files_changed = [
-                {
-                    "filename": "auth.py",
-                    "status": "added",
-                    "patch": """--- /dev/null\n+++ b/auth.py\n@@ -0,0 +1,20 @@\n+import oauthlib\n+from flask import Flask, redirect, url_for, session, request\n+# ... (more code)\n+def login():\n+    # OAuth2 flow\n+    pass\n+"""
-                },
-                {
-                    "filename": "app.py",
-                    "status": "modified",
-                    "patch": """--- a/app.py\n+++ b/app.py\n@@ -10,6 +10,7 @@\n from . import db\n from .auth import login_required, login\n \n+app.register_blueprint(auth.bp)\n @app.route("/hello")\n def hello():\n     return "Hello, World!"\n"""
-                }
+                FileChange(
+                    filename="auth.py",
+                    status="added",
+                    additions=0, deletions=0, changes=0, raw_url=None,
+                    patch="""--- /dev/null\n+++ b/auth.py\n@@ -0,0 +1,20 @@\n+import oauthlib\n+from flask import Flask, redirect, url_for, session, request\n+# ... (more code)\n+def login():\n+    # OAuth2 flow\n+    pass\n+"""
+                ),
+                FileChange(
+                    filename="app.py",
+                    status="modified",
+                    additions=0, deletions=0, changes=0, raw_url=None,
+                    patch="""--- a/app.py\n+++ b/app.py\n@@ -10,6 +10,7 @@\n from . import db\n from .auth import login_required, login\n \n+app.register_blueprint(auth.bp)\n @app.route("/hello")\n def hello():\n     return "Hello, World!"\n"""
+                )
             ]
             sample_notion_content = "Design notes: OAuth2 integration for user login. Use Google as provider."
 
-            # Generate blog post
-            blog_post = await transformer.generate_blog_post(sample_commit_message, sample_files_changed, sample_notion_content)
+            # Summarize the diff once, then generate the blog post and LinkedIn summary concurrently
+            diff_summary = await transformer.summarize_diff(sample_files_changed)
+            blog_post, linkedin_summary = await asyncio.gather(
+                transformer.generate_blog_post(sample_commit_message, sample_files_changed, sample_notion_content,
+                                               diff_summary=diff_summary),
+                transformer.generate_linkedin_summary(sample_commit_message, sample_files_changed, sample_notion_content,
+                                                      diff_summary=diff_summary),
+            )
             print("\n--- Generated Blog Post ---\n", blog_post)
-
-            # Generate LinkedIn summary
-            linkedin_summary = await transformer.generate_linkedin_summary(sample_commit_message, sample_files_changed, sample_notion_content)
             print("\n--- Generated LinkedIn Summary ---\n", linkedin_summary)
 
             # Generate click-worthy title
-            title = await transformer.generate_click_worthy_title(sample_commit_message, blog_post)
+            title = await transformer.generate_click_worthy_title(blog_post, sample_commit_message)
             print("\n--- Generated Title ---\n", title)
 
         asyncio.run(main())
@@ -0,0 +1,80 @@
+
+"""
+Transform Cache Module: Persists generated Gemini responses on disk, so re-runs and resumed
+batches reuse content that was already generated instead of calling the API again.
+"""
+
+import os
+import hashlib
+import logging
+import sqlite3
+from typing import Optional
+
+# Configure logging for this module
+logger = logging.getLogger(__name__)
+
+class TransformCache:
+    """
+    A SQLite-backed cache of generated content, keyed by the kind of content (the model role,
+    e.g. 'blog' or 'title') and the SHA-256 of the exact prompt it was generated from.
+    """
+
+    def __init__(self, cache_file: str = os.path.join('.cache', 'generated.db')):
+        """
+        Opens (or creates) the cache database.
+
+        Args:
+            cache_file (str): Path to the SQLite database file.
+        """
+        self.cache_file = cache_file
+        os.makedirs(os.path.dirname(os.path.abspath(cache_file)), exist_ok=True)
+        self._conn = sqlite3.connect(cache_file)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS generated("
+            "kind TEXT, prompt_hash TEXT, content TEXT, PRIMARY KEY(kind, prompt_hash)) WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def prompt_hash(prompt: str) -> str:
+        """Returns the hex SHA-256 of a prompt."""
+        return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+    def get(self, kind: str, prompt: str) -> Optional[str]:
+        """
+        Looks up content previously generated for a prompt.
+
+        Args:
+            kind (str): The kind of content (model role).
+            prompt (str): The full prompt.
+
+        Returns:
+            Optional[str]: The cached content, or None on a miss.
+        """
+        try:
+            row = self._conn.execute(
+                "SELECT content FROM generated WHERE kind = ? AND prompt_hash = ?", (kind, self.prompt_hash(prompt))
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read generated content cache {self.cache_file}: {e}")
+            return None
+        return row[0] if row else None
+
+    def put(self, kind: str, prompt: str, content: str):
+        """
+        Stores generated content for a prompt, replacing any earlier entry.
+
+        Args:
+            kind (str): The kind of content (model role).
+            prompt (str): The full prompt.
+            content (str): The generated content.
+        """
+        try:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO generated VALUES (?, ?, ?)", (kind, self.prompt_hash(prompt), content)
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Could not save generated content to {self.cache_file}: {e}")